@@ -0,0 +1,79 @@
+# backend/app/api/routes_jobs.py
+
+from fastapi import APIRouter, Depends, File, HTTPException, UploadFile
+from fastapi.responses import FileResponse
+from pathlib import Path
+from typing import Optional
+
+from ..dependencies import get_job_manager, require_ready
+from ..core.executor import run_blocking
+from ..core.jobs import DONE, JobManager
+from ..utils.file_handler import save_uploaded_file
+from ..utils.logger import get_logger
+
+logger = get_logger(__name__)
+router = APIRouter(tags=["Jobs"])
+
+# --------------------------------------------------------
+# Эндпоинт: постановка файла в обработку
+# --------------------------------------------------------
+@router.post("", dependencies=[Depends(require_ready)])
+async def submit_job(
+    file: UploadFile = File(...),
+    chunksize: Optional[int] = None,
+    jobs: JobManager = Depends(get_job_manager)
+):
+    """
+    Сохраняет загруженный файл (CSV, Parquet или Arrow IPC)
+    и ставит его в фоновую обработку.
+    Возвращает id задачи для опроса прогресса.
+    Пока модель загружается, отвечает 503 с состоянием загрузки (как /ready).
+    """
+    path = await run_blocking(save_uploaded_file, file)
+    job = await jobs.submit(str(path), filename=file.filename, chunksize=chunksize)
+    return {"job_id": job["id"], "status": job["status"], "total_rows": job["total_rows"]}
+
+# --------------------------------------------------------
+# Эндпоинт: прогресс задачи
+# --------------------------------------------------------
+@router.get("/{job_id}")
+async def job_status(job_id: str, jobs: JobManager = Depends(get_job_manager)):
+    """
+    Статус, обработано строк, скорость (строк/сек) и оценка оставшегося времени
+    """
+    job = await jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Задача не найдена")
+    progress = job["rows_done"] / job["total_rows"] if job["total_rows"] else (1.0 if job["status"] == DONE else 0.0)
+    return {
+        "job_id": job["id"],
+        "status": job["status"],
+        "filename": job["filename"],
+        "rows_done": job["rows_done"],
+        "total_rows": job["total_rows"],
+        "progress": round(min(progress, 1.0), 4),
+        "rows_per_sec": job["rows_per_sec"],
+        "eta_s": job["eta_s"],
+        "error": job["error"],
+    }
+
+# --------------------------------------------------------
+# Эндпоинт: скачивание результата
+# --------------------------------------------------------
+@router.get("/{job_id}/result")
+async def job_result(job_id: str, partial: bool = False, jobs: JobManager = Depends(get_job_manager)):
+    """
+    Результат всегда в CSV (при любом формате входного файла)
+    с колонкой predicted_label. С partial=true можно скачать
+    уже обработанную часть, не дожидаясь завершения.
+    """
+    job = await jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Задача не найдена")
+    if job["status"] != DONE and not partial:
+        raise HTTPException(status_code=409, detail=f"Задача ещё не завершена: {job['status']}")
+
+    path = jobs.output_path(job)
+    if not path.exists():
+        raise HTTPException(status_code=404, detail="Результат ещё не записан")
+    return FileResponse(path, media_type="text/csv", filename=f"predictions_{Path(job['filename']).stem}.csv")
@@ -1,13 +1,28 @@
 # backend/app/api/routes_prediction.py
 
-from fastapi import APIRouter, Depends, UploadFile, File
-from typing import List
+from fastapi import APIRouter, Depends, UploadFile, File, HTTPException, Query
+from fastapi.responses import Response, StreamingResponse
+from functools import partial
+from typing import IO, Any, AsyncIterator, Dict, List, Optional, Tuple
 import pandas as pd
 import io
 
-from ..dependencies import get_model_handler, get_tokenizer
-from ..ml.dataset import TextDataset
-from ..ml.model import ModelHandler
+from ..dependencies import get_inference_engine, get_prediction_cache, get_cache
+from ..config import settings
+from ..core.batcher import MicroBatcher
+from ..core.dedup import dedup, dedup_keys, dedup_stats, scatter
+from ..core.prediction_cache import Prediction, PredictionCache
+from ..core.executor import run_blocking
+from ..ml.inference import InferenceEngine, make_predict_fn
+from ..ml.lexicon import cascade_stats
+from ..utils.csv_tools import (
+    TABLE_MEDIA_TYPES,
+    format_chunk,
+    open_csv_chunks,
+    read_table_bytes,
+    spool_upload,
+    table_to_bytes,
+)
 from ..utils.logger import get_logger
 
 logger = get_logger(__name__)
@@ -16,24 +31,106 @@ router = APIRouter(prefix="/predict", tags=["Prediction"])
 # --------------------------------------------------------
 # Эндпоинт: предсказание тональности текстов
 # --------------------------------------------------------
+_batcher: Optional[MicroBatcher] = None
+
+
+def get_batcher(
+    engine: InferenceEngine = Depends(get_inference_engine)
+) -> MicroBatcher:
+    """
+    Общая на процесс очередь микро-батчинга
+    """
+    global _batcher
+    if _batcher is None:
+        _batcher = MicroBatcher(make_predict_fn(engine, with_probs=True))
+    return _batcher
+
+
+async def _predict_cached(texts: List[str], infer, cache: PredictionCache) -> List[Prediction]:
+    """
+    Пропускает тексты через кэш предсказаний (если включён);
+    в infer попадают только промахи
+    """
+    if settings.PREDICTION_CACHE_ENABLED:
+        return await cache.predict(texts, infer)
+    return await infer(texts)
+
+
+def _dedup_plan(texts: List[str]) -> Tuple[List[int], List[int], List[str]]:
+    # Токенизация и группировка за один вызов в пуле, а не в event loop
+    keys = dedup_keys(texts)
+    first, inverse = dedup(texts, keys)
+    return first, inverse, [keys[i] for i in first]
+
+
+async def _predict_unique(texts: List[str], infer, cache: PredictionCache) -> Tuple[List[Prediction], Dict[str, Any]]:
+    """
+    Одинаковые после нормализации тексты запроса проходят через кэш
+    и модель один раз. Ключ нормализации считается один раз на текст
+    и используется и для дедупликации, и для ключа кэша.
+    Возвращает результаты для всех текстов и meta с долей дубликатов в запросе.
+    """
+    if not settings.DEDUP_ENABLED:
+        results = await _predict_cached(texts, infer, cache)
+        return results, {"rows": len(texts), "unique": len(texts), "dedup_ratio": 0.0}
+
+    first, inverse, unique_keys = await run_blocking(_dedup_plan, texts)
+    unique = [texts[i] for i in first]
+    if settings.PREDICTION_CACHE_ENABLED:
+        unique_results = await cache.predict(unique, infer, normalized=unique_keys)
+    else:
+        unique_results = await infer(unique)
+    ratio = 1 - len(first) / len(texts) if texts else 0.0
+    return scatter(unique_results, inverse), {"rows": len(texts), "unique": len(first), "dedup_ratio": round(ratio, 4)}
+
+
 @router.post("/text")
 async def predict_texts(
     texts: List[str],
-    model_handler: ModelHandler = Depends(get_model_handler),
-    tokenizer = Depends(get_tokenizer)
+    engine: InferenceEngine = Depends(get_inference_engine),
+    batcher: MicroBatcher = Depends(get_batcher),
+    cache: PredictionCache = Depends(get_prediction_cache)
 ):
     """
     Предсказывает тональность списка текстов.
     Возвращает список меток: 0 - отрицательная, 1 - нейтральная, 2 - положительная
+    и вероятности классов.
+    Одновременные запросы объединяются в общий прогон модели (MicroBatcher),
+    повторяющиеся тексты отдаются из кэша предсказаний.
+    meta.dedup_ratio — доля дубликатов в запросе (они не считались повторно).
     """
-    dataset = TextDataset(texts=texts, tokenizer=tokenizer)
-    dataloader = model_handler.model.device  # Будет заменен на DataLoader
-    from torch.utils.data import DataLoader
-    dataloader = DataLoader(dataset, batch_size=32, collate_fn=dataset.collate_fn)
+    if settings.MICRO_BATCHING:
+        infer = batcher.submit
+    else:
+        infer = partial(run_blocking, make_predict_fn(engine, with_probs=True))
 
-    preds = model_handler.predict(dataloader)
-    logger.info(f"Предсказание для {len(texts)} текстов выполнено.")
-    return {"predictions": preds}
+    results, meta = await _predict_unique(texts, infer, cache)
+    logger.info(f"Предсказание для {len(texts)} текстов выполнено. Уникальных: {meta['unique']}")
+    return {
+        "predictions": [label for label, _ in results],
+        "probabilities": [probs for _, probs in results],
+        "meta": meta,
+    }
+
+# --------------------------------------------------------
+# Эндпоинт: метрики микро-батчинга
+# --------------------------------------------------------
+@router.get("/metrics")
+async def prediction_metrics():
+    """
+    Окно, размер батча, глубина очереди и счётчики MicroBatcher,
+    доля попаданий в кэш предсказаний, размер и вытеснения LocalCache,
+    доля текстов, решённых лексиконом без модели,
+    доля текстов, не дошедших до модели благодаря дедупликации
+    """
+    cache = get_cache()
+    return {
+        "batcher": _batcher.stats() if _batcher is not None else None,
+        "prediction_cache": get_prediction_cache().stats(),
+        "cache": cache.stats() if hasattr(cache, "stats") else None,
+        "cascade": cascade_stats.stats(),
+        "dedup": dedup_stats.stats(),
+    }
 
 # --------------------------------------------------------
 # Эндпоинт: предсказание из CSV файла
@@ -41,24 +138,109 @@ async def predict_texts(
 @router.post("/file")
 async def predict_file(
     file: UploadFile = File(...),
-    model_handler: ModelHandler = Depends(get_model_handler),
-    tokenizer = Depends(get_tokenizer)
+    format: str = Query("json", pattern="^(json|csv|parquet|arrow)$"),
+    engine: InferenceEngine = Depends(get_inference_engine),
+    cache: PredictionCache = Depends(get_prediction_cache)
 ):
     """
-    Предсказывает тональность текстов из загруженного CSV-файла.
-    Ожидается колонка 'text'.
+    Предсказывает тональность текстов из загруженного файла
+    (CSV, Parquet или Arrow IPC — по расширению). Ожидается колонка 'text'.
+    format: json (по умолчанию) — записи в теле ответа;
+    csv, parquet, arrow — файл с колонкой predicted_label
+    (доля дубликатов — в заголовке X-Dedup-Ratio).
     """
     contents = await file.read()
-    df = pd.read_csv(io.StringIO(contents.decode("utf-8")))
+    # Разбор файла и инференс — в пуле потоков, event loop не блокируется
+    df = await run_blocking(read_table_bytes, contents, file.filename or "")
     if "text" not in df.columns:
-        return {"error": "CSV должен содержать колонку 'text'"}
+        return {"error": "Файл должен содержать колонку 'text'"}
 
     texts = df["text"].tolist()
-    dataset = TextDataset(texts=texts, tokenizer=tokenizer)
-    from torch.utils.data import DataLoader
-    dataloader = DataLoader(dataset, batch_size=32, collate_fn=dataset.collate_fn)
-
-    preds = model_handler.predict(dataloader)
-    df["predicted_label"] = preds
-    logger.info(f"Предсказание из CSV-файла '{file.filename}' выполнено. Пример 5 результатов:\n{df.head()}")
-    return {"predictions": df.to_dict(orient="records")}
+    infer = partial(run_blocking, make_predict_fn(engine, with_probs=True))
+    results, meta = await _predict_unique(texts, infer, cache)
+    df["predicted_label"] = [label for label, _ in results]
+    logger.info(f"Предсказание из файла '{file.filename}' выполнено. Уникальных текстов: {meta['unique']} из {meta['rows']}. Пример 5 результатов:\n{df.head()}")
+
+    if format != "json":
+        body = await run_blocking(table_to_bytes, df, format)
+        stem = (file.filename or "upload").rsplit(".", 1)[0]
+        return Response(
+            content=body,
+            media_type=TABLE_MEDIA_TYPES[format],
+            headers={
+                "Content-Disposition": f'attachment; filename="predictions_{stem}.{format}"',
+                "X-Dedup-Ratio": str(meta["dedup_ratio"]),
+            },
+        )
+    return {"predictions": df.to_dict(orient="records"), "meta": meta}
+
+# --------------------------------------------------------
+# Эндпоинт: потоковое предсказание из большого CSV файла
+# --------------------------------------------------------
+_STREAM_MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv; charset=utf-8"}
+
+
+async def _stream_predictions(
+    spool: IO[bytes],
+    reader,
+    first_chunk: pd.DataFrame,
+    engine: InferenceEngine,
+    cache: PredictionCache,
+    fmt: str,
+) -> AsyncIterator[str]:
+    """
+    Чанк за чанком: чтение, инференс, сериализация. В памяти одновременно
+    только один чанк, первый байт уходит клиенту после первого чанка.
+    """
+    infer = partial(run_blocking, make_predict_fn(engine, with_probs=True))
+    chunk: Optional[pd.DataFrame] = first_chunk
+    rows = 0
+    try:
+        while chunk is not None:
+            texts = chunk["text"].fillna("").astype(str).tolist()
+            results, _ = await _predict_unique(texts, infer, cache)
+            chunk["predicted_label"] = [label for label, _ in results]
+            yield await run_blocking(format_chunk, chunk, fmt, rows == 0)
+            rows += len(chunk)
+            chunk = await run_blocking(next, reader, None)
+        logger.info(f"Потоковое предсказание завершено. Строк: {rows}")
+    finally:
+        reader.close()
+        spool.close()
+
+
+@router.post("/file/stream")
+async def predict_file_stream(
+    file: UploadFile = File(...),
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    chunksize: Optional[int] = Query(None, gt=0),
+    engine: InferenceEngine = Depends(get_inference_engine),
+    cache: PredictionCache = Depends(get_prediction_cache)
+):
+    """
+    Предсказывает тональность текстов из CSV любого размера.
+    Файл читается чанками (STREAM_CHUNK_SIZE строк), результаты
+    отдаются потоком в формате NDJSON или CSV с колонкой predicted_label.
+    """
+    spool = await run_blocking(spool_upload, file.file)
+    try:
+        reader = await run_blocking(open_csv_chunks, spool, chunksize)
+    except pd.errors.EmptyDataError:
+        spool.close()
+        raise HTTPException(status_code=400, detail="Пустой CSV-файл")
+
+    first_chunk = await run_blocking(next, reader, None)
+    if first_chunk is None or "text" not in first_chunk.columns:
+        reader.close()
+        spool.close()
+        raise HTTPException(status_code=400, detail="CSV должен содержать колонку 'text'")
+
+    headers = {}
+    if format == "csv":
+        filename = file.filename or "upload.csv"
+        headers["Content-Disposition"] = f'attachment; filename="predictions_{filename}"'
+    return StreamingResponse(
+        _stream_predictions(spool, reader, first_chunk, engine, cache, format),
+        media_type=_STREAM_MEDIA_TYPES[format],
+        headers=headers,
+    )
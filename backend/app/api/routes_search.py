@@ -1,16 +1,29 @@
 # backend/app/api/routes_search.py
 
 from fastapi import APIRouter, Query
+from threading import Lock
 from typing import List, Optional
 import os
-import pandas as pd
 
 from ..core.search_engine import SearchEngine
+from ..dependencies import get_search_engine
 from ..utils.logger import get_logger
 
 logger = get_logger(__name__)
 router = APIRouter(prefix="/search", tags=["Search"])
 
+_index_lock = Lock()
+
+
+def _ensure_index(search_engine: SearchEngine) -> None:
+    """
+    Индекс по train.csv строится один раз, потоково чанками
+    """
+    with _index_lock:
+        if search_engine.df_index is None:
+            data_dir = os.path.join(os.path.dirname(__file__), "../../data")
+            search_engine.build_index_from_csv(os.path.join(data_dir, "train.csv"))
+
 # --------------------------------------------------------
 # Эндпоинт: поиск текстов по ключевым словам
 # --------------------------------------------------------
@@ -22,17 +35,14 @@ def search_texts(
     """
     Выполняет поиск текстов по ключевым словам и, опционально, по источникам.
     """
-    data_dir = os.path.join(os.path.dirname(__file__), "../../data")
-    train_file = os.path.join(data_dir, "train.csv")
+    search_engine = get_search_engine()
+    _ensure_index(search_engine)
 
-    df = pd.read_csv(train_file)
+    results = search_engine.search([query])
 
     # Фильтрация по источникам, если задано
     if sources:
-        df = df[df["src"].isin(sources)]
-
-    search_engine = SearchEngine(df)
-    results = search_engine.search(query)
+        results = results[results["src"].isin(sources)]
 
     logger.info(f"Поиск по слову '{query}' выполнен. Найдено {len(results)} результатов.")
-    return {"query": query, "sources": sources, "results": results}
+    return {"query": query, "sources": sources, "results": results.drop(columns=["norm_text"]).to_dict(orient="records")}
@@ -1,9 +1,8 @@
 # backend/app/api/routes_upload.py
 
 from fastapi import APIRouter, UploadFile, File
-import os
-import pandas as pd
-from datetime import datetime
+from ..core.executor import run_blocking
+from ..utils.csv_tools import read_table_columns, table_format
 from ..utils.file_handler import save_uploaded_file
 from ..utils.logger import get_logger
 
@@ -16,29 +15,22 @@ router = APIRouter(prefix="/upload", tags=["Upload"])
 @router.post("/csv")
 async def upload_csv(file: UploadFile = File(...)):
     """
-    Загружает CSV-файл с отзывами на сервер.
+    Загружает файл с отзывами на сервер: CSV, Parquet или Arrow IPC.
     Ожидается колонка 'text'.
-    Сохраняет файл в директорию backend/app/data/uploads/
+    Сохраняет файл в директорию UPLOAD_DIR (backend/data/uploads/)
     """
-    if not file.filename.endswith(".csv"):
-        return {"error": "Только CSV файлы поддерживаются"}
+    fmt = table_format(file.filename or "")
+    if fmt == "csv" and not file.filename.endswith(".csv"):
+        return {"error": "Поддерживаются CSV, Parquet и Arrow файлы"}
 
-    contents = await file.read()
-    df = pd.read_csv(pd.io.common.BytesIO(contents))
-    
-    if "text" not in df.columns:
-        return {"error": "CSV должен содержать колонку 'text'"}
+    # Файл копируется на диск потоком, без чтения целиком в память
+    save_path = await run_blocking(save_uploaded_file, file)
 
-    # Создание папки для загрузок, если не существует
-    upload_dir = os.path.join(os.path.dirname(__file__), "../../data/uploads")
-    os.makedirs(upload_dir, exist_ok=True)
+    columns = await run_blocking(read_table_columns, save_path)
+    if "text" not in columns:
+        save_path.unlink(missing_ok=True)
+        return {"error": "Файл должен содержать колонку 'text'"}
 
-    # Генерация уникального имени файла
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    save_path = os.path.join(upload_dir, f"{timestamp}_{file.filename}")
-
-    # Сохранение файла на сервере
-    save_uploaded_file(contents, save_path)
     logger.info(f"Файл '{file.filename}' загружен и сохранен как '{save_path}'")
 
-    return {"message": f"Файл успешно загружен", "path": save_path}
+    return {"message": f"Файл успешно загружен", "path": str(save_path), "format": fmt}
@@ -1,14 +1,12 @@
 # backend/app/api/routes_validation.py
 
 from fastapi import APIRouter, UploadFile, File, Depends
-import pandas as pd
-import io
-from torch.utils.data import DataLoader
 
-from ..dependencies import get_model_handler, get_tokenizer
-from ..ml.dataset import TextDataset
-from ..ml.model import ModelHandler
+from ..dependencies import get_inference_engine
+from ..core.executor import run_blocking
+from ..ml.inference import InferenceEngine, make_predict_fn
 from ..ml.metrics import compute_metrics
+from ..utils.csv_tools import read_csv_bytes
 from ..utils.logger import get_logger
 
 logger = get_logger(__name__)
@@ -20,8 +18,7 @@ router = APIRouter(prefix="/validate", tags=["Validation"])
 @router.post("/file")
 async def validate_model(
     file: UploadFile = File(...),
-    model_handler: ModelHandler = Depends(get_model_handler),
-    tokenizer = Depends(get_tokenizer)
+    engine: InferenceEngine = Depends(get_inference_engine)
 ):
     """
     Валидирует модель по CSV-файлу с колонками:
@@ -29,7 +26,8 @@ async def validate_model(
     Возвращает метрики macro-F1, precision, recall
     """
     contents = await file.read()
-    df = pd.read_csv(io.StringIO(contents.decode("utf-8")))
+    # Разбор CSV и инференс — в пуле потоков, event loop не блокируется
+    df = await run_blocking(read_csv_bytes, contents)
 
     if "text" not in df.columns or "label" not in df.columns:
         return {"error": "CSV должен содержать колонки 'text' и 'label'"}
@@ -37,11 +35,8 @@ async def validate_model(
     texts = df["text"].tolist()
     labels = df["label"].tolist()
 
-    dataset = TextDataset(texts=texts, labels=labels, tokenizer=tokenizer)
-    dataloader = DataLoader(dataset, batch_size=32, collate_fn=dataset.collate_fn)
-
-    preds = model_handler.predict(dataloader)
-    metrics = compute_metrics(preds, labels)
+    preds = await run_blocking(make_predict_fn(engine), texts)
+    metrics = await run_blocking(compute_metrics, preds, labels)
     logger.info(f"Валидация CSV '{file.filename}' завершена. Метрики: {metrics}")
 
     return {"metrics": metrics}
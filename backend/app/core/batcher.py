@@ -0,0 +1,199 @@
+# backend/app/core/batcher.py
+
+import asyncio
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+from fastapi import HTTPException, status
+
+from ..config import settings
+from ..utils.logger import get_logger
+from .dedup import dedup_texts, scatter
+from .executor import run_blocking
+
+logger = get_logger(__name__)
+
+# --------------------------------------------------------
+# Класс MicroBatcher
+# --------------------------------------------------------
+
+class MicroBatcher:
+    """
+    Асинхронная очередь микро-батчинга для инференса.
+    Запросы, пришедшие в пределах окна window_ms, объединяются
+    (не более max_batch_size текстов) в один прогон модели,
+    и каждый вызывающий получает свой срез результатов.
+    """
+
+    def __init__(
+        self,
+        predict_fn: Callable[[List[str]], List[int]],
+        max_batch_size: Optional[int] = None,
+        window_ms: Optional[float] = None,
+        max_queue: Optional[int] = None,
+    ):
+        self.predict_fn = predict_fn
+        self.max_batch_size = max_batch_size or settings.MICRO_BATCH_MAX_SIZE
+        self.window = (window_ms if window_ms is not None else settings.MICRO_BATCH_WINDOW_MS) / 1000
+        self.max_queue = max_queue or settings.MICRO_BATCH_MAX_QUEUE
+
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+
+        self.requests = 0
+        self.texts = 0
+        self.batches = 0
+        self.rejected = 0
+        self.max_batch_seen = 0
+        self.duplicates = 0
+        self.busy_seconds = 0.0
+
+    # ----------------------------------------------------
+    # Запуск / остановка фоновой задачи
+    # ----------------------------------------------------
+    def _ensure_started(self) -> None:
+        if self._worker is None or self._worker.done():
+            # Очередь сохраняется: ожидающие в ней запросы обработает новый воркер
+            if self._queue is None:
+                self._queue = asyncio.Queue(maxsize=self.max_queue)
+            self._worker = asyncio.get_running_loop().create_task(self._run())
+            logger.info(
+                f"MicroBatcher запущен. window={self.window * 1000:.1f}ms, "
+                f"max_batch_size={self.max_batch_size}, max_queue={self.max_queue}"
+            )
+
+    async def stop(self) -> None:
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+        # Запросы, которые уже некому обработать, завершаются ошибкой, а не висят
+        if self._queue is not None:
+            while not self._queue.empty():
+                _, future = self._queue.get_nowait()
+                self._fail(future, self._stopped_error())
+
+    @staticmethod
+    def _stopped_error() -> HTTPException:
+        return HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Очередь инференса остановлена"
+        )
+
+    @staticmethod
+    def _fail(future: asyncio.Future, error: BaseException) -> None:
+        if not future.done():
+            future.set_exception(error)
+
+    # ----------------------------------------------------
+    # Постановка запроса в очередь
+    # ----------------------------------------------------
+    async def submit(self, texts: List[str]) -> List[int]:
+        """
+        Ставит тексты в очередь и ждёт предсказания для них
+        """
+        if not texts:
+            return []
+        self._ensure_started()
+
+        future = asyncio.get_running_loop().create_future()
+        try:
+            self._queue.put_nowait((texts, future))
+        except asyncio.QueueFull:
+            self.rejected += 1
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Очередь инференса переполнена"
+            )
+        return await future
+
+    # ----------------------------------------------------
+    # Фоновый цикл: сбор батча и прогон модели
+    # ----------------------------------------------------
+    async def _collect(self, items: List[Tuple[List[str], asyncio.Future]]) -> None:
+        # Запросы добавляются в items по мере получения: при отмене воркера
+        # вызывающий видит всё, что уже забрано из очереди
+        loop = asyncio.get_running_loop()
+        items.append(await self._queue.get())
+        size = len(items[0][0])
+        deadline = loop.time() + self.window
+
+        while size < self.max_batch_size:
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                item = await asyncio.wait_for(self._queue.get(), timeout)
+            except asyncio.TimeoutError:
+                break
+            items.append(item)
+            size += len(item[0])
+
+    async def _run(self) -> None:
+        items: List[Tuple[List[str], asyncio.Future]] = []
+        try:
+            while True:
+                await self._collect(items)
+                await self._process(items)
+                items = []
+        except BaseException:
+            # Воркер остановлен или упал: запросы уже взятого батча не должны зависнуть
+            for _, future in items:
+                self._fail(future, self._stopped_error())
+            raise
+
+    async def _process(self, items: List[Tuple[List[str], asyncio.Future]]) -> None:
+        texts = [text for request_texts, _ in items for text in request_texts]
+        # Одинаковые тексты из разных запросов окна — один прогон. Каждый
+        # запрос уже дедуплицирован по нормализованному ключу, поэтому
+        # здесь достаточно точного совпадения строк, без повторной токенизации
+        first, inverse = dedup_texts(texts, keys=texts) if settings.DEDUP_ENABLED else (None, None)
+
+        started = time.perf_counter()
+        try:
+            if first is not None and len(first) < len(texts):
+                self.duplicates += len(texts) - len(first)
+                preds = scatter(await run_blocking(self.predict_fn, [texts[i] for i in first]), inverse)
+            else:
+                preds = await run_blocking(self.predict_fn, texts)
+        except Exception as e:
+            logger.exception(f"Ошибка инференса в MicroBatcher: {e}")
+            for _, future in items:
+                self._fail(future, e)
+            return
+        finally:
+            self.busy_seconds += time.perf_counter() - started
+
+        self.batches += 1
+        self.requests += len(items)
+        self.texts += len(texts)
+        self.max_batch_seen = max(self.max_batch_seen, len(texts))
+
+        offset = 0
+        for request_texts, future in items:
+            if not future.done():
+                future.set_result(preds[offset:offset + len(request_texts)])
+            offset += len(request_texts)
+
+    # ----------------------------------------------------
+    # Метрики
+    # ----------------------------------------------------
+    def stats(self) -> Dict[str, float]:
+        return {
+            "window_ms": self.window * 1000,
+            "max_batch_size": self.max_batch_size,
+            "max_queue": self.max_queue,
+            "queue_depth": self._queue.qsize() if self._queue is not None else 0,
+            "requests": self.requests,
+            "texts": self.texts,
+            "batches": self.batches,
+            "rejected": self.rejected,
+            "avg_batch_size": self.texts / self.batches if self.batches else 0.0,
+            "avg_requests_per_batch": self.requests / self.batches if self.batches else 0.0,
+            "max_batch_size_seen": self.max_batch_seen,
+            "cross_request_duplicates": self.duplicates,
+            "busy_seconds": self.busy_seconds,
+        }
@@ -0,0 +1,105 @@
+# backend/app/core/dedup.py
+
+from threading import Lock
+from typing import Callable, Dict, List, Optional, Sequence, Tuple, TypeVar
+
+from ..config import settings
+from .normalizer import Normalizer
+
+T = TypeVar("T")
+
+# --------------------------------------------------------
+# Дедупликация текстов перед инференсом
+# --------------------------------------------------------
+#
+# Ключ — текст в том виде, в каком его видит модель (Normalizer._tokenize:
+# нижний регистр, только буквы и цифры). Тексты с одинаковым ключом дают
+# одинаковые входы модели, поэтому предсказание считается один раз
+# и раскладывается по всем исходным строкам.
+#
+# Ключ вычисляется один раз на текст (dedup_keys) и передаётся дальше —
+# в PredictionCache; повторно текст не токенизируется. Статистика
+# пишется только в dedup(): каждый входной текст учитывается один раз.
+
+
+def dedup_key(text: str) -> str:
+    return " ".join(Normalizer._tokenize(text if isinstance(text, str) else str(text)))
+
+
+def dedup_keys(texts: Sequence[str]) -> List[str]:
+    return [dedup_key(text) for text in texts]
+
+
+def dedup_texts(texts: Sequence[str], keys: Optional[Sequence[str]] = None) -> Tuple[List[int], List[int]]:
+    """
+    Один проход по хэш-таблице: индексы уникальных текстов (первое вхождение)
+    и для каждого исходного текста — номер его уникального представителя.
+    keys — уже вычисленные dedup_key, чтобы не токенизировать тексты повторно.
+    """
+    keys = dedup_keys(texts) if keys is None else keys
+    positions: Dict[str, int] = {}
+    first: List[int] = []
+    inverse: List[int] = []
+    for i, key in enumerate(keys):
+        position = positions.get(key)
+        if position is None:
+            position = positions[key] = len(first)
+            first.append(i)
+        inverse.append(position)
+    return first, inverse
+
+
+def dedup(texts: Sequence[str], keys: Optional[Sequence[str]] = None) -> Tuple[List[int], List[int]]:
+    """
+    dedup_texts с учётом в общей статистике
+    """
+    first, inverse = dedup_texts(texts, keys)
+    dedup_stats.add(len(texts), len(first))
+    return first, inverse
+
+
+def scatter(results: Sequence[T], inverse: Sequence[int]) -> List[T]:
+    """
+    Раскладывает результаты уникальных текстов обратно по исходным строкам
+    """
+    return [results[position] for position in inverse]
+
+
+class DedupStats:
+    """
+    Счётчики: сколько текстов пришло в запросах и задачах и сколько из них
+    осталось после дедупликации (в кэш предсказаний и модель уходят только они)
+    """
+
+    def __init__(self):
+        self.texts = 0
+        self.unique = 0
+        self._lock = Lock()
+
+    def add(self, texts: int, unique: int) -> None:
+        with self._lock:
+            self.texts += texts
+            self.unique += unique
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            "enabled": settings.DEDUP_ENABLED,
+            "texts": self.texts,
+            "unique": self.unique,
+            "dedup_ratio": 1 - self.unique / self.texts if self.texts else 0.0,
+        }
+
+
+dedup_stats = DedupStats()
+
+
+def dedup_predict(predict: Callable[[List[str]], List[T]], texts: List[str]) -> List[T]:
+    """
+    Синхронный вариант для путей без кэша предсказаний (фоновые задачи):
+    прогоняет через predict только уникальные тексты и возвращает
+    результаты для всех исходных в их порядке
+    """
+    first, inverse = dedup(texts)
+    if len(first) == len(texts):
+        return predict(texts)
+    return scatter(predict([texts[i] for i in first]), inverse)
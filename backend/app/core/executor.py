@@ -0,0 +1,86 @@
+# backend/app/core/executor.py
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from threading import Lock
+from typing import Any, Callable, Optional
+from weakref import WeakKeyDictionary
+
+import torch
+
+from ..config import settings
+from ..utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# --------------------------------------------------------
+# Выделенный пул потоков для блокирующей работы
+# --------------------------------------------------------
+#
+# Инференс и разбор CSV выполняются здесь, а не в event loop,
+# поэтому /health и лёгкие запросы остаются отзывчивыми, пока идёт
+# тяжёлый прогон. Число одновременно ожидающих задач ограничено
+# семафором, чтобы очередь (и хвостовая задержка) не росла без предела.
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = Lock()
+# Семафор привязан к event loop, поэтому свой на каждый loop
+# (тесты, перезапуск приложения в новом loop)
+_semaphores: "WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore]" = WeakKeyDictionary()
+
+
+def get_inference_executor() -> ThreadPoolExecutor:
+    """
+    Лениво создаёт пул из INFERENCE_THREADS потоков и задаёт
+    бюджет intra-op потоков torch
+    """
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                if settings.TORCH_INTRA_OP_THREADS > 0:
+                    torch.set_num_threads(settings.TORCH_INTRA_OP_THREADS)
+                _executor = ThreadPoolExecutor(
+                    max_workers=settings.INFERENCE_THREADS,
+                    thread_name_prefix="inference",
+                )
+                logger.info(
+                    f"Пул инференса создан. threads={settings.INFERENCE_THREADS}, "
+                    f"torch_threads={torch.get_num_threads()}, max_pending={settings.INFERENCE_MAX_PENDING}"
+                )
+    return _executor
+
+
+async def run_blocking(fn: Callable[..., Any], *args, **kwargs) -> Any:
+    """
+    Выполняет блокирующую функцию в пуле инференса и ждёт результат,
+    не блокируя event loop
+    """
+    loop = asyncio.get_running_loop()
+    semaphore = _semaphores.get(loop)
+    if semaphore is None:
+        semaphore = _semaphores[loop] = asyncio.Semaphore(settings.INFERENCE_MAX_PENDING)
+
+    async with semaphore:
+        return await loop.run_in_executor(get_inference_executor(), partial(fn, *args, **kwargs))
+
+
+def shutdown_executor(wait: bool = True) -> None:
+    """
+    Останавливает пул. С wait=True блокирует до завершения задач —
+    из event loop вызывать через shutdown_executor_async
+    """
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=wait)
+            _executor = None
+            logger.info("Пул инференса остановлен")
+
+
+async def shutdown_executor_async() -> None:
+    """
+    Дожидается завершения задач пула в отдельном потоке, не блокируя event loop
+    """
+    await asyncio.get_running_loop().run_in_executor(None, shutdown_executor)
@@ -0,0 +1,309 @@
+# backend/app/core/jobs.py
+
+import asyncio
+import json
+import os
+import time
+import uuid
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Set
+
+from ..config import settings
+from ..utils.csv_tools import count_table_rows, iter_table_chunks
+from ..utils.file_handler import UPLOAD_DIR, write_output_csv
+from ..utils.logger import get_logger
+from .executor import run_blocking
+
+logger = get_logger(__name__)
+
+# --------------------------------------------------------
+# Фоновые задачи пакетной обработки CSV / Parquet / Arrow
+# --------------------------------------------------------
+#
+# Состояние задачи — JSON в общем кэше (LocalCache или Redis) под ключом
+# job:{id}; id задач — во множестве jobs:index (SADD, атомарно для
+# нескольких процессов). Файл обрабатывается чанками
+# по JOB_CHUNK_SIZE строк; после записи каждого чанка в output-файл
+# сохраняется контрольная точка (строк обработано, размер output-файла).
+# Перезапущенный воркер продолжает с последней точки: output обрезается
+# до сохранённого размера, уже обработанные строки пропускаются.
+# Output всегда CSV: дозапись и обрезка по контрольной точке
+# для Parquet невозможны.
+# С Redis задачи переживают рестарт процесса, с LocalCache — нет.
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+_INDEX_KEY = "jobs:index"
+
+
+def _job_key(job_id: str) -> str:
+    return f"job:{job_id}"
+
+
+def _truncate(path: Path, size: int) -> None:
+    if path.exists() and path.stat().st_size > size:
+        with path.open("r+b") as f:
+            f.truncate(size)
+
+
+# --------------------------------------------------------
+# Класс JobManager
+# --------------------------------------------------------
+
+class JobManager:
+    """
+    Очередь фоновых задач и пул из JOB_WORKERS асинхронных воркеров.
+    Инференс и ввод-вывод выполняются в пуле потоков (run_blocking),
+    event loop остаётся свободным для API.
+    """
+
+    def __init__(self, store: Any, predict_factory: Callable[[], Callable[[List[str]], List[int]]], workers: Optional[int] = None):
+        self.store = store
+        self.predict_factory = predict_factory
+        self.workers = workers or settings.JOB_WORKERS
+        self.owner = f"{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+        self._retries: List[asyncio.TimerHandle] = []
+        self._claimed: Set[str] = set()
+        self._enqueued: Set[str] = set()
+
+    # ----------------------------------------------------
+    # Состояние задач в кэше
+    # ----------------------------------------------------
+    async def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        raw = await self.store.get(_job_key(job_id))
+        return json.loads(raw) if raw else None
+
+    async def _save(self, job: Dict[str, Any]) -> None:
+        job["updated_at"] = time.time()
+        await self.store.set(_job_key(job["id"]), json.dumps(job, ensure_ascii=False), ex=settings.JOB_TTL)
+
+    async def _index(self) -> List[str]:
+        """
+        Id задач из индекса. Id, чьё состояние истекло по JOB_TTL,
+        удаляются из индекса, поэтому он не растёт бесконечно.
+        """
+        members = await self.store.smembers(_INDEX_KEY)
+        ids = sorted(member.decode() if isinstance(member, bytes) else member for member in members)
+        if not ids:
+            return []
+        states = await self.store.mget([_job_key(job_id) for job_id in ids])
+        expired = [job_id for job_id, raw in zip(ids, states) if raw is None]
+        if expired:
+            await self.store.srem(_INDEX_KEY, *expired)
+        return [job_id for job_id, raw in zip(ids, states) if raw is not None]
+
+    async def _add_to_index(self, job_id: str) -> None:
+        # SADD атомарен: одновременные submit из разных процессов не теряют id
+        await self.store.sadd(_INDEX_KEY, job_id)
+        await self._index()
+
+    async def _lock_owner(self, job_id: str) -> Optional[str]:
+        owner = await self.store.get(f"{_job_key(job_id)}:lock")
+        return owner.decode() if isinstance(owner, bytes) else owner
+
+    async def _claim(self, job_id: str) -> bool:
+        # Захват задачи одним воркером (актуально для нескольких API-процессов с Redis)
+        key = f"{_job_key(job_id)}:lock"
+        if await self.store.set(key, self.owner, ex=settings.JOB_LOCK_TTL, nx=True) or await self._lock_owner(job_id) == self.owner:
+            self._claimed.add(job_id)
+            return True
+        return False
+
+    async def _renew(self, job_id: str) -> bool:
+        # Продлеваем только свой захват: чужой (после истечения нашего) не перезаписываем
+        if await self._lock_owner(job_id) != self.owner:
+            return False
+        await self.store.expire(f"{_job_key(job_id)}:lock", settings.JOB_LOCK_TTL)
+        return True
+
+    async def _release(self, job_id: str) -> None:
+        self._claimed.discard(job_id)
+        if await self._lock_owner(job_id) == self.owner:
+            await self.store.delete(f"{_job_key(job_id)}:lock")
+
+    async def _retry_later(self, job_id: str) -> None:
+        """
+        Задачу держит другой владелец: повторяем попытку, когда истечёт его захват.
+        Если он жив и продлевает захват, задача к тому времени будет завершена
+        и повтор ничего не сделает; если владелец упал — задачу подхватим мы.
+        """
+        ttl = await self.store.ttl(f"{_job_key(job_id)}:lock")
+        delay = max(ttl, 1)
+        loop = asyncio.get_running_loop()
+        self._retries = [handle for handle in self._retries if not handle.cancelled()]
+        self._retries.append(loop.call_later(delay, self._enqueue, job_id))
+        logger.info(f"Задача {job_id} захвачена другим воркером, повтор через {delay} с")
+
+    # ----------------------------------------------------
+    # Публичный API
+    # ----------------------------------------------------
+    async def submit(self, input_path: str, filename: Optional[str] = None, chunksize: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Регистрирует задачу для уже сохранённого файла и ставит её в очередь.
+        Воркеры её не подхватят до start() — он вызывается после загрузки модели.
+        """
+        job_id = uuid.uuid4().hex
+        job = {
+            "id": job_id,
+            "status": QUEUED,
+            "filename": filename or Path(input_path).name,
+            "input_path": str(input_path),
+            "output_file": f"results_{job_id}.csv",
+            "chunksize": chunksize or settings.JOB_CHUNK_SIZE,
+            "total_rows": await run_blocking(count_table_rows, str(input_path)),
+            "rows_done": 0,
+            "chunks_done": 0,
+            "output_bytes": 0,
+            "rows_per_sec": 0.0,
+            "eta_s": None,
+            "created_at": time.time(),
+            "error": None,
+        }
+        await self._save(job)
+        await self._add_to_index(job_id)
+        self._enqueue(job_id)
+        logger.info(f"Задача {job_id} поставлена в очередь. Файл: {job['filename']}, строк: {job['total_rows']}")
+        return job
+
+    def output_path(self, job: Dict[str, Any]) -> Path:
+        return UPLOAD_DIR / job["output_file"]
+
+    # ----------------------------------------------------
+    # Запуск / остановка воркеров
+    # ----------------------------------------------------
+    def _enqueue(self, job_id: str) -> None:
+        # Задача, поставленная до start(), не попадёт в очередь второй раз
+        # при возобновлении незавершённых задач
+        if job_id in self._enqueued:
+            return
+        if self._queue is None:
+            self._queue = asyncio.Queue()
+        self._enqueued.add(job_id)
+        self._queue.put_nowait(job_id)
+
+    def _ensure_started(self) -> None:
+        if self._queue is None:
+            self._queue = asyncio.Queue()
+        self._tasks = [task for task in self._tasks if not task.done()]
+        loop = asyncio.get_running_loop()
+        while len(self._tasks) < self.workers:
+            self._tasks.append(loop.create_task(self._worker()))
+
+    async def start(self) -> int:
+        """
+        Запускает воркеров и возвращает в очередь незавершённые задачи
+        (после рестарта они продолжатся с последней контрольной точки)
+        """
+        self._ensure_started()
+        resumed = 0
+        for job_id in await self._index():
+            job = await self.get(job_id)
+            if job is not None and job["status"] in (QUEUED, RUNNING) and job_id not in self._enqueued:
+                self._enqueue(job_id)
+                resumed += 1
+        if resumed:
+            logger.info(f"Возобновлено незавершённых задач: {resumed}")
+        return resumed
+
+    async def stop(self) -> None:
+        for handle in self._retries:
+            handle.cancel()
+        self._retries = []
+        for task in self._tasks:
+            task.cancel()
+        for task in self._tasks:
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        self._tasks = []
+        # Прогресс сохранён в контрольных точках: освобождаем захваты, чтобы
+        # перезапущенный процесс (с другим owner) сразу продолжил задачи
+        for job_id in list(self._claimed):
+            await self._release(job_id)
+
+    async def _worker(self) -> None:
+        while True:
+            job_id = await self._queue.get()
+            try:
+                await self._process(job_id)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.exception(f"Задача {job_id} завершилась с ошибкой")
+                job = await self.get(job_id)
+                if job is not None:
+                    job["status"] = FAILED
+                    job["error"] = str(e)
+                    await self._save(job)
+                await self._release(job_id)
+            finally:
+                self._enqueued.discard(job_id)
+                self._queue.task_done()
+
+    # ----------------------------------------------------
+    # Обработка задачи чанками с контрольными точками
+    # ----------------------------------------------------
+    async def _process(self, job_id: str) -> None:
+        job = await self.get(job_id)
+        if job is None or job["status"] in (DONE, FAILED):
+            return
+        if not await self._claim(job_id):
+            await self._retry_later(job_id)
+            return
+
+        output_path = self.output_path(job)
+        # Всё, что записано после последней контрольной точки, будет записано заново
+        await run_blocking(_truncate, output_path, job["output_bytes"])
+
+        job["status"] = RUNNING
+        job["started_at"] = job.get("started_at") or time.time()
+        await self._save(job)
+
+        # Фабрика может ждать загрузки модели (container.lock) — не на event loop
+        predict = await run_blocking(self.predict_factory)
+        skip = job["rows_done"]
+        reader = iter_table_chunks(job["input_path"], job["chunksize"], skip_rows=skip)
+        run_start, run_rows = time.perf_counter(), 0
+        try:
+            while True:
+                chunk = await run_blocking(next, reader, None)
+                if chunk is None:
+                    break
+                if "text" not in chunk.columns:
+                    raise ValueError("CSV должен содержать колонку 'text'")
+
+                texts = chunk["text"].fillna("").astype(str).tolist()
+                chunk["predicted_label"] = await run_blocking(predict, texts)
+                await run_blocking(write_output_csv, chunk, job["output_file"], True)
+
+                # Контрольная точка: чанк целиком записан
+                run_rows += len(chunk)
+                elapsed = time.perf_counter() - run_start
+                job["rows_done"] += len(chunk)
+                job["chunks_done"] += 1
+                job["output_bytes"] = output_path.stat().st_size
+                job["rows_per_sec"] = round(run_rows / elapsed, 1) if elapsed > 0 else 0.0
+                remaining = max(job["total_rows"] - job["rows_done"], 0)
+                job["eta_s"] = round(remaining / job["rows_per_sec"], 1) if job["rows_per_sec"] else None
+                await self._save(job)
+                if not await self._renew(job_id):
+                    # Захват истёк и перешёл к другому воркеру — он продолжит с этой точки
+                    logger.warning(f"Задача {job_id}: захват потерян, обработка передана другому воркеру")
+                    self._claimed.discard(job_id)
+                    return
+        finally:
+            reader.close()
+
+        job["status"] = DONE
+        job["total_rows"] = job["rows_done"]
+        job["eta_s"] = 0.0
+        job["finished_at"] = time.time()
+        await self._save(job)
+        await self._release(job_id)
+        logger.info(f"Задача {job_id} завершена. Строк: {job['rows_done']}, {job['rows_per_sec']} строк/сек")
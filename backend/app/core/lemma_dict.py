@@ -0,0 +1,210 @@
+# backend/app/core/lemma_dict.py
+
+from pathlib import Path
+from threading import Lock
+from typing import Dict, Iterable, List, Optional, Union
+import json
+import struct
+
+import pandas as pd
+
+from ..config import settings
+from ..utils.logger import get_logger
+from ..utils.mmap_file import HEADER, MappedFile
+
+logger = get_logger(__name__)
+
+# --------------------------------------------------------
+# Бинарный формат таблицы словоформа → лемма
+# --------------------------------------------------------
+#
+# Все числа — little-endian uint32.
+#
+#   header          : magic "LEMM", version, n_forms, n_lemmas
+#   form_offsets    : n_forms + 1   (смещения в блоке словоформ)
+#   lemma_ids       : n_forms       (индекс леммы для словоформы)
+#   lemma_offsets   : n_lemmas + 1  (смещения в блоке лемм)
+#   forms blob      : UTF-8 словоформы, отсортированные побайтово
+#   lemmas blob     : UTF-8 уникальные леммы
+#
+# Файл открывается через mmap (utils.mmap_file), поэтому несколько
+# процессов разделяют одну копию таблицы через page cache.
+
+MAGIC = b"LEMM"
+VERSION = 1
+
+
+def write_lemma_table(mapping: Dict[str, str], path: Union[str, Path]) -> Path:
+    """
+    Записывает словарь словоформа → лемма в компактный бинарный файл
+    """
+    path = Path(path)
+    forms = sorted((form.encode("utf-8") for form in mapping), key=bytes)
+
+    lemma_index: Dict[str, int] = {}
+    lemmas: List[bytes] = []
+    lemma_ids: List[int] = []
+    for form in forms:
+        lemma = mapping[form.decode("utf-8")]
+        if lemma not in lemma_index:
+            lemma_index[lemma] = len(lemmas)
+            lemmas.append(lemma.encode("utf-8"))
+        lemma_ids.append(lemma_index[lemma])
+
+    def offsets(blobs: List[bytes]) -> List[int]:
+        result = [0]
+        for blob in blobs:
+            result.append(result[-1] + len(blob))
+        return result
+
+    form_offsets = offsets(forms)
+    lemma_offsets = offsets(lemmas)
+
+    with path.open("wb") as f:
+        f.write(HEADER.pack(MAGIC, VERSION, len(forms), len(lemmas)))
+        f.write(struct.pack(f"<{len(form_offsets)}I", *form_offsets))
+        f.write(struct.pack(f"<{len(lemma_ids)}I", *lemma_ids))
+        f.write(struct.pack(f"<{len(lemma_offsets)}I", *lemma_offsets))
+        f.write(b"".join(forms))
+        f.write(b"".join(lemmas))
+
+    logger.info(f"Таблица лемм сохранена: {path}. Словоформ: {len(forms)}, лемм: {len(lemmas)}")
+    return path
+
+
+# --------------------------------------------------------
+# Класс LemmaTable — чтение таблицы через mmap
+# --------------------------------------------------------
+
+class LemmaTable:
+    """
+    Таблица словоформа → лемма, отображённая в память.
+    Открытие занимает O(1), поиск — двоичный поиск по отсортированным словоформам.
+    """
+
+    def __init__(self, path: Union[str, Path]):
+        self._data = MappedFile(path, MAGIC, VERSION)
+        self.path = self._data.path
+        try:
+            n_forms, n_lemmas = self._data.counts
+            self._form_offsets = self._data.uint32_array(n_forms + 1)
+            self._lemma_ids = self._data.uint32_array(n_forms)
+            self._lemma_offsets = self._data.uint32_array(n_lemmas + 1)
+            self._forms_start = self._data.pos
+            self._lemmas_start = self._forms_start + self._form_offsets[n_forms]
+            self._data.require(self._lemmas_start + self._lemma_offsets[n_lemmas])
+        except (ValueError, struct.error, OSError):
+            # Усечённый или повреждённый файл: не оставляем открытый дескриптор
+            self._data.close()
+            raise
+
+        self.n_forms = n_forms
+        self.n_lemmas = n_lemmas
+        self._mm = self._data.mm
+        logger.info(f"Таблица лемм открыта: {self.path}. Словоформ: {n_forms}")
+
+    def get(self, token: str) -> Optional[str]:
+        """
+        Возвращает лемму словоформы или None, если её нет в таблице
+        """
+        key = token.encode("utf-8")
+        mm = self._mm
+        offsets = self._form_offsets
+        base = self._forms_start
+
+        lo, hi = 0, self.n_forms
+        while lo < hi:
+            mid = (lo + hi) // 2
+            candidate = mm[base + offsets[mid]:base + offsets[mid + 1]]
+            if candidate < key:
+                lo = mid + 1
+            elif candidate > key:
+                hi = mid
+            else:
+                lemma_id = self._lemma_ids[mid]
+                start = self._lemmas_start + self._lemma_offsets[lemma_id]
+                end = self._lemmas_start + self._lemma_offsets[lemma_id + 1]
+                return mm[start:end].decode("utf-8")
+        return None
+
+    def __contains__(self, token: str) -> bool:
+        return self.get(token) is not None
+
+    def __len__(self) -> int:
+        return self.n_forms
+
+    def close(self) -> None:
+        self._data.close()
+
+
+# --------------------------------------------------------
+# Общая таблица на процесс
+# --------------------------------------------------------
+
+_table: Optional[LemmaTable] = None
+_table_loaded = False
+_table_lock = Lock()
+
+
+def get_lemma_table() -> Optional[LemmaTable]:
+    """
+    Лениво открывает таблицу лемм из settings.LEMMA_TABLE_PATH.
+    Если файла нет, возвращает None и лемматизация идёт через pymorphy2.
+    """
+    global _table, _table_loaded
+    if not _table_loaded:
+        with _table_lock:
+            if not _table_loaded:
+                path = settings.LEMMA_TABLE_PATH
+                if path and Path(path).exists():
+                    try:
+                        _table = LemmaTable(path)
+                    except (ValueError, struct.error, OSError) as e:
+                        logger.warning(f"Таблица лемм не загружена, лемматизация через pymorphy2: {e}")
+                _table_loaded = True
+    return _table
+
+
+# --------------------------------------------------------
+# Построение таблицы по словарю модели и обучающему корпусу
+# --------------------------------------------------------
+
+def build_lemma_table(
+    vocab_path: Union[str, Path],
+    corpus_paths: Iterable[Union[str, Path]] = (),
+    out_path: Optional[Union[str, Path]] = None,
+    text_column: str = "text",
+) -> Path:
+    """
+    Лемматизирует все словоформы из vocab.json и обучающих CSV
+    и сохраняет бинарную таблицу для Normalizer
+    """
+    # Импорт внутри функции: normalizer сам использует этот модуль
+    from .normalizer import Normalizer
+
+    out_path = out_path or settings.LEMMA_TABLE_PATH
+    forms = set()
+
+    vocab_path = Path(vocab_path)
+    if vocab_path.exists() and vocab_path.stat().st_size > 0:
+        with vocab_path.open("r", encoding="utf-8") as f:
+            forms.update(json.load(f).keys())
+
+    for corpus_path in corpus_paths:
+        if Path(corpus_path).stat().st_size == 0:
+            logger.warning(f"Пустой корпус пропущен: {corpus_path}")
+            continue
+        df = pd.read_csv(corpus_path)
+        for text in df[text_column].dropna().astype(str):
+            forms.update(Normalizer._tokenize(text))
+
+    normalizer = Normalizer()
+    mapping = {form: normalizer._parse_normal_form(form) for form in forms}
+    return write_lemma_table(mapping, out_path)
+
+
+if __name__ == "__main__":
+    build_lemma_table(
+        vocab_path=settings.MODELS_DIR / "vocab.json",
+        corpus_paths=[settings.DATA_DIR / "train.csv"],
+    )
@@ -0,0 +1,267 @@
+# backend/app/core/local_cache.py
+
+import sys
+import time
+from collections import OrderedDict
+from threading import Lock
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional
+
+from ..config import settings
+from ..utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+class _Entry(NamedTuple):
+    value: Any
+    expires_at: Optional[float]
+    size: int
+
+
+def _sizeof(key: str, value: Any) -> int:
+    # Оценка без обхода вложенных объектов: в кэше лежат строки, байты и числа
+    return sys.getsizeof(key) + sys.getsizeof(value)
+
+# --------------------------------------------------------
+# Класс LocalCache — in-memory замена Redis
+# --------------------------------------------------------
+
+class LocalCache:
+    """
+    In-memory кэш с интерфейсом redis.asyncio (get/set(ex=)/mget/delete/incr/expire/ttl
+    и множества sadd/srem/smembers).
+    Используется, когда USE_REDIS_CACHE=False.
+
+    - TTL на ключ: просроченные записи удаляются лениво при чтении
+      и периодически — не чаще раза в purge_interval при любой операции;
+    - ограничение по числу ключей и по суммарному размеру, вытеснение по LRU
+      (evict=False — без вытеснения, только TTL: для данных, которые
+      нельзя терять, например состояния фоновых задач);
+    - статистика: размер, попадания/промахи, вытеснения, истечения.
+    """
+
+    def __init__(
+        self,
+        max_entries: Optional[int] = None,
+        max_bytes: Optional[int] = None,
+        purge_interval: Optional[float] = None,
+        evict: bool = True,
+    ):
+        self.evict = evict
+        self.max_entries = max_entries or settings.LOCAL_CACHE_MAX_ENTRIES
+        self.max_bytes = max_bytes or settings.LOCAL_CACHE_MAX_BYTES
+        self.purge_interval = settings.LOCAL_CACHE_PURGE_INTERVAL if purge_interval is None else purge_interval
+
+        self._store: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._bytes = 0
+        self._lock = Lock()
+        self._next_purge = time.monotonic() + self.purge_interval
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    # ----------------------------------------------------
+    # Внутренние операции (вызываются под блокировкой)
+    # ----------------------------------------------------
+    def _remove(self, key: str) -> None:
+        entry = self._store.pop(key)
+        self._bytes -= entry.size
+
+    def _lookup(self, key: str, now: float) -> Optional[_Entry]:
+        entry = self._store.get(key)
+        if entry is None:
+            return None
+        if entry.expires_at is not None and entry.expires_at <= now:
+            self._remove(key)
+            self.expirations += 1
+            return None
+        return entry
+
+    def _put(self, key: str, value: Any, expires_at: Optional[float]) -> None:
+        if key in self._store:
+            self._remove(key)
+        entry = _Entry(value, expires_at, _sizeof(key, value))
+        self._store[key] = entry
+        self._bytes += entry.size
+        while self.evict and self._store and (len(self._store) > self.max_entries or self._bytes > self.max_bytes):
+            oldest = next(iter(self._store))
+            self._remove(oldest)
+            self.evictions += 1
+
+    def _maybe_purge(self, now: float) -> None:
+        if now < self._next_purge:
+            return
+        self._next_purge = now + self.purge_interval
+        expired = [key for key, entry in self._store.items() if entry.expires_at is not None and entry.expires_at <= now]
+        for key in expired:
+            self._remove(key)
+        self.expirations += len(expired)
+
+    @staticmethod
+    def _expires_at(now: float, ex: Optional[float], px: Optional[float]) -> Optional[float]:
+        if ex:
+            return now + ex
+        if px:
+            return now + px / 1000
+        return None
+
+    # ----------------------------------------------------
+    # Синхронный API (для кода вне event loop)
+    # ----------------------------------------------------
+    def get_sync(self, key: str) -> Any:
+        now = time.monotonic()
+        with self._lock:
+            self._maybe_purge(now)
+            entry = self._lookup(key, now)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._store.move_to_end(key)
+            self.hits += 1
+            return entry.value
+
+    def set_sync(self, key: str, value: Any, ex: Optional[float] = None, px: Optional[float] = None, nx: bool = False) -> bool:
+        now = time.monotonic()
+        with self._lock:
+            self._maybe_purge(now)
+            if nx and self._lookup(key, now) is not None:
+                return False
+            self._put(key, value, self._expires_at(now, ex, px))
+            return True
+
+    def delete_sync(self, *keys: str) -> int:
+        with self._lock:
+            removed = 0
+            for key in keys:
+                if key in self._store:
+                    self._remove(key)
+                    removed += 1
+            return removed
+
+    def incr_sync(self, key: str, amount: int = 1) -> int:
+        now = time.monotonic()
+        with self._lock:
+            self._maybe_purge(now)
+            entry = self._lookup(key, now)
+            value = int(entry.value) + amount if entry is not None else amount
+            # Как в Redis: INCR сохраняет TTL существующего ключа
+            self._put(key, value, entry.expires_at if entry is not None else None)
+            return value
+
+    def expire_sync(self, key: str, seconds: float) -> bool:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._lookup(key, now)
+            if entry is None:
+                return False
+            self._store[key] = entry._replace(expires_at=now + seconds)
+            return True
+
+    def ttl_sync(self, key: str) -> int:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._lookup(key, now)
+            if entry is None:
+                return -2
+            if entry.expires_at is None:
+                return -1
+            return int(entry.expires_at - now)
+
+    def sadd_sync(self, key: str, *members: Any) -> int:
+        now = time.monotonic()
+        with self._lock:
+            self._maybe_purge(now)
+            entry = self._lookup(key, now)
+            current = entry.value if entry is not None else frozenset()
+            updated = current | frozenset(members)
+            self._put(key, updated, entry.expires_at if entry is not None else None)
+            return len(updated) - len(current)
+
+    def srem_sync(self, key: str, *members: Any) -> int:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._lookup(key, now)
+            if entry is None:
+                return 0
+            remaining = entry.value - frozenset(members)
+            # Как в Redis: пустое множество удаляется вместе с ключом
+            if remaining:
+                self._put(key, remaining, entry.expires_at)
+            else:
+                self._remove(key)
+            return len(entry.value) - len(remaining)
+
+    def smembers_sync(self, key: str) -> set:
+        value = self.get_sync(key)
+        return set(value) if value else set()
+
+    def purge(self) -> int:
+        """
+        Принудительно удаляет все просроченные записи, возвращает их число
+        """
+        with self._lock:
+            before = self.expirations
+            self._next_purge = 0.0
+            self._maybe_purge(time.monotonic())
+            return self.expirations - before
+
+    # ----------------------------------------------------
+    # Асинхронный API, совместимый с redis.asyncio
+    # ----------------------------------------------------
+    async def get(self, key: str) -> Any:
+        return self.get_sync(key)
+
+    async def mget(self, keys: Iterable[str]) -> List[Any]:
+        return [self.get_sync(key) for key in keys]
+
+    async def set(self, key: str, value: Any, ex: Optional[float] = None, px: Optional[float] = None, nx: bool = False) -> bool:
+        return self.set_sync(key, value, ex=ex, px=px, nx=nx)
+
+    async def delete(self, *keys: str) -> int:
+        return self.delete_sync(*keys)
+
+    async def exists(self, *keys: str) -> int:
+        return sum(self.get_sync(key) is not None for key in keys)
+
+    async def incr(self, key: str, amount: int = 1) -> int:
+        return self.incr_sync(key, amount)
+
+    async def expire(self, key: str, seconds: float) -> bool:
+        return self.expire_sync(key, seconds)
+
+    async def ttl(self, key: str) -> int:
+        return self.ttl_sync(key)
+
+    async def sadd(self, key: str, *members: Any) -> int:
+        return self.sadd_sync(key, *members)
+
+    async def srem(self, key: str, *members: Any) -> int:
+        return self.srem_sync(key, *members)
+
+    async def smembers(self, key: str) -> set:
+        return self.smembers_sync(key)
+
+    async def ping(self) -> bool:
+        return True
+
+    # ----------------------------------------------------
+    # Метрики
+    # ----------------------------------------------------
+    def __len__(self) -> int:
+        return len(self._store)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._store),
+            "bytes": self._bytes,
+            "max_entries": self.max_entries,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
@@ -1,13 +1,112 @@
 # backend/app/core/normalizer.py
 
-from typing import List
+from collections import OrderedDict, deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from itertools import chain, islice
+from threading import Lock
+from typing import Callable, Deque, Dict, Iterable, Iterator, List, Optional
+import os
 import re
 
 import pymorphy2
+from ..config import settings
+from .lemma_dict import LemmaTable, get_lemma_table
 from ..utils.logger import get_logger
 
 logger = get_logger(__name__)
 
+# --------------------------------------------------------
+# LRU-кэш словоформа → лемма
+# --------------------------------------------------------
+
+class LemmaCache:
+    """
+    Ограниченный кэш лемм с вытеснением по LRU.
+    Словоформы в отзывах распределены по закону Ципфа,
+    поэтому небольшой кэш покрывает большую часть токенов.
+    """
+
+    def __init__(self, maxsize: int = 100_000):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._data: "OrderedDict[str, str]" = OrderedDict()
+        self._lock = Lock()
+
+    def get_or_compute(self, token: str, compute: Callable[[str], str]) -> str:
+        """
+        Возвращает лемму из кэша или вычисляет её через compute
+        """
+        if self.maxsize <= 0:
+            return compute(token)
+
+        with self._lock:
+            lemma = self._data.get(token)
+            if lemma is not None:
+                self._data.move_to_end(token)
+                self.hits += 1
+                return lemma
+            self.misses += 1
+
+        lemma = compute(token)
+
+        with self._lock:
+            self._data[token] = lemma
+            self._data.move_to_end(token)
+            if len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+        return lemma
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> Dict[str, float]:
+        """
+        Статистика кэша: размер, попадания, промахи, доля попаданий
+        """
+        total = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+# Общий кэш для всех экземпляров Normalizer в процессе
+lemma_cache = LemmaCache(maxsize=settings.LEMMA_CACHE_SIZE)
+
+# --------------------------------------------------------
+# Общий MorphAnalyzer на процесс
+# --------------------------------------------------------
+
+_morph: Optional[pymorphy2.MorphAnalyzer] = None
+_morph_lock = Lock()
+
+
+def get_morph_analyzer() -> pymorphy2.MorphAnalyzer:
+    """
+    Возвращает единственный на процесс MorphAnalyzer.
+    Словари загружаются лениво при первом обращении; разбор
+    словоформ только читает словари, поэтому анализатор можно
+    использовать из нескольких потоков.
+    """
+    global _morph
+    if _morph is None:
+        with _morph_lock:
+            if _morph is None:
+                _morph = pymorphy2.MorphAnalyzer()
+                logger.info("MorphAnalyzer загружен")
+    return _morph
+
+
 # --------------------------------------------------------
 # Класс Normalizer
 # --------------------------------------------------------
@@ -16,16 +115,30 @@ class Normalizer:
     """
     Нормализатор текста:
     - токенизация
-    - лемматизация
+    - лемматизация (таблица лемм на диске → LRU-кэш → pymorphy2)
     - удаление стоп-слов (опционально)
     """
 
-    def __init__(self, remove_stopwords: bool = False, custom_stopwords: List[str] = None):
-        self.morph = pymorphy2.MorphAnalyzer()
+    def __init__(
+        self,
+        remove_stopwords: bool = False,
+        custom_stopwords: List[str] = None,
+        cache: Optional[LemmaCache] = None,
+        lemma_table: Optional[LemmaTable] = None,
+    ):
         self.remove_stopwords = remove_stopwords
         self.stopwords = set(custom_stopwords) if custom_stopwords else set()
+        self.cache = cache if cache is not None else lemma_cache
+        self.lemma_table = lemma_table if lemma_table is not None else get_lemma_table()
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._pool_workers = 0
+        self._pool_lock = Lock()
         logger.info(f"Normalizer инициализирован. remove_stopwords={self.remove_stopwords}")
 
+    @property
+    def morph(self) -> pymorphy2.MorphAnalyzer:
+        return get_morph_analyzer()
+
     # ----------------------------------------------------
     # Основной метод нормализации текста
     # ----------------------------------------------------
@@ -39,7 +152,17 @@ class Normalizer:
         if not isinstance(text, str):
             text = str(text)
 
-        tokens = self._tokenize(text)
+        return self.normalize_tokens(self._tokenize(text))
+
+    # ----------------------------------------------------
+    # Нормализация уже выделенных токенов
+    # ----------------------------------------------------
+    def normalize_tokens(self, tokens: Iterable[str]) -> str:
+        """
+        Лемматизация и удаление стоп-слов для готовой последовательности
+        токенов (в нижнем регистре). Позволяет подавать токены напрямую,
+        без повторной токенизации строки.
+        """
         lemmas = [self._lemmatize(token) for token in tokens]
 
         if self.remove_stopwords:
@@ -64,16 +187,156 @@ class Normalizer:
     # ----------------------------------------------------
     def _lemmatize(self, token: str) -> str:
         """
-        Возвращает нормальную форму слова с помощью pymorphy2
+        Возвращает нормальную форму слова: сначала из LRU-кэша (O(1) для
+        частых словоформ), при промахе — из предвычисленной таблицы
+        или через pymorphy2; результат кладётся в кэш
         """
-        lemma = self.morph.parse(token)[0].normal_form
-        return lemma
+        return self.cache.get_or_compute(token, self._lookup_normal_form)
+
+    def _lookup_normal_form(self, token: str) -> str:
+        if self.lemma_table is not None:
+            lemma = self.lemma_table.get(token)
+            if lemma is not None:
+                return lemma
+        return self._parse_normal_form(token)
+
+    def _parse_normal_form(self, token: str) -> str:
+        """
+        Разбор словоформы через pymorphy2 без кэширования
+        """
+        return self.morph.parse(token)[0].normal_form
 
     # ----------------------------------------------------
     # Вспомогательный метод: пакетная нормализация
     # ----------------------------------------------------
-    def normalize_list(self, texts: List[str]) -> List[str]:
+    def normalize_list(
+        self,
+        texts: List[str],
+        workers: Optional[int] = None,
+        chunk_size: Optional[int] = None,
+    ) -> List[str]:
+        """
+        Нормализация списка текстов.
+        Большие списки делятся на чанки и обрабатываются пулом процессов,
+        результаты возвращаются в исходном порядке. Для небольших входов
+        и workers <= 1 используется последовательная обработка.
+        """
+        return list(self.normalize_iter(texts, workers=workers, chunk_size=chunk_size))
+
+    # ----------------------------------------------------
+    # Потоковая нормализация
+    # ----------------------------------------------------
+    def normalize_iter(
+        self,
+        texts: Iterable[str],
+        workers: Optional[int] = None,
+        chunk_size: Optional[int] = None,
+    ) -> Iterator[str]:
         """
-        Нормализация списка текстов
+        Лениво нормализует любой итерируемый источник текстов
+        (строки файла, чанки CSV и т.п.), сохраняя порядок.
+        В памяти одновременно находится не больше нескольких чанков.
         """
-        return [self.normalize(text) for text in texts]
+        workers = workers if workers is not None else settings.NORMALIZE_WORKERS
+        if workers <= 0:
+            workers = os.cpu_count() or 1
+        chunk_size = chunk_size or settings.NORMALIZE_CHUNK_SIZE
+
+        texts = iter(texts)
+        if workers <= 1:
+            for text in texts:
+                yield self.normalize(text)
+            return
+
+        # Небольшие входы не окупают запуск пула процессов
+        head = list(islice(texts, settings.NORMALIZE_PARALLEL_MIN_TEXTS))
+        if len(head) < settings.NORMALIZE_PARALLEL_MIN_TEXTS:
+            for text in head:
+                yield self.normalize(text)
+            return
+
+        logger.info(f"Параллельная нормализация: чанки по {chunk_size} текстов, {workers} процессов")
+        chunks = _iter_chunks(chain(head, texts), chunk_size)
+
+        pool = self._get_pool(workers)
+        # Очередь ограничена, чтобы не читать весь источник заранее;
+        # результаты отдаются строго в порядке отправки чанков
+        pending: Deque[Future] = deque()
+        try:
+            for chunk in chunks:
+                pending.append(pool.submit(_normalize_chunk, chunk))
+                if len(pending) >= workers * 2:
+                    yield from pending.popleft().result()
+            while pending:
+                yield from pending.popleft().result()
+        finally:
+            for future in pending:
+                future.cancel()
+
+    # ----------------------------------------------------
+    # Пул процессов: один на экземпляр, создаётся при первом вызове
+    # ----------------------------------------------------
+    def _get_pool(self, workers: int) -> ProcessPoolExecutor:
+        """
+        Пул переиспользуется между вызовами normalize_iter: процессы и их
+        MorphAnalyzer поднимаются один раз. Пересоздаётся только при смене
+        числа процессов.
+        """
+        with self._pool_lock:
+            if self._pool is not None and self._pool_workers != workers:
+                self._pool.shutdown(wait=True)
+                self._pool = None
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(
+                    max_workers=workers,
+                    initializer=_init_worker,
+                    initargs=(self.remove_stopwords, list(self.stopwords)),
+                )
+                self._pool_workers = workers
+            return self._pool
+
+    def close(self) -> None:
+        """
+        Останавливает пул процессов (если он был запущен)
+        """
+        with self._pool_lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=True)
+                self._pool = None
+                self._pool_workers = 0
+
+    # ----------------------------------------------------
+    # Статистика кэша лемм
+    # ----------------------------------------------------
+    def cache_stats(self) -> Dict[str, float]:
+        return self.cache.stats()
+
+
+# --------------------------------------------------------
+# Воркеры пула процессов для normalize_list / normalize_iter
+# --------------------------------------------------------
+
+def _iter_chunks(texts: Iterable[str], chunk_size: int) -> Iterator[List[str]]:
+    texts = iter(texts)
+    while True:
+        chunk = list(islice(texts, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+
+_worker_normalizer: Optional[Normalizer] = None
+
+
+def _init_worker(remove_stopwords: bool, stopwords: List[str]) -> None:
+    """
+    Инициализация процесса-воркера: один Normalizer и один
+    MorphAnalyzer на весь срок жизни процесса
+    """
+    global _worker_normalizer
+    _worker_normalizer = Normalizer(remove_stopwords=remove_stopwords, custom_stopwords=stopwords)
+    get_morph_analyzer()
+
+
+def _normalize_chunk(texts: List[str]) -> List[str]:
+    return [_worker_normalizer.normalize(text) for text in texts]
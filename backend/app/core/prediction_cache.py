@@ -0,0 +1,155 @@
+# backend/app/core/prediction_cache.py
+
+import hashlib
+import inspect
+import json
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from ..config import settings
+from ..utils.logger import get_logger
+from .dedup import dedup_key, dedup_keys
+from .executor import run_blocking
+
+logger = get_logger(__name__)
+
+Prediction = Tuple[int, List[float]]
+
+
+async def _maybe_await(value: Any) -> Any:
+    # Хранилище может быть как асинхронным (LocalCache, redis.asyncio), так и синхронным
+    if inspect.isawaitable(value):
+        return await value
+    return value
+
+
+def model_fingerprint() -> str:
+    """
+    Короткий хэш настроек, от которых зависит предсказание: переключение
+    любой из них не отдаёт результаты, посчитанные в другом режиме
+    """
+    parts = (
+        f"cascade={settings.LEXICON_CASCADE}:{settings.CONFIDENCE_THRESHOLD}",
+        f"int8={settings.QUANTIZE_INT8}",
+        f"packed={settings.PACKED_SEQUENCES}",
+        f"torchscript={settings.USE_TORCHSCRIPT}",
+    )
+    return hashlib.sha1("|".join(parts).encode("utf-8")).hexdigest()[:8]
+
+# --------------------------------------------------------
+# Класс PredictionCache
+# --------------------------------------------------------
+
+class PredictionCache:
+    """
+    Кэш предсказаний с адресацией по содержимому.
+    Ключ — sha1 от нормализованного текста, версия модели и отпечаток
+    настроек, меняющих её выход (model_fingerprint); значение —
+    метка и вероятности классов. Хранилище — LocalCache или клиент Redis,
+    TTL и ограничение размера обеспечивает само хранилище.
+
+    Нормализация здесь та же, что видит модель (Normalizer._tokenize:
+    нижний регистр, только буквы и цифры), а выход модели для текста
+    не зависит от соседей по батчу (паддинг обрезается только
+    в packed-режиме), поэтому тексты с одинаковым ключом при одних
+    и тех же настройках дают одинаковое предсказание.
+    """
+
+    def __init__(self, backend: Any, model_version: Optional[str] = None, ttl: Optional[int] = None):
+        self.backend = backend
+        self.model_version = model_version or settings.MODEL_VERSION
+        self.ttl = ttl or settings.PREDICTION_CACHE_TTL
+        self.hits = 0
+        self.misses = 0
+
+    def key(self, text: str) -> str:
+        return self._keys([dedup_key(text)])[0]
+
+    def _keys(self, normalized: List[str]) -> List[str]:
+        prefix = f"pred:{self.model_version}:{model_fingerprint()}:"
+        return [prefix + hashlib.sha1(text.encode("utf-8")).hexdigest() for text in normalized]
+
+    def _cache_keys(self, texts: List[str], normalized: Optional[List[str]]) -> List[str]:
+        return self._keys(normalized if normalized is not None else dedup_keys(texts))
+
+    @staticmethod
+    def _decode(values: List[Optional[str]]) -> List[Optional[Prediction]]:
+        results: List[Optional[Prediction]] = []
+        for value in values:
+            if value is None:
+                results.append(None)
+            else:
+                payload = json.loads(value)
+                results.append((payload["label"], payload["probs"]))
+        return results
+
+    @staticmethod
+    def _encode(items: Dict[str, Prediction]) -> Dict[str, str]:
+        return {key: json.dumps({"label": label, "probs": probs}) for key, (label, probs) in items.items()}
+
+    # ----------------------------------------------------
+    # Предсказание с учётом кэша
+    # ----------------------------------------------------
+    async def predict(
+        self,
+        texts: List[str],
+        infer: Callable[[List[str]], Awaitable[List[Prediction]]],
+        normalized: Optional[List[str]] = None,
+    ) -> List[Prediction]:
+        """
+        Возвращает (метка, вероятности) для каждого текста.
+        Для попаданий токенизация и forward не выполняются;
+        промахи отправляются в infer одним батчем и записываются в кэш.
+        normalized — уже посчитанные dedup_key текстов (тогда тексты здесь не токенизируются).
+        Нормализация, sha1 и разбор JSON выполняются в пуле (run_blocking), не в event loop.
+        """
+        if not texts:
+            return []
+
+        keys = await run_blocking(self._cache_keys, texts, normalized)
+        results = await run_blocking(self._decode, await self._get_many(keys))
+        miss_idx = [i for i, result in enumerate(results) if result is None]
+
+        self.hits += len(texts) - len(miss_idx)
+        self.misses += len(miss_idx)
+
+        if miss_idx:
+            computed = await infer([texts[i] for i in miss_idx])
+            for i, (label, probs) in zip(miss_idx, computed):
+                results[i] = (label, probs)
+            await self._set_many({keys[i]: results[i] for i in miss_idx})
+
+        return results
+
+    # ----------------------------------------------------
+    # Работа с хранилищем
+    # ----------------------------------------------------
+    async def _get_many(self, keys: List[str]) -> List[Optional[str]]:
+        if hasattr(self.backend, "mget"):
+            return list(await _maybe_await(self.backend.mget(keys)))
+        return [await _maybe_await(self.backend.get(key)) for key in keys]
+
+    async def _set_many(self, items: Dict[str, Prediction]) -> None:
+        values = await run_blocking(self._encode, items)
+        if hasattr(self.backend, "pipeline"):
+            # Redis: все записи одним round trip
+            async with self.backend.pipeline(transaction=False) as pipe:
+                for key, value in values.items():
+                    pipe.set(key, value, ex=self.ttl)
+                await pipe.execute()
+        else:
+            for key, value in values.items():
+                await _maybe_await(self.backend.set(key, value, ex=self.ttl))
+
+    # ----------------------------------------------------
+    # Метрики
+    # ----------------------------------------------------
+    def stats(self) -> Dict[str, float]:
+        total = self.hits + self.misses
+        return {
+            "model_version": self.model_version,
+            "fingerprint": model_fingerprint(),
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / total if total else 0.0,
+        }
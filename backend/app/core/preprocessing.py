@@ -1,6 +1,6 @@
 # backend/app/core/preprocessing.py
 
-from typing import List
+from typing import Iterable, Iterator, List
 import re
 import pandas as pd
 
@@ -10,6 +10,12 @@ from .normalizer import Normalizer
 
 logger = get_logger(__name__)
 
+# Однопроходная очистка + токенизация (для текста в нижнем регистре).
+# Ссылки поглощаются первой альтернативой и пропускаются; токен — это
+# непрерывная последовательность разрешённых символов, которая не может
+# «съесть» начало ссылки. Результат совпадает с _clean_text + Normalizer._tokenize.
+_CLEAN_TOKEN_RE = re.compile(r"http\S+|www\S+|(?P<token>(?:(?!http\S|www\S)[а-яА-Яa-zA-Z0-9])+)")
+
 # --------------------------------------------------------
 # Основной класс PreprocessingPipeline
 # --------------------------------------------------------
@@ -40,7 +46,7 @@ class PreprocessingPipeline:
         if text_column not in df.columns:
             raise ValueError(f"Отсутствует колонка для текста: {text_column}")
 
-        df["clean_text"] = df[text_column].apply(self.process_text)
+        df["clean_text"] = self.process_texts(df[text_column].tolist())
         logger.info(f"DataFrame предобработан. Количество строк: {len(df)}")
         return df
 
@@ -57,11 +63,8 @@ class PreprocessingPipeline:
         if not isinstance(text, str):
             text = str(text)
 
-        # Очистка текста
-        text = self._clean_text(text)
-
-        # NLP нормализация
-        text = self.normalizer.normalize(text)
+        # Очистка и токенизация за один проход, токены сразу идут в лемматизатор
+        text = self.normalizer.normalize_tokens(self._clean_tokens(text))
 
         # Можно добавить NER или другие шаги, если use_ner=True
         if self.use_ner:
@@ -69,9 +72,46 @@ class PreprocessingPipeline:
 
         return text
 
+    # ----------------------------------------------------
+    # Пакетная предобработка списка текстов
+    # ----------------------------------------------------
+    def process_texts(self, texts: List[str]) -> List[str]:
+        """
+        Тот же пайплайн, что и process_text, но нормализация выполняется
+        пакетно через Normalizer.normalize_list (с пулом процессов
+        для больших входов)
+        """
+        return list(self.process_iter(texts))
+
+    # ----------------------------------------------------
+    # Потоковая предобработка
+    # ----------------------------------------------------
+    def process_iter(self, texts: Iterable[str]) -> Iterator[str]:
+        """
+        Лениво предобрабатывает любой итерируемый источник текстов
+        (строки файла, чанки CSV) с ограниченным потреблением памяти
+        """
+        cleaned = (" ".join(self._clean_tokens(text if isinstance(text, str) else str(text))) for text in texts)
+
+        for text in self.normalizer.normalize_iter(cleaned):
+            if self.use_ner:
+                text = self._apply_ner(text)
+            yield text
+
     # ----------------------------------------------------
     # Внутренние методы
     # ----------------------------------------------------
+    @staticmethod
+    def _clean_tokens(text: str) -> Iterator[str]:
+        """
+        Очистка и токенизация за один проход по тексту:
+        ссылки и спецсимволы отбрасываются, токены отдаются лениво
+        """
+        for match in _CLEAN_TOKEN_RE.finditer(text.lower()):
+            token = match.group("token")
+            if token:
+                yield token
+
     @staticmethod
     def _clean_text(text: str) -> str:
         """
@@ -103,4 +143,4 @@ def preprocess_texts(texts: List[str], use_ner: bool = False) -> List[str]:
     Быстрая функция предобработки списка текстов
     """
     pipeline = PreprocessingPipeline(use_ner=use_ner)
-    return [pipeline.process_text(text) for text in texts]
+    return pipeline.process_texts(texts)
@@ -0,0 +1,178 @@
+# backend/app/core/rate_limiter.py
+
+import asyncio
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from ..config import settings
+from ..utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# --------------------------------------------------------
+# Token bucket
+# --------------------------------------------------------
+#
+# Ёмкость корзины — limit запросов, пополнение — limit / window токенов
+# в секунду. В отличие от счётчика с TTL, окно «скользит»: активный
+# клиент не может обнулить лимит, а простаивающий восстанавливает его
+# постепенно. Состояние ключа — два числа (токены и время), поэтому
+# память не зависит от лимита.
+#
+# Результат проверки — (allowed, retry_after): retry_after в секундах,
+# через сколько появится следующий токен (0, если запрос разрешён).
+
+Decision = Tuple[bool, float]
+
+
+class MemoryTokenBucket:
+    """
+    Token bucket в памяти процесса.
+    allow() не содержит await, поэтому в event loop выполняется атомарно —
+    блокировки не нужны. Полные корзины периодически удаляются:
+    они эквивалентны отсутствующему ключу.
+    """
+
+    def __init__(self, limit: int, window: float, sweep_interval: Optional[float] = None):
+        self.capacity = float(limit)
+        self.rate = limit / window
+        self.window = window
+        self.sweep_interval = window if sweep_interval is None else sweep_interval
+        self._buckets: Dict[str, List[float]] = {}
+        self._next_sweep = time.monotonic() + self.sweep_interval
+
+    def allow_sync(self, key: str, now: Optional[float] = None) -> Decision:
+        now = time.monotonic() if now is None else now
+        if now >= self._next_sweep:
+            self._sweep(now)
+
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = [self.capacity, now]
+
+        tokens = min(self.capacity, bucket[0] + (now - bucket[1]) * self.rate)
+        bucket[1] = now
+        if tokens >= 1.0:
+            bucket[0] = tokens - 1.0
+            return True, 0.0
+        bucket[0] = tokens
+        return False, (1.0 - tokens) / self.rate
+
+    async def allow(self, key: str) -> Decision:
+        return self.allow_sync(key)
+
+    def _sweep(self, now: float) -> None:
+        self._next_sweep = now + self.sweep_interval
+        refill = self.window
+        idle = [key for key, (_, ts) in self._buckets.items() if now - ts >= refill]
+        for key in idle:
+            del self._buckets[key]
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+
+# Скрипт выполняется в Redis атомарно и за один round trip (EVALSHA).
+# Время берётся из TIME сервера, чтобы часы API-процессов не расходились.
+_TOKEN_BUCKET_LUA = """
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local ttl = tonumber(ARGV[3])
+
+local t = redis.call('TIME')
+local now = tonumber(t[1]) * 1000 + math.floor(tonumber(t[2]) / 1000)
+
+local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(bucket[1])
+local ts = tonumber(bucket[2])
+if tokens == nil or ts == nil then
+    tokens = capacity
+    ts = now
+end
+
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+local allowed = 0
+local retry_after = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+    allowed = 1
+else
+    retry_after = math.ceil((1 - tokens) / rate)
+end
+
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', now)
+redis.call('PEXPIRE', KEYS[1], ttl)
+return {allowed, retry_after}
+"""
+
+
+class RedisTokenBucket:
+    """
+    Token bucket в Redis: общий лимит для всех API-процессов.
+    Чтение, пополнение и списание — один Lua-скрипт, поэтому
+    конкурентные запросы не могут одновременно увидеть один и тот же остаток.
+    """
+
+    def __init__(self, client: Any, limit: int, window: float):
+        self.client = client
+        self.capacity = limit
+        # Пополнение в токенах за миллисекунду — скрипт работает с TIME в мс
+        self.rate_ms = limit / (window * 1000)
+        self.ttl_ms = int(window * 1000)
+        self._script = client.register_script(_TOKEN_BUCKET_LUA)
+
+    async def allow(self, key: str) -> Decision:
+        allowed, retry_after_ms = await self._script(
+            keys=[key], args=[self.capacity, repr(self.rate_ms), self.ttl_ms]
+        )
+        return bool(int(allowed)), int(retry_after_ms) / 1000
+
+
+def create_token_bucket(client: Any, limit: Optional[int] = None, window: Optional[float] = None):
+    """
+    Redis-корзина, если клиент поддерживает Lua-скрипты, иначе корзина в памяти
+    """
+    limit = limit or settings.RATE_LIMIT_REQUESTS
+    window = window or settings.RATE_LIMIT_WINDOW
+    if hasattr(client, "register_script"):
+        return RedisTokenBucket(client, limit, window)
+    return MemoryTokenBucket(limit, window)
+
+# --------------------------------------------------------
+# Микробенчмарк накладных расходов на запрос
+# --------------------------------------------------------
+
+async def _benchmark(limiter, n: int, n_keys: int) -> float:
+    start = time.perf_counter()
+    for i in range(n):
+        await limiter.allow(f"rl:bench:{i % n_keys}")
+    return (time.perf_counter() - start) / n * 1e6
+
+
+def benchmark_rate_limiter(n: int = 100_000, n_keys: int = 1000, redis_url: Optional[str] = None) -> Dict[str, float]:
+    """
+    Среднее время одной проверки лимита, мкс.
+    С redis_url дополнительно замеряется Redis-путь (n // 10 запросов).
+    """
+    results = {"memory_us": asyncio.run(_benchmark(MemoryTokenBucket(10**9, 60), n, n_keys))}
+
+    if redis_url:
+        import redis.asyncio as redis
+
+        async def run_redis() -> float:
+            client = redis.from_url(redis_url)
+            try:
+                return await _benchmark(RedisTokenBucket(client, 10**9, 60), max(n // 10, 1), n_keys)
+            finally:
+                await client.aclose()
+
+        results["redis_us"] = asyncio.run(run_redis())
+
+    logger.info(f"Накладные расходы rate limiter на запрос: {results}")
+    return results
+
+
+if __name__ == "__main__":
+    import os
+
+    print(benchmark_rate_limiter(redis_url=os.environ.get("REDIS_URL") if settings.USE_REDIS_CACHE else None))
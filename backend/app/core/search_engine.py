@@ -4,6 +4,7 @@ from typing import List, Optional
 import pandas as pd
 
 from .normalizer import Normalizer
+from ..utils.csv_tools import as_texts, iter_csv_frames
 from ..utils.logger import get_logger
 
 logger = get_logger(__name__)
@@ -36,14 +37,29 @@ class SearchEngine:
         if text_column not in df.columns:
             raise ValueError(f"Отсутствует колонка для текста: {text_column}")
 
-        self.df_index = df.copy()
-        if self.use_normalization:
-            self.df_index["norm_text"] = self.normalizer.normalize_list(self.df_index[text_column].tolist())
-        else:
-            self.df_index["norm_text"] = self.df_index[text_column]
-
+        self.df_index = self._with_norm_text(df.copy(), text_column)
         logger.info(f"Индекс построен. Размер: {len(self.df_index)} записей")
 
+    # ----------------------------------------------------
+    # Построение индекса из большого CSV чанками
+    # ----------------------------------------------------
+    def build_index_from_csv(self, path: str, text_column: str = "text", chunksize: int = 10_000) -> None:
+        """
+        Строит индекс по большому CSV: файл читается и нормализуется
+        чанками, без промежуточной загрузки целиком
+        """
+        parts = [
+            self._with_norm_text(chunk, text_column)
+            for chunk in iter_csv_frames(path, [text_column], chunksize)
+        ]
+        self.df_index = pd.concat(parts, ignore_index=True) if parts else pd.DataFrame(columns=[text_column, "norm_text"])
+        logger.info(f"Индекс построен из {path}. Размер: {len(self.df_index)} записей")
+
+    def _with_norm_text(self, df: pd.DataFrame, text_column: str) -> pd.DataFrame:
+        texts = as_texts(df[text_column])
+        df["norm_text"] = list(self.normalizer.normalize_iter(texts)) if self.use_normalization else texts
+        return df
+
     # ----------------------------------------------------
     # Поиск по ключевым словам
     # ----------------------------------------------------
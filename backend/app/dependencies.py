@@ -1,16 +1,27 @@
+import math
+import os
 import time
 import asyncio
 from functools import lru_cache
+from threading import Lock
 from typing import Optional, Dict, Any
 
+import torch
 from fastapi import Depends, HTTPException, Request, status
 
 from .config import settings
 from .utils.logger import get_logger
-from .core.preprocessing import Preprocessor
-from .core.normalizer import TextNormalizer
+from .core.preprocessing import PreprocessingPipeline
+from .core.normalizer import Normalizer, get_morph_analyzer
 from .core.search_engine import SearchEngine
-from .ml.model import SentimentModel
+from .core.executor import run_blocking, shutdown_executor_async
+from .core.jobs import JobManager
+from .core.local_cache import LocalCache
+from .core.prediction_cache import PredictionCache
+from .core.rate_limiter import create_token_bucket
+from .ml.inference import InferenceEngine, load_inference_handler, make_predict_fn
+from .ml.tokenizer import Tokenizer, get_default_tokenizer
+from .ml.worker_pool import shutdown_worker_pool
 
 # -------------------------
 # Глобальный логгер
@@ -24,17 +35,24 @@ logger = get_logger(__name__)
 class ModelContainer:
     """
     Синглтон-контейнер.
-    Хранит загруженную модель и инструменты пайплайна.
+    Хранит движок инференса (модель, словарь, токенизатор, буферы)
+    и инструменты пайплайна — всё создаётся один раз на процесс.
+    Также хранит флаг готовности и тайминги загрузки/прогрева для /ready.
     """
 
     def __init__(self):
-        self.model: Optional[SentimentModel] = None
-        self.preprocessor: Optional[Preprocessor] = None
-        self.normalizer: Optional[TextNormalizer] = None
+        self.engine: Optional[InferenceEngine] = None
+        self.preprocessor: Optional[PreprocessingPipeline] = None
+        self.normalizer: Optional[Normalizer] = None
         self.search_engine: Optional[SearchEngine] = None
+        self.ready = False
+        self.error: Optional[str] = None
+        self.startup_task: Optional[asyncio.Task] = None
+        self.timings: Dict[str, float] = {}
+        self.lock = Lock()
 
     def is_loaded(self) -> bool:
-        return self.model is not None
+        return self.engine is not None
 
 
 container = ModelContainer()
@@ -43,67 +61,51 @@ container = ModelContainer()
 # Инициализация кэша (Redis или in-memory)
 # -------------------------
 
-class LocalCache:
-    """Простой in-memory cache для MVP."""
-
-    def __init__(self):
-        self.store: Dict[str, Any] = {}
-
-    def get(self, key: str):
-        return self.store.get(key)
-
-    def set(self, key: str, value: Any, ttl: Optional[int] = None):
-        self.store[key] = value
-
-    def exists(self, key: str) -> bool:
-        return key in self.store
-
-
 if settings.USE_REDIS_CACHE:
     import redis.asyncio as redis
     redis_client = redis.from_url(os.environ.get("REDIS_URL", settings.REDIS_URL))
 else:
     redis_client = LocalCache()
 
+# Кэш предсказаний поверх того же хранилища
+prediction_cache = PredictionCache(redis_client)
+
+# Фоновые задачи: инференс — через общий движок. Без Redis состояние задач
+# хранится отдельно от кэша предсказаний и не вытесняется по LRU
+# (завершённая задача не пропадает из /api/jobs до истечения JOB_TTL)
+job_store = redis_client if settings.USE_REDIS_CACHE else LocalCache(evict=False)
+job_manager = JobManager(
+    job_store,
+    predict_factory=lambda: make_predict_fn(get_inference_engine(), dedup=settings.DEDUP_ENABLED),
+)
+
 # -------------------------
 # Rate Limiting (MVP)
 # -------------------------
 
 class RateLimiter:
+    """
+    Ограничение частоты запросов по IP клиента (token bucket).
+    Проверка атомарна: Lua-скрипт в Redis или корзина в памяти процесса.
+    """
+
     def __init__(self, limit: int, window: int):
         self.limit = limit
         self.window = window
+        self.bucket = create_token_bucket(redis_client, limit=limit, window=window)
 
     async def check(self, request: Request):
         if not settings.RATE_LIMIT_ENABLED:
             return
 
-        key = f"rl:{request.client.host}"
-        current = await self._get(key)
-        if current is None:
-            await self._set(key, 1)
-            return
-
-        if current >= self.limit:
+        allowed, retry_after = await self.bucket.allow(f"rl:{request.client.host}")
+        if not allowed:
             raise HTTPException(
                 status_code=status.HTTP_429_TOO_MANY_REQUESTS,
-                detail="Rate limit exceeded"
+                detail="Rate limit exceeded",
+                headers={"Retry-After": str(max(1, math.ceil(retry_after)))},
             )
 
-        await self._set(key, current + 1)
-
-    async def _get(self, key: str) -> Optional[int]:
-        if isinstance(redis_client, LocalCache):
-            return redis_client.get(key)
-        val = await redis_client.get(key)
-        return int(val) if val else None
-
-    async def _set(self, key: str, value: int):
-        if isinstance(redis_client, LocalCache):
-            redis_client.set(key, value)
-        else:
-            await redis_client.set(key, value, ex=settings.RATE_LIMIT_WINDOW)
-
 
 rate_limiter = RateLimiter(
     limit=settings.RATE_LIMIT_REQUESTS,
@@ -124,40 +126,39 @@ def load_pipeline():
     """
     Функция вызывается один раз при старте приложения.
     Загружает:
-      - модель
-      - tokenizer
+      - tokenizer и словарь
+      - модель (eager или TorchScript)
+      - normalizer (со словарями pymorphy2)
       - preprocessor
-      - normalizer
       - search index
     """
 
     logger.info("Загрузка NLP-пайплайна...")
 
-    # Нормализация текста
-    normalizer = TextNormalizer()
+    # Словарь и токенизатор (ENV-переменная VOCAB_PATH учитывается внутри);
+    # тот же экземпляр TextDataset берёт по умолчанию
+    tokenizer = get_default_tokenizer()
 
-    # Препроцессинг (очистка, токены)
-    preprocessor = Preprocessor(normalizer=normalizer)
+    # Модель тональности: TorchScript при USE_TORCHSCRIPT, иначе eager (ENV MODEL_PATH)
+    model_handler = load_inference_handler(vocab_size=len(tokenizer.vocab) + 1)
 
-    # Модель тональности с поддержкой ENV-переменных
-    model_path = os.environ.get("MODEL_PATH", settings.MODEL_PATH)
-    tokenizer_path = os.environ.get("TOKENIZER_PATH", settings.TOKENIZER_PATH)
+    # Нормализация текста: словари pymorphy2 загружаются сразу, а не на первом запросе
+    normalizer = Normalizer()
+    get_morph_analyzer()
 
-    model = SentimentModel(
-        model_path=model_path,
-        tokenizer_path=tokenizer_path,
-        device=os.environ.get("DEVICE", settings.DEVICE),
-        max_length=int(os.environ.get("MAX_SEQ_LENGTH", settings.MAX_SEQ_LENGTH)),
-        confidence_threshold=float(os.environ.get("CONFIDENCE_THRESHOLD", settings.CONFIDENCE_THRESHOLD)),
-    )
+    # Препроцессинг (очистка, токены)
+    preprocessor = PreprocessingPipeline()
 
     # Поисковый индекс
-    search_engine = SearchEngine(normalizer=normalizer)
+    search_engine = SearchEngine()
 
     logger.info("Пайплайн успешно загружен")
 
+    # Движок инференса с буферами под батч MicroBatcher
+    engine = InferenceEngine(model_handler, tokenizer, batch_size=settings.BATCH_SIZE)
+
     return {
-        "model": model,
+        "engine": engine,
         "preprocessor": preprocessor,
         "normalizer": normalizer,
         "search_engine": search_engine,
@@ -173,32 +174,156 @@ def init_container():
     if container.is_loaded():
         return
 
-    assets = load_pipeline()
-    container.model = assets["model"]
-    container.preprocessor = assets["preprocessor"]
-    container.normalizer = assets["normalizer"]
-    container.search_engine = assets["search_engine"]
+    with container.lock:
+        if container.is_loaded():
+            return
+
+        start = time.perf_counter()
+        assets = load_pipeline()
+        container.preprocessor = assets["preprocessor"]
+        container.normalizer = assets["normalizer"]
+        container.search_engine = assets["search_engine"]
+        container.engine = assets["engine"]
+        container.timings["load_s"] = round(time.perf_counter() - start, 3)
 
-    logger.info("Глобальный контейнер NLP-пайплайна инициализирован.")
+    logger.info(f"Глобальный контейнер NLP-пайплайна инициализирован за {container.timings['load_s']} с")
+
+# -------------------------
+# Прогрев модели
+# -------------------------
+
+def warmup(batches: Optional[int] = None) -> Dict[str, float]:
+    """
+    Прогоняет синтетические батчи типичных длин (WARMUP_SEQ_LENGTHS)
+    через модель и один текст через полный путь предсказания.
+    Первые forward-проходы платят за аллокатор и выбор ядер —
+    после прогрева это уже оплачено до прихода пользователей.
+    """
+    batches = settings.WARMUP_BATCHES if batches is None else batches
+    engine = container.engine
+    handler = engine.model_handler
+    vocab_size = len(engine.tokenizer.vocab)
+    generator = torch.Generator().manual_seed(0)
+
+    start = time.perf_counter()
+    synthetic = []
+    for seq_len in settings.WARMUP_SEQ_LENGTHS:
+        for _ in range(batches):
+            shape = (settings.BATCH_SIZE, seq_len)
+            # Индексы токенов 1..vocab_size; при пустом словаре — только паддинг
+            if vocab_size:
+                input_ids = torch.randint(1, vocab_size + 1, shape, generator=generator)
+            else:
+                input_ids = torch.zeros(shape, dtype=torch.long)
+            lengths = torch.full((settings.BATCH_SIZE,), seq_len, dtype=torch.long)
+            synthetic.append({"input_ids": input_ids, "lengths": lengths})
+    handler.predict(synthetic)
+    forward_s = time.perf_counter() - start
+
+    # Полный путь: токенизация, лемматизация (каскад), пул воркеров
+    make_predict_fn(engine, with_probs=True)(["Прогрев модели: отличный товар, быстрая доставка"])
+
+    timings = {
+        "warmup_s": round(time.perf_counter() - start, 3),
+        "warmup_forward_s": round(forward_s, 3),
+        "warmup_batches": len(synthetic),
+    }
+    logger.info(f"Прогрев модели завершен: {timings}")
+    return timings
+
+
+def _load_and_warmup() -> None:
+    init_container()
+    if settings.WARMUP_ON_STARTUP:
+        container.timings.update(warmup())
+    container.ready = True
+
+
+async def _startup() -> None:
+    start = time.perf_counter()
+    try:
+        await run_blocking(_load_and_warmup)
+    except Exception as e:
+        container.error = f"{type(e).__name__}: {e}"
+        logger.exception(f"Не удалось загрузить модель: {container.error}")
+        return
+    container.timings["startup_s"] = round(time.perf_counter() - start, 3)
+    await job_manager.start()
+
+
+async def initialize():
+    """
+    Вызывается из main.py при старте приложения.
+    Загрузка и прогрев запускаются фоновой задачей в пуле инференса:
+    сервер сразу принимает соединения, а /ready отвечает 503, пока они
+    не завершатся (или с текстом ошибки, если загрузка не удалась).
+    После загрузки запускаются воркеры фоновых задач и продолжаются незавершённые.
+    """
+    container.error = None
+    container.startup_task = asyncio.get_running_loop().create_task(_startup())
+
+
+def has_model_loaded() -> bool:
+    return container.ready
+
+
+def readiness() -> Dict[str, Any]:
+    """
+    Состояние для /ready: loading / ready / failed, ошибка загрузки
+    и тайминги загрузки и прогрева
+    """
+    if container.ready:
+        state = "ready"
+    elif container.error is not None:
+        state = "failed"
+    else:
+        state = "loading"
+    return {
+        "ready": container.ready,
+        "status": state,
+        "error": container.error,
+        "timings": dict(container.timings),
+    }
 
 # -------------------------
 # Dependencies для FastAPI
 # -------------------------
 
-def get_model() -> SentimentModel:
-    """Dependency для инференса."""
+def require_ready() -> None:
+    """Dependency: 503 с состоянием загрузки, пока модель не загружена и не прогрета."""
+    if not container.ready:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=readiness())
+
+
+def get_inference_engine() -> InferenceEngine:
+    """Dependency для инференса: общий на процесс движок."""
     if not container.is_loaded():
         init_container()
-    return container.model
+    return container.engine
+
+
+def get_model_handler():
+    """Dependency: загруженная модель (ModelHandler или ScriptedModelHandler)."""
+    return get_inference_engine().model_handler
+
 
+def get_tokenizer() -> Tokenizer:
+    """Dependency: токенизатор со словарём модели."""
+    return get_inference_engine().tokenizer
 
-def get_preprocessor() -> Preprocessor:
+
+def get_model():
+    """Dependency для инференса (совместимость)."""
+    return get_model_handler()
+
+
+def get_preprocessor() -> PreprocessingPipeline:
     if not container.is_loaded():
         init_container()
     return container.preprocessor
 
 
-def get_normalizer() -> TextNormalizer:
+def get_normalizer() -> Normalizer:
     if not container.is_loaded():
         init_container()
     return container.normalizer
@@ -215,9 +340,34 @@ def get_cache():
     return redis_client
 
 
+def get_prediction_cache() -> PredictionCache:
+    """Dependency: кэш предсказаний по хэшу текста и версии модели."""
+    return prediction_cache
+
+
+def get_job_manager() -> JobManager:
+    """Dependency: фоновые задачи пакетной обработки."""
+    return job_manager
+
+
 def get_logger_dep():
     return logger
 
+
+async def shutdown():
+    """
+    Вызывается из main.py при остановке приложения.
+    Останавливает воркеры фоновых задач (их прогресс сохранён в контрольных точках),
+    дожидается завершения задач в пуле инференса и останавливает воркеры инференса.
+    """
+    task = container.startup_task
+    if task is not None and not task.done():
+        # Прогрев в потоке не прерывается, но его итог больше не ждём
+        task.cancel()
+    await job_manager.stop()
+    await shutdown_executor_async()
+    await asyncio.get_running_loop().run_in_executor(None, shutdown_worker_pool)
+
 # -------------------------
 # Health check зависимости
 # -------------------------
@@ -41,6 +41,11 @@ try:
 except Exception:
     admin_router = None
 
+try:
+    from app.api.routes_jobs import router as jobs_router
+except Exception:
+    jobs_router = None
+
 LOG = logger.get_logger(__name__)
 
 
@@ -101,18 +106,26 @@ def create_app() -> FastAPI:
         app.include_router(admin_router, prefix="/api/admin", tags=["admin"])
         LOG.debug("Registered admin router")
 
+    if jobs_router:
+        app.include_router(jobs_router, prefix="/api/jobs", tags=["jobs"])
+        LOG.debug("Registered jobs router")
+
     # Health & readiness
     @app.get("/health", tags=["health"])
     def health() -> dict:
         return {"status": "ok"}
 
     @app.get("/ready", tags=["health"])
-    def ready() -> dict:
+    def ready() -> Any:
+        # 503, пока модель не загружена и не прогрета: балансировщик не шлёт трафик на холодный воркер
         try:
-            loaded = False
-            if hasattr(dependencies, "has_model_loaded"):
-                loaded = dependencies.has_model_loaded()
-            return {"ready": loaded}
+            if hasattr(dependencies, "readiness"):
+                state = dependencies.readiness()
+            else:
+                state = {"ready": bool(getattr(dependencies, "has_model_loaded", lambda: False)())}
+            if not state["ready"]:
+                return JSONResponse(status_code=503, content=state)
+            return state
         except Exception as e:
             LOG.exception("Readiness check failed: %s", e)
             return JSONResponse(status_code=500, content={"ready": False, "error": str(e)})
@@ -140,7 +153,8 @@ def create_app() -> FastAPI:
                 maybe_coro = dependencies.initialize()
                 if hasattr(maybe_coro, "__await__"):
                     await maybe_coro
-                LOG.info("Dependencies initialized")
+                # Модель загружается в фоне; готовность и ошибки загрузки — в /ready
+                LOG.info("Dependencies initialization started")
             else:
                 LOG.warning("dependencies.initialize not implemented — skipping resource initialization")
         except Exception as e:
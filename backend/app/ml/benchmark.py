@@ -0,0 +1,182 @@
+# backend/app/ml/benchmark.py
+
+import io
+import os
+import time
+from typing import Dict, List, Optional
+
+import pandas as pd
+import torch
+
+from .dataset import TextDataset, make_dataloader
+from .inference import make_inference_dataloader, run_inference
+from .lexicon import SentimentLexicon, cascade_predict
+from .model import ModelHandler, SentimentModel
+from .tokenizer import Tokenizer
+from ..core.evaluation import macro_f1_score
+from ..utils.logger import get_logger
+from .. import config
+
+logger = get_logger(__name__)
+
+# --------------------------------------------------------
+# Замер пропускной способности инференса
+# --------------------------------------------------------
+
+def _texts_per_second(model: SentimentModel, dataloader, use_lengths: bool, repeats: int) -> float:
+    n_texts = len(dataloader.dataset)
+    best = float("inf")
+    with torch.no_grad():
+        for _ in range(repeats):
+            start = time.perf_counter()
+            for batch in dataloader:
+                if use_lengths:
+                    model(batch["input_ids"], batch["lengths"])
+                else:
+                    model(batch["input_ids"])
+            best = min(best, time.perf_counter() - start)
+    return n_texts / best if best > 0 else 0.0
+
+
+def _load_model(tokenizer: Tokenizer, model_path: Optional[str]) -> SentimentModel:
+    model = SentimentModel(vocab_size=len(tokenizer.vocab) + 1)
+    model_path = model_path or str(config.settings.MODELS_DIR / "trained_model.pt")
+    if os.path.exists(model_path) and os.path.getsize(model_path) > 0:
+        model.load_state_dict(torch.load(model_path, map_location="cpu"))
+    return model.eval()
+
+
+def _state_dict_mb(model: torch.nn.Module) -> float:
+    buffer = io.BytesIO()
+    torch.save(model.state_dict(), buffer)
+    return buffer.tell() / (1024 * 1024)
+
+
+def benchmark_forward(
+    csv_path: str,
+    tokenizer: Optional[Tokenizer] = None,
+    model_path: Optional[str] = None,
+    batch_size: int = 32,
+    max_len: int = 100,
+    repeats: int = 3,
+) -> Dict[str, float]:
+    """
+    Сравнивает скорость (текстов/сек) трёх режимов прогона SentimentModel:
+    - padded: фиксированный паддинг до max_len (текущий путь)
+    - bucketed: батчи по длине + динамический паддинг (только замер скорости:
+      не-packed модель на обрезанном паддинге даёт другие логиты)
+    - packed: батчи по длине + packed-последовательности
+    """
+    df = pd.read_csv(csv_path)
+    texts: List[str] = df["text"].astype(str).tolist()
+    tokenizer = tokenizer or Tokenizer()
+
+    model = _load_model(tokenizer, model_path)
+
+    padded = TextDataset(texts=texts, tokenizer=tokenizer, max_len=max_len)
+    bucketed = TextDataset(texts=texts, tokenizer=tokenizer, max_len=max_len)
+
+    results = {
+        "padded": _texts_per_second(model, make_dataloader(padded, batch_size=batch_size), False, repeats),
+        "bucketed": _texts_per_second(model, make_dataloader(bucketed, batch_size=batch_size, bucket_by_length=True, dynamic_padding=True), False, repeats),
+        "packed": _texts_per_second(model, make_dataloader(bucketed, batch_size=batch_size, bucket_by_length=True, dynamic_padding=True), True, repeats),
+    }
+    results["packed_speedup"] = results["packed"] / results["padded"] if results["padded"] else 0.0
+    logger.info(f"Бенчмарк инференса на {len(texts)} текстах ({csv_path}): {results}")
+    return results
+
+
+# --------------------------------------------------------
+# Сравнение fp32 и int8-квантованной модели
+# --------------------------------------------------------
+
+def compare_quantized(
+    csv_path: str,
+    tokenizer: Optional[Tokenizer] = None,
+    model_path: Optional[str] = None,
+    batch_size: int = 32,
+    repeats: int = 3,
+) -> Dict[str, float]:
+    """
+    Оценивает цену int8-квантования на валидационном CSV (колонки text, label):
+    macro-F1 обеих моделей, долю совпадающих предсказаний,
+    скорость (текстов/сек) и размер весов
+    """
+    df = pd.read_csv(csv_path)
+    texts: List[str] = df["text"].astype(str).tolist()
+    labels: List[int] = df["label"].astype(int).tolist()
+    tokenizer = tokenizer or Tokenizer()
+
+    fp32 = ModelHandler(_load_model(tokenizer, model_path), device="cpu")
+    int8 = ModelHandler(_load_model(tokenizer, model_path), device="cpu")
+    int8.quantize()
+
+    dataset = TextDataset(texts=texts, labels=labels, tokenizer=tokenizer)
+    loader = make_inference_dataloader(fp32, dataset, batch_size)
+    use_lengths = fp32.packed
+
+    preds_fp32 = fp32.predict(loader)
+    preds_int8 = int8.predict(loader)
+
+    results = {
+        "macro_f1_fp32": macro_f1_score(labels, preds_fp32),
+        "macro_f1_int8": macro_f1_score(labels, preds_int8),
+        "agreement": sum(a == b for a, b in zip(preds_fp32, preds_int8)) / max(len(labels), 1),
+        "texts_per_sec_fp32": _texts_per_second(fp32.model, loader, use_lengths, repeats),
+        "texts_per_sec_int8": _texts_per_second(int8.model, loader, use_lengths, repeats),
+        "size_mb_fp32": _state_dict_mb(fp32.model),
+        "size_mb_int8": _state_dict_mb(int8.model),
+    }
+    results["macro_f1_delta"] = results["macro_f1_int8"] - results["macro_f1_fp32"]
+    logger.info(f"Сравнение fp32/int8 на {len(texts)} текстах ({csv_path}): {results}")
+    return results
+
+
+def compare_cascade(
+    csv_path: str,
+    tokenizer: Optional[Tokenizer] = None,
+    model_path: Optional[str] = None,
+    lexicon: Optional[SentimentLexicon] = None,
+    threshold: Optional[float] = None,
+    batch_size: int = 32,
+) -> Dict[str, float]:
+    """
+    Оценивает лексиконный каскад на валидационном CSV (колонки text, label):
+    macro-F1 модели и каскада, долю текстов, не дошедших до модели,
+    и время прогона обоих вариантов
+    """
+    df = pd.read_csv(csv_path)
+    texts: List[str] = df["text"].astype(str).tolist()
+    labels: List[int] = df["label"].astype(int).tolist()
+    tokenizer = tokenizer or Tokenizer()
+    lexicon = lexicon or SentimentLexicon.load()
+    threshold = config.settings.CONFIDENCE_THRESHOLD if threshold is None else threshold
+    handler = ModelHandler(_load_model(tokenizer, model_path), device="cpu")
+
+    def model_predict(batch: List[str]) -> List[int]:
+        return run_inference(handler, tokenizer, batch, batch_size=batch_size)
+
+    start = time.perf_counter()
+    preds_model = model_predict(texts)
+    model_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    preds_cascade = cascade_predict(lexicon, model_predict, texts, threshold=threshold)
+    cascade_seconds = time.perf_counter() - start
+
+    lexicon_conf = lexicon.predict_proba(texts).max(axis=1)
+    results = {
+        "threshold": threshold,
+        "macro_f1_model": macro_f1_score(labels, preds_model),
+        "macro_f1_cascade": macro_f1_score(labels, preds_cascade),
+        "skip_ratio": float((lexicon_conf >= threshold).mean()) if texts else 0.0,
+        "seconds_model": model_seconds,
+        "seconds_cascade": cascade_seconds,
+    }
+    results["macro_f1_delta"] = results["macro_f1_cascade"] - results["macro_f1_model"]
+    logger.info(f"Сравнение каскада на {len(texts)} текстах ({csv_path}): {results}")
+    return results
+
+
+if __name__ == "__main__":
+    print(benchmark_forward(str(config.settings.DATA_DIR / "test.csv")))
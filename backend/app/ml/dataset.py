@@ -1,10 +1,12 @@
 # backend/app/ml/dataset.py
 
-from typing import List, Optional
+from functools import partial
+from typing import Iterator, List, Optional, Tuple
+import numpy as np
 import torch
-from torch.utils.data import Dataset
+from torch.utils.data import DataLoader, Dataset, Sampler
 
-from .tokenizer import Tokenizer
+from .tokenizer import Tokenizer, get_default_tokenizer
 from ..core.normalizer import Normalizer
 from ..utils.logger import get_logger
 
@@ -21,17 +23,35 @@ class TextDataset(Dataset):
     - Токенизацию и нормализацию
     - Конвертацию текста в последовательность индексов
     - Возврат метки для обучения
+
+    Все тексты кодируются один раз в матрицу (n, max_len); батчи
+    берутся из неё срезами через torch.from_numpy без копирования.
+    При dynamic_padding=True батч обрезается до длины самого
+    длинного текста в нём (только для packed-модели).
     """
 
-    def __init__(self, texts: List[str], labels: Optional[List[int]] = None, tokenizer: Optional[Tokenizer] = None, max_len: int = 100):
+    def __init__(
+        self,
+        texts: List[str],
+        labels: Optional[List[int]] = None,
+        tokenizer: Optional[Tokenizer] = None,
+        max_len: int = 100,
+        dynamic_padding: bool = False,
+        encoded: Optional[Tuple[np.ndarray, np.ndarray]] = None,
+    ):
         self.texts = texts
         self.labels = labels
         self.max_len = max_len
+        self.dynamic_padding = dynamic_padding
 
-        if tokenizer is None:
-            self.tokenizer = Tokenizer()
-        else:
-            self.tokenizer = tokenizer
+        # Без явного токенизатора берём общий на процесс, а не грузим словарь заново
+        self.tokenizer = tokenizer if tokenizer is not None else get_default_tokenizer()
+
+        # encoded — уже закодированные (input_ids, lengths), например из буферов InferenceEngine
+        if encoded is None:
+            encoded = self.tokenizer.texts_to_sequences(texts, max_len=self.max_len, return_lengths=True)
+        self.input_ids, self.lengths = encoded
+        self.label_ids = np.asarray(labels, dtype=np.int64) if labels is not None else None
 
         logger.info(f"TextDataset инициализирован. Кол-во примеров: {len(self.texts)}")
 
@@ -45,21 +65,112 @@ class TextDataset(Dataset):
     # Получение одного примера
     # ----------------------------------------------------
     def __getitem__(self, idx):
-        text = self.texts[idx]
-        input_ids = torch.tensor(self.tokenizer.text_to_sequence(text, max_len=self.max_len), dtype=torch.long)
+        input_ids = torch.from_numpy(self.input_ids[idx])
+        length = torch.tensor(self.lengths[idx], dtype=torch.long)
 
-        if self.labels is not None:
-            label = torch.tensor(self.labels[idx], dtype=torch.long)
-            return {"input_ids": input_ids, "label": label}
+        if self.label_ids is not None:
+            label = torch.tensor(self.label_ids[idx], dtype=torch.long)
+            return {"input_ids": input_ids, "length": length, "label": label}
+        else:
+            return {"input_ids": input_ids, "length": length}
+
+    # ----------------------------------------------------
+    # Получение целого батча (DataLoader вызывает его вместо __getitem__)
+    # ----------------------------------------------------
+    def __getitems__(self, indices: List[int]):
+        # Последовательные индексы (shuffle=False) — срез без копирования
+        start, stop = indices[0], indices[-1] + 1
+        if stop - start == len(indices) and list(indices) == list(range(start, stop)):
+            index = slice(start, stop)
         else:
-            return {"input_ids": input_ids}
+            index = np.asarray(indices)
+
+        input_ids = self.input_ids[index]
+        lengths = self.lengths[index]
+
+        # indices позволяют вернуть предсказания в исходном порядке,
+        # если сэмплер переставил примеры (LengthBucketSampler)
+        batch = {
+            "input_ids": torch.from_numpy(input_ids),
+            "lengths": torch.from_numpy(lengths),
+            "indices": torch.as_tensor(indices, dtype=torch.long),
+        }
+        if self.label_ids is not None:
+            batch["labels"] = torch.from_numpy(self.label_ids[index])
+        return batch
 
     # ----------------------------------------------------
     # Генерация всего батча (для DataLoader)
     # ----------------------------------------------------
-    def collate_fn(self, batch):
+    def collate_fn(self, batch, dynamic_padding: Optional[bool] = None):
+        dynamic_padding = self.dynamic_padding if dynamic_padding is None else dynamic_padding
+        # Батч уже собран в __getitems__
+        if isinstance(batch, dict):
+            if dynamic_padding:
+                batch["input_ids"] = batch["input_ids"][:, :max(int(batch["lengths"].max()), 1)]
+            return batch
+
         input_ids = torch.stack([item["input_ids"] for item in batch])
+        lengths = torch.stack([item["length"] for item in batch])
+        if dynamic_padding:
+            input_ids = input_ids[:, :max(int(lengths.max()), 1)]
         if "label" in batch[0]:
             labels = torch.stack([item["label"] for item in batch])
-            return {"input_ids": input_ids, "labels": labels}
-        return {"input_ids": input_ids}
+            return {"input_ids": input_ids, "lengths": lengths, "labels": labels}
+        return {"input_ids": input_ids, "lengths": lengths}
+
+
+# --------------------------------------------------------
+# Сэмплер батчей, сгруппированных по длине текста
+# --------------------------------------------------------
+
+class LengthBucketSampler(Sampler):
+    """
+    Сортирует примеры по длине и нарезает их на батчи, чтобы в одном
+    батче оказывались тексты близкой длины. Вместе с dynamic_padding
+    (packed-режим) это сокращает число шагов LSTM на паддинге.
+    """
+
+    def __init__(self, lengths: np.ndarray, batch_size: int = 32, shuffle: bool = False):
+        self.batch_size = batch_size
+        self.shuffle = shuffle
+        self.order = np.argsort(-np.asarray(lengths), kind="stable")
+
+    def __iter__(self) -> Iterator[List[int]]:
+        batches = [self.order[i:i + self.batch_size].tolist() for i in range(0, len(self.order), self.batch_size)]
+        if self.shuffle:
+            # Перемешиваем порядок батчей, сами батчи остаются однородными по длине
+            for i in torch.randperm(len(batches)).tolist():
+                yield batches[i]
+        else:
+            yield from batches
+
+    def __len__(self) -> int:
+        return (len(self.order) + self.batch_size - 1) // self.batch_size
+
+
+# --------------------------------------------------------
+# Построение DataLoader
+# --------------------------------------------------------
+
+def make_dataloader(
+    dataset: TextDataset,
+    batch_size: int = 32,
+    bucket_by_length: bool = False,
+    shuffle: bool = False,
+    dynamic_padding: Optional[bool] = None,
+) -> DataLoader:
+    """
+    DataLoader для TextDataset. При bucket_by_length=True батчи
+    собираются из текстов близкой длины; ModelHandler.predict
+    возвращает предсказания в исходном порядке.
+    dynamic_padding (по умолчанию — как у dataset) обрезает батч до самого
+    длинного текста. Включать только для packed-модели: без packed модель
+    читает последний шаг LSTM, и обрезка паддинга меняет её выход.
+    Сам dataset не изменяется.
+    """
+    collate_fn = partial(dataset.collate_fn, dynamic_padding=dynamic_padding)
+    if bucket_by_length:
+        sampler = LengthBucketSampler(dataset.lengths, batch_size=batch_size, shuffle=shuffle)
+        return DataLoader(dataset, batch_sampler=sampler, collate_fn=collate_fn)
+    return DataLoader(dataset, batch_size=batch_size, shuffle=shuffle, collate_fn=collate_fn)
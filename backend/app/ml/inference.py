@@ -0,0 +1,227 @@
+# backend/app/ml/inference.py
+#
+# Серверный путь инференса поверх TorchScript-артефакта.
+# Модуль намеренно не импортирует обучающий код (model.py, train.py, metrics.py):
+# скомпилированному графу нужен только torch.
+
+import os
+import threading
+from functools import partial
+from typing import Callable, List, Optional, Tuple
+
+import numpy as np
+import torch
+from torch.utils.data import DataLoader
+
+from .dataset import TextDataset, make_dataloader
+from ..core.dedup import dedup_predict
+from ..utils.logger import get_logger
+from .. import config
+
+logger = get_logger(__name__)
+
+
+def run_inference(model_handler, tokenizer, texts: List[str], batch_size: int = 32, return_probs: bool = False):
+    """
+    Полный синхронный прогон списка текстов: кодирование, батчинг
+    (с группировкой по длине при LENGTH_BUCKETING) и forward.
+    Метка текста не зависит от того, с какими текстами он попал в батч.
+    При return_probs=True возвращает пару (метки, вероятности).
+    """
+    if not texts:
+        return ([], []) if return_probs else []
+    dataset = TextDataset(texts=texts, tokenizer=tokenizer)
+    dataloader = make_inference_dataloader(model_handler, dataset, batch_size)
+    return model_handler.predict(dataloader, return_probs=return_probs)
+
+
+def make_inference_dataloader(model_handler, dataset: TextDataset, batch_size: int) -> DataLoader:
+    """
+    Группировка по длине при LENGTH_BUCKETING; паддинг обрезается только
+    для packed-модели. Иначе модель читает последний шаг LSTM, и её выход
+    для текста зависел бы от соседей по батчу.
+    """
+    return make_dataloader(
+        dataset,
+        batch_size=batch_size,
+        bucket_by_length=config.settings.LENGTH_BUCKETING,
+        dynamic_padding=getattr(model_handler, "packed", False),
+    )
+
+
+# --------------------------------------------------------
+# Движок инференса: один на процесс
+# --------------------------------------------------------
+
+class InferenceEngine:
+    """
+    Владеет моделью (ModelHandler или ScriptedModelHandler), токенизатором
+    со словарём и буферами кодирования. Создаётся один раз при старте,
+    поэтому у запроса нет затрат на подготовку: тексты кодируются
+    в заранее выделенную матрицу, батчи — её срезы без копирования.
+    Буферы свои у каждого потока пула инференса.
+    """
+
+    def __init__(self, model_handler, tokenizer, max_len: int = 100, batch_size: int = 32, capacity: Optional[int] = None):
+        self.model_handler = model_handler
+        self.tokenizer = tokenizer
+        self.max_len = max_len
+        self.batch_size = batch_size
+        self.capacity = capacity or config.settings.MICRO_BATCH_MAX_SIZE
+        self._local = threading.local()
+
+    def _buffers(self, n: int) -> Tuple[np.ndarray, np.ndarray]:
+        # Буферы фиксированного размера capacity: predict не передаёт больше
+        if n > self.capacity:
+            raise ValueError(f"Батч {n} больше ёмкости буферов {self.capacity}")
+        input_ids = getattr(self._local, "input_ids", None)
+        if input_ids is None:
+            self._local.input_ids = np.zeros((self.capacity, self.max_len), dtype=np.int64)
+            self._local.lengths = np.zeros(self.capacity, dtype=np.int64)
+        return self._local.input_ids[:n], self._local.lengths[:n]
+
+    def predict(self, texts: List[str], return_probs: bool = False):
+        """
+        Синхронный прогон списка текстов; формат результата как у run_inference.
+        Входы больше capacity обрабатываются частями по capacity текстов,
+        поэтому память буферов потока не растёт после крупного файла.
+        """
+        if not texts:
+            return ([], []) if return_probs else []
+        if len(texts) <= self.capacity:
+            return self._predict_chunk(texts, return_probs)
+
+        labels: List[int] = []
+        probs: List[List[float]] = []
+        for i in range(0, len(texts), self.capacity):
+            result = self._predict_chunk(texts[i:i + self.capacity], return_probs)
+            if return_probs:
+                labels.extend(result[0])
+                probs.extend(result[1])
+            else:
+                labels.extend(result)
+        return (labels, probs) if return_probs else labels
+
+    def _predict_chunk(self, texts: List[str], return_probs: bool):
+        encoded = self.tokenizer.texts_to_sequences(texts, max_len=self.max_len, return_lengths=True, out=self._buffers(len(texts)))
+        dataset = TextDataset(texts=texts, tokenizer=self.tokenizer, max_len=self.max_len, encoded=encoded)
+        dataloader = make_inference_dataloader(self.model_handler, dataset, self.batch_size)
+        return self.model_handler.predict(dataloader, return_probs=return_probs)
+
+
+def make_predict_fn(engine: InferenceEngine, with_probs: bool = False, dedup: bool = False) -> Callable[[List[str]], List]:
+    """
+    Функция «тексты → результаты» для маршрутов: при INFERENCE_WORKERS > 0
+    батчи уходят в пул процессов с общими весами, иначе — прогон в текущем процессе.
+    При LEXICON_CASCADE перед моделью стоит лексикон: в неё попадают только неуверенные тексты.
+    При dedup=True одинаковые после нормализации тексты считаются один раз —
+    для путей без кэша предсказаний; маршруты с кэшем дедуплицируют сами
+    (_predict_unique), чтобы ключ текста вычислялся один раз.
+    Результат — список меток или, при with_probs=True, список пар (метка, вероятности).
+    """
+    if config.settings.INFERENCE_WORKERS > 0:
+        from .worker_pool import get_worker_pool
+
+        predict = partial(get_worker_pool(engine.model_handler, engine.tokenizer).predict, return_probs=with_probs)
+    else:
+        predict = partial(engine.predict, return_probs=with_probs)
+
+    if config.settings.LEXICON_CASCADE:
+        from .lexicon import cascade_predict, get_lexicon
+
+        lexicon = get_lexicon()
+        if lexicon is not None:
+            predict = partial(cascade_predict, lexicon, predict, return_probs=with_probs)
+
+    if with_probs:
+        predict_labels_probs = predict
+
+        def predict_with_probs(texts: List[str]) -> List[Tuple[int, List[float]]]:
+            labels, probs = predict_labels_probs(texts)
+            return list(zip(labels, probs))
+
+        predict = predict_with_probs
+
+    if dedup:
+        predict = partial(dedup_predict, predict)
+
+    return predict
+
+
+def restore_order(preds: List, order: List[int]) -> List:
+    """
+    Возвращает предсказания в исходном порядке текстов,
+    если батчи пришли переставленными (LengthBucketSampler)
+    """
+    if not order or len(order) != len(preds):
+        return preds
+    restored = [None] * len(preds)
+    for idx, pred in zip(order, preds):
+        restored[idx] = pred
+    return restored
+
+
+# --------------------------------------------------------
+# Обработчик TorchScript-модели
+# --------------------------------------------------------
+
+class ScriptedModelHandler:
+    """
+    Загружает TorchScript-артефакт, экспортированный ModelHandler.export_torchscript.
+    Граф уже содержит softmax и argmax и возвращает (labels, probs).
+    Во время forward TorchScript-интерпретатор отпускает GIL, поэтому
+    параллельные запросы из пула потоков не блокируют друг друга.
+    """
+
+    def __init__(self, path: Optional[str] = None, device: Optional[str] = None, packed: Optional[bool] = None):
+        self.device = device or config.settings.DEVICE or "cpu"
+        # Режим зашит в граф при экспорте; флаг нужен, чтобы не обрезать паддинг для не-packed графа
+        self.packed = config.settings.PACKED_SEQUENCES if packed is None else packed
+        self.path = path or os.environ.get("SCRIPTED_MODEL_PATH", str(config.settings.SCRIPTED_MODEL_PATH))
+        self.model = torch.jit.load(self.path, map_location=self.device)
+        self.model.eval()
+        logger.info(f"TorchScript-модель загружена: {self.path}. Device={self.device}")
+
+    def predict(self, dataloader: DataLoader, return_probs: bool = False):
+        preds = []
+        probs = []
+        order = []
+        with torch.inference_mode():
+            for batch in dataloader:
+                input_ids = batch["input_ids"].to(self.device)
+                lengths = batch.get("lengths")
+                if lengths is None:
+                    lengths = torch.full((input_ids.shape[0],), input_ids.shape[1], dtype=torch.long)
+                labels, batch_probs = self.model(input_ids, lengths)
+                preds.extend(labels.cpu().tolist())
+                if return_probs:
+                    probs.extend(batch_probs.cpu().tolist())
+                if "indices" in batch:
+                    order.extend(batch["indices"].tolist())
+        if return_probs:
+            return restore_order(preds, order), restore_order(probs, order)
+        return restore_order(preds, order)
+
+
+# --------------------------------------------------------
+# Загрузка обработчика для сервера
+# --------------------------------------------------------
+
+def load_inference_handler(path: Optional[str] = None, vocab_size: Optional[int] = None):
+    """
+    При USE_TORCHSCRIPT и наличии артефакта возвращает ScriptedModelHandler,
+    иначе — eager ModelHandler (обучающий код импортируется только в этом случае)
+    """
+    scripted_path = path or str(config.settings.SCRIPTED_MODEL_PATH)
+    if config.settings.USE_TORCHSCRIPT and os.path.exists(scripted_path):
+        return ScriptedModelHandler(scripted_path)
+
+    from .model import ModelHandler, SentimentModel
+
+    if vocab_size is None:
+        raise ValueError("Для eager-модели нужен vocab_size")
+    handler = ModelHandler(SentimentModel(vocab_size=vocab_size))
+    model_path = os.environ.get("MODEL_PATH", str(config.settings.MODELS_DIR / "trained_model.pt"))
+    if os.path.exists(model_path) and os.path.getsize(model_path) > 0:
+        handler.load_model(model_path)
+    return handler
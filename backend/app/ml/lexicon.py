@@ -0,0 +1,232 @@
+# backend/app/ml/lexicon.py
+
+import json
+from collections import Counter
+from pathlib import Path
+from threading import Lock
+from typing import Callable, Dict, Iterable, List, Optional, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from ..core.normalizer import Normalizer
+from ..utils.logger import get_logger
+from .. import config
+
+logger = get_logger(__name__)
+
+# --------------------------------------------------------
+# Класс SentimentLexicon — быстрый лексиконный классификатор
+# --------------------------------------------------------
+
+class SentimentLexicon:
+    """
+    Лексикон лемма → распределение классов.
+    Вес леммы — сглаженная P(класс | лемма) с поправкой на частоты классов,
+    оценка текста — среднее весов его лемм. Уверенность — максимум
+    распределения: «всё отлично» даёт почти 1.0, текст без известных лемм — 1/C.
+    """
+
+    def __init__(self, lemmas: List[str], weights: np.ndarray):
+        self.index: Dict[str, int] = {lemma: i for i, lemma in enumerate(lemmas)}
+        self.weights = np.asarray(weights, dtype=np.float32)
+        self.n_classes = self.weights.shape[1]
+        self.normalizer = Normalizer()
+
+    # ----------------------------------------------------
+    # Обучение по размеченному корпусу
+    # ----------------------------------------------------
+    @classmethod
+    def fit(cls, texts: Iterable[str], labels: Iterable[int], min_count: int = 5, alpha: float = 1.0) -> "SentimentLexicon":
+        labels = [int(label) for label in labels]
+        n_classes = max(labels) + 1
+        counts: Dict[str, np.ndarray] = {}
+        class_totals = np.zeros(n_classes, dtype=np.float64)
+
+        normalizer = Normalizer()
+        try:
+            for normalized, label in zip(normalizer.normalize_iter(texts), labels):
+                for lemma in set(normalized.split()):
+                    row = counts.get(lemma)
+                    if row is None:
+                        row = counts[lemma] = np.zeros(n_classes, dtype=np.float64)
+                    row[label] += 1
+                class_totals[label] += 1
+        finally:
+            normalizer.close()
+
+        lemmas = [lemma for lemma, row in counts.items() if row.sum() >= min_count]
+        matrix = np.stack([counts[lemma] for lemma in lemmas]) if lemmas else np.zeros((0, n_classes))
+        # P(лемма | класс) со сглаживанием, затем нормировка по классам
+        likelihood = (matrix + alpha) / (class_totals + alpha)
+        weights = likelihood / likelihood.sum(axis=1, keepdims=True)
+
+        logger.info(f"Лексикон обучен. Лемм: {len(lemmas)}, классов: {n_classes}, min_count={min_count}")
+        return cls(lemmas, weights)
+
+    # ----------------------------------------------------
+    # Оценка текстов
+    # ----------------------------------------------------
+    def predict_proba(self, texts: List[str]) -> np.ndarray:
+        """
+        Матрица (n_texts, n_classes) распределений классов
+        """
+        n = len(texts)
+        rows: List[int] = []
+        owners: List[int] = []
+        index = self.index
+        for i, normalized in enumerate(self.normalizer.normalize_iter(texts)):
+            for lemma in normalized.split():
+                row = index.get(lemma)
+                if row is not None:
+                    rows.append(row)
+                    owners.append(i)
+
+        sums = np.zeros((n, self.n_classes), dtype=np.float32)
+        if rows:
+            np.add.at(sums, np.asarray(owners), self.weights[np.asarray(rows)])
+        counts = np.bincount(np.asarray(owners, dtype=np.int64), minlength=n).astype(np.float32)
+
+        probs = np.full((n, self.n_classes), 1.0 / self.n_classes, dtype=np.float32)
+        known = counts > 0
+        probs[known] = sums[known] / counts[known, None]
+        return probs
+
+    # ----------------------------------------------------
+    # Сохранение и загрузка
+    # ----------------------------------------------------
+    def save(self, path: Optional[Union[str, Path]] = None) -> Path:
+        path = Path(path or config.settings.LEXICON_PATH)
+        lemmas = sorted(self.index, key=self.index.get)
+        with path.open("w", encoding="utf-8") as f:
+            json.dump({"lemmas": lemmas, "weights": self.weights.round(5).tolist()}, f, ensure_ascii=False)
+        logger.info(f"Лексикон сохранен: {path}")
+        return path
+
+    @classmethod
+    def load(cls, path: Optional[Union[str, Path]] = None) -> "SentimentLexicon":
+        path = Path(path or config.settings.LEXICON_PATH)
+        with path.open("r", encoding="utf-8") as f:
+            data = json.load(f)
+        logger.info(f"Лексикон загружен: {path}. Лемм: {len(data['lemmas'])}")
+        return cls(data["lemmas"], np.asarray(data["weights"], dtype=np.float32))
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+
+# --------------------------------------------------------
+# Каскад: лексикон → LSTM
+# --------------------------------------------------------
+
+class CascadeStats:
+    """
+    Счётчики каскада: сколько текстов решено лексиконом, а сколько ушло в модель
+    """
+
+    def __init__(self):
+        self._counts: Counter = Counter()
+        self._lock = Lock()
+
+    def add(self, lexicon: int, model: int) -> None:
+        with self._lock:
+            self._counts["lexicon"] += lexicon
+            self._counts["model"] += model
+
+    def stats(self) -> Dict[str, float]:
+        lexicon, model = self._counts["lexicon"], self._counts["model"]
+        total = lexicon + model
+        return {
+            "enabled": config.settings.LEXICON_CASCADE,
+            "threshold": config.settings.CONFIDENCE_THRESHOLD,
+            "total": total,
+            "lexicon": lexicon,
+            "model": model,
+            "skip_ratio": lexicon / total if total else 0.0,
+        }
+
+
+cascade_stats = CascadeStats()
+
+
+def cascade_predict(
+    lexicon: SentimentLexicon,
+    model_predict: Callable[[List[str]], Union[List[int], Tuple[List[int], List[List[float]]]]],
+    texts: List[str],
+    return_probs: bool = False,
+    threshold: Optional[float] = None,
+):
+    """
+    Тексты с уверенностью лексикона >= threshold (по умолчанию CONFIDENCE_THRESHOLD)
+    получают его предсказание; остальные одним батчем уходят в model_predict.
+    Формат результата тот же, что у model_predict: метки или (метки, вероятности).
+    """
+    threshold = config.settings.CONFIDENCE_THRESHOLD if threshold is None else threshold
+    if not texts:
+        return ([], []) if return_probs else []
+
+    probs = lexicon.predict_proba(texts)
+    confident = probs.max(axis=1) >= threshold
+    labels: List[int] = probs.argmax(axis=1).tolist()
+    prob_lists: List[List[float]] = probs.tolist()
+
+    rest = np.flatnonzero(~confident).tolist()
+    if rest:
+        result = model_predict([texts[i] for i in rest])
+        model_labels, model_probs = result if return_probs else (result, None)
+        for j, i in enumerate(rest):
+            labels[i] = model_labels[j]
+            if return_probs:
+                prob_lists[i] = model_probs[j]
+
+    cascade_stats.add(lexicon=len(texts) - len(rest), model=len(rest))
+    return (labels, prob_lists) if return_probs else labels
+
+
+# --------------------------------------------------------
+# Общий лексикон на процесс
+# --------------------------------------------------------
+
+_lexicon: Optional[SentimentLexicon] = None
+_lexicon_loaded = False
+_lexicon_lock = Lock()
+
+
+def get_lexicon() -> Optional[SentimentLexicon]:
+    """
+    Лениво загружает лексикон из settings.LEXICON_PATH.
+    Если файла нет, возвращает None и каскад не используется.
+    """
+    global _lexicon, _lexicon_loaded
+    if not _lexicon_loaded:
+        with _lexicon_lock:
+            if not _lexicon_loaded:
+                path = Path(config.settings.LEXICON_PATH)
+                if path.exists():
+                    _lexicon = SentimentLexicon.load(path)
+                else:
+                    logger.warning(f"Лексикон не найден ({path}), каскад отключен")
+                _lexicon_loaded = True
+    return _lexicon
+
+
+def build_lexicon(
+    csv_path: Optional[Union[str, Path]] = None,
+    out_path: Optional[Union[str, Path]] = None,
+    min_count: Optional[int] = None,
+) -> Path:
+    """
+    Обучает лексикон по CSV с колонками text, label и сохраняет его
+    """
+    csv_path = csv_path or config.settings.DATA_DIR / "train.csv"
+    df = pd.read_csv(csv_path)
+    lexicon = SentimentLexicon.fit(
+        df["text"].astype(str),
+        df["label"].astype(int),
+        min_count=min_count or config.settings.LEXICON_MIN_COUNT,
+    )
+    return lexicon.save(out_path)
+
+
+if __name__ == "__main__":
+    build_lexicon()
@@ -1,11 +1,15 @@
+import copy
 import os
-from typing import List, Optional, Dict
+from typing import List, Optional, Dict, Tuple
 
 import torch
 import torch.nn as nn
+from torch.ao.quantization import quantize_dynamic
+from torch.nn.utils.rnn import pack_padded_sequence
 from torch.utils.data import DataLoader
 
 from .dataset import TextDataset
+from .inference import restore_order
 from .metrics import compute_metrics
 from ..utils.logger import get_logger
 from .. import config
@@ -25,57 +29,160 @@ class SentimentModel(nn.Module):
         self.softmax = nn.Softmax(dim=1)
         logger.info(f"SentimentModel инициализирована. vocab_size={vocab_size}, embed_dim={embed_dim}, hidden_dim={hidden_dim}")
 
-    def forward(self, input_ids):
+    def forward(self, input_ids: torch.Tensor, lengths: Optional[torch.Tensor] = None):
         x = self.embedding(input_ids)
-        lstm_out, _ = self.lstm(x)
-        out = lstm_out[:, -1, :]
+        if lengths is None:
+            lstm_out, _ = self.lstm(x)
+            out = lstm_out[:, -1, :]
+        else:
+            # Packed-режим: LSTM проходит только по реальным токенам,
+            # берём финальные скрытые состояния обоих направлений
+            packed = pack_padded_sequence(
+                x, lengths.clamp(min=1).cpu(), batch_first=True, enforce_sorted=False
+            )
+            _, (h_n, _) = self.lstm(packed)
+            out = torch.cat((h_n[-2], h_n[-1]), dim=1)
         logits = self.fc(out)
         probs = self.softmax(logits)
         return probs
 
+# --------------------------------------------------------
+# Обёртка для экспорта: softmax + argmax внутри графа
+# --------------------------------------------------------
+
+class InferenceWrapper(nn.Module):
+    def __init__(self, model: nn.Module, packed: bool = False):
+        super(InferenceWrapper, self).__init__()
+        self.model = model
+        self.packed = packed
+
+    def forward(self, input_ids: torch.Tensor, lengths: torch.Tensor) -> Tuple[torch.Tensor, torch.Tensor]:
+        if self.packed:
+            probs = self.model(input_ids, lengths)
+        else:
+            probs = self.model(input_ids)
+        return torch.argmax(probs, dim=1), probs
+
 # --------------------------------------------------------
 # Класс для управления моделью
 # --------------------------------------------------------
 
 class ModelHandler:
-    def __init__(self, model: nn.Module, device: Optional[str] = None):
+    def __init__(self, model: nn.Module, device: Optional[str] = None, packed: Optional[bool] = None):
         # Используем DEVICE из config.py, если device не передан
         self.device = device or config.settings.DEVICE or ("cuda" if torch.cuda.is_available() else "cpu")
+        self.packed = config.settings.PACKED_SEQUENCES if packed is None else packed
         self.model = model.to(self.device)
         self.model.eval()
+        self.quantized = False
         logger.info(f"ModelHandler инициализирован. Device={self.device}")
 
+    # ----------------------------------------------------
+    # Динамическое int8-квантование (только CPU)
+    # ----------------------------------------------------
+    def quantize(self):
+        """
+        Заменяет LSTM и Linear на динамически квантованные int8-версии.
+        Embedding остаётся в fp32.
+        """
+        if self.quantized:
+            return
+        if self.device != "cpu":
+            raise ValueError("Динамическое квантование поддерживается только на CPU")
+        self.model = quantize_dynamic(self.model, {nn.LSTM, nn.Linear}, dtype=torch.qint8)
+        self.model.eval()
+        self.quantized = True
+        logger.info("Модель квантована (dynamic int8: LSTM, Linear)")
+
     # ----------------------------------------------------
     # Сохранение модели
     # ----------------------------------------------------
-    def save_model(self, path: Optional[str] = None):
+    def save_model(self, path: Optional[str] = None, quantized: bool = False):
+        """
+        Сохраняет state_dict модели. При quantized=True сохраняется
+        квантованный артефакт, который load_model распознает автоматически.
+        """
         path = path or os.environ.get("MODEL_PATH", str(config.settings.MODELS_DIR / "trained_model.pt"))
-        torch.save(self.model.state_dict(), path)
+        model = self.model
+        if quantized and not self.quantized:
+            model = quantize_dynamic(copy.deepcopy(self.model).cpu(), {nn.LSTM, nn.Linear}, dtype=torch.qint8)
+        torch.save(model.state_dict(), path)
         logger.info(f"Модель сохранена: {path}")
 
     # ----------------------------------------------------
     # Загрузка модели
     # ----------------------------------------------------
     def load_model(self, path: Optional[str] = None):
+        """
+        Загружает fp32- или квантованный state_dict. При QUANTIZE_INT8
+        fp32-веса квантуются сразу после загрузки.
+        """
         path = path or os.environ.get("MODEL_PATH", str(config.settings.MODELS_DIR / "trained_model.pt"))
-        self.model.load_state_dict(torch.load(path, map_location=self.device))
+        state_dict = torch.load(path, map_location=self.device)
+
+        # Квантованный артефакт можно загрузить только в квантованную модель
+        if any("_packed_params" in key for key in state_dict):
+            self.quantize()
+        self.model.load_state_dict(state_dict)
+        if config.settings.QUANTIZE_INT8:
+            self.quantize()
+
         self.model.to(self.device)
         self.model.eval()
-        logger.info(f"Модель загружена: {path}")
+        logger.info(f"Модель загружена: {path}. quantized={self.quantized}")
+
+    # ----------------------------------------------------
+    # Экспорт в TorchScript
+    # ----------------------------------------------------
+    def export_torchscript(self, path: Optional[str] = None, max_len: int = 100) -> str:
+        """
+        Компилирует модель вместе с softmax/argmax в самостоятельный
+        TorchScript-файл для ScriptedModelHandler. Сначала пробуем
+        torch.jit.script, при неудаче (например, для квантованной модели) — trace.
+        """
+        path = path or str(config.settings.SCRIPTED_MODEL_PATH)
+        wrapper = InferenceWrapper(self.model, packed=self.packed).eval()
+        try:
+            scripted = torch.jit.script(wrapper)
+        except Exception as e:
+            logger.warning(f"torch.jit.script не удался ({e}), используем trace")
+            example_ids = torch.ones((2, max_len), dtype=torch.long, device=self.device)
+            example_lengths = torch.tensor([max_len, max_len // 2], dtype=torch.long)
+            with torch.no_grad():
+                scripted = torch.jit.trace(wrapper, (example_ids, example_lengths))
+        scripted.save(path)
+        logger.info(f"TorchScript-модель сохранена: {path}")
+        return path
 
     # ----------------------------------------------------
     # Инференс для списка текстов
     # ----------------------------------------------------
-    def predict(self, dataloader: DataLoader) -> List[int]:
+    def predict(self, dataloader: DataLoader, return_probs: bool = False):
+        """
+        Возвращает метки; при return_probs=True — пару (метки, вероятности классов)
+        """
         self.model.eval()
         preds = []
+        probs = []
+        order = []
         with torch.no_grad():
             for batch in dataloader:
                 input_ids = batch["input_ids"].to(self.device)
-                outputs = self.model(input_ids)
+                if self.packed and "lengths" in batch:
+                    outputs = self.model(input_ids, batch["lengths"])
+                else:
+                    outputs = self.model(input_ids)
                 batch_preds = torch.argmax(outputs, dim=1).cpu().tolist()
                 preds.extend(batch_preds)
-        return preds
+                if return_probs:
+                    probs.extend(outputs.cpu().tolist())
+                if "indices" in batch:
+                    order.extend(batch["indices"].tolist())
+
+        # Батчи могли прийти в порядке сортировки по длине — восстанавливаем исходный
+        if return_probs:
+            return restore_order(preds, order), restore_order(probs, order)
+        return restore_order(preds, order)
 
     # ----------------------------------------------------
     # Оценка модели
@@ -85,3 +192,12 @@ class ModelHandler:
         metrics = compute_metrics(preds, labels)
         logger.info(f"Оценка модели: {metrics}")
         return metrics
+
+
+if __name__ == "__main__":
+    # Экспорт обученной модели в TorchScript: python -m app.ml.model
+    from .tokenizer import Tokenizer
+
+    handler = ModelHandler(SentimentModel(vocab_size=len(Tokenizer().vocab) + 1), device="cpu")
+    handler.load_model()
+    handler.export_torchscript()
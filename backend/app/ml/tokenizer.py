@@ -1,8 +1,12 @@
-from typing import List, Dict
+from threading import Lock
+from typing import Dict, Iterable, List, Mapping, Optional, Tuple
 import json
 import os
 
+import numpy as np
+
 from ..core.normalizer import Normalizer
+from .vocab_store import BinaryVocab, write_binary_vocab
 from ..utils.logger import get_logger
 from .. import config
 
@@ -21,14 +25,15 @@ class Tokenizer:
     """
 
     def __init__(self, vocab_path: str = None, remove_stopwords: bool = False):
-        self.normalizer = Normalizer(remove_stopwords=remove_stopwords)
+        # Токенизатору нужна только статическая токенизация Normalizer,
+        # поэтому MorphAnalyzer здесь не загружается
+        self.remove_stopwords = remove_stopwords
 
-        # Используем ENV-переменную VOCAB_PATH или путь из config, если не передан
-        self.vocab_path = vocab_path or os.environ.get(
-            "VOCAB_PATH", str(config.settings.MODELS_DIR / "vocab.json")
-        )
+        # Используем ENV-переменную VOCAB_PATH или путь из config, если не передан.
+        # Бинарный vocab.bin (если сконвертирован) предпочтительнее JSON.
+        self.vocab_path = vocab_path or os.environ.get("VOCAB_PATH") or self._default_vocab_path()
 
-        self.vocab: Dict[str, int] = {}
+        self.vocab: Mapping[str, int] = {}
         if self.vocab_path and os.path.exists(self.vocab_path):
             self.load_vocab(self.vocab_path)
 
@@ -37,13 +42,14 @@ class Tokenizer:
     # ----------------------------------------------------
     # Создание словаря по списку текстов
     # ----------------------------------------------------
-    def build_vocab(self, texts: List[str], min_freq: int = 1):
+    def build_vocab(self, texts: Iterable[str], min_freq: int = 1):
         """
-        Создает словарь токенов с минимальной частотой
+        Создает словарь токенов с минимальной частотой.
+        Принимает любой итерируемый источник, в том числе потоковый.
         """
         token_freq: Dict[str, int] = {}
         for text in texts:
-            tokens = self.normalizer._tokenize(text)
+            tokens = Normalizer._tokenize(text)
             for token in tokens:
                 token_freq[token] = token_freq.get(token, 0) + 1
 
@@ -55,7 +61,7 @@ class Tokenizer:
     # Преобразование текста в последовательность индексов
     # ----------------------------------------------------
     def text_to_sequence(self, text: str, max_len: int = 100) -> List[int]:
-        tokens = self.normalizer._tokenize(text)
+        tokens = Normalizer._tokenize(text)
         sequence = [self.vocab.get(token, 0) for token in tokens]  # 0 для неизвестных токенов
         # Ограничение длины
         if len(sequence) > max_len:
@@ -67,24 +73,106 @@ class Tokenizer:
     # ----------------------------------------------------
     # Batch преобразование
     # ----------------------------------------------------
-    def texts_to_sequences(self, texts: List[str], max_len: int = 100) -> List[List[int]]:
-        return [self.text_to_sequence(text, max_len=max_len) for text in texts]
+    def texts_to_sequences(
+        self,
+        texts: List[str],
+        max_len: int = 100,
+        dtype=np.int64,
+        return_lengths: bool = False,
+        out: Optional[Tuple[np.ndarray, np.ndarray]] = None,
+    ):
+        """
+        Кодирует тексты сразу в предвыделенную матрицу (n, max_len),
+        заполненную нулями (padding). Строки матрицы можно отдавать
+        в torch.from_numpy без копирования.
+        При return_lengths=True дополнительно возвращает длины
+        последовательностей (без паддинга, не больше max_len).
+        out — готовые буферы (матрица, длины) формы (n, max_len) и (n,)
+        для повторного использования без новых аллокаций.
+        """
+        if out is None:
+            sequences = np.zeros((len(texts), max_len), dtype=dtype)
+            lengths = np.zeros(len(texts), dtype=np.int64)
+        else:
+            sequences, lengths = out
+            sequences.fill(0)
+            lengths.fill(0)
+        vocab_get = self.vocab.get
+        for row, text in enumerate(texts):
+            tokens = Normalizer._tokenize(text)[:max_len]
+            if tokens:
+                sequences[row, :len(tokens)] = [vocab_get(token, 0) for token in tokens]
+                lengths[row] = len(tokens)
+        if return_lengths:
+            return sequences, lengths
+        return sequences
 
     # ----------------------------------------------------
     # Сохранение словаря
     # ----------------------------------------------------
     def save_vocab(self, path: str = None):
+        """
+        Сохраняет словарь в JSON или, для пути *.bin, в бинарном формате
+        """
         path = path or self.vocab_path
         if not path:
             raise ValueError("Не указан путь для сохранения словаря")
+        if str(path).endswith(".bin"):
+            write_binary_vocab(self.vocab, path)
+            return
         with open(path, "w", encoding="utf-8") as f:
-            json.dump(self.vocab, f, ensure_ascii=False, indent=2)
+            json.dump(dict(self.vocab.items()), f, ensure_ascii=False, indent=2)
         logger.info(f"Словарь сохранен: {path}")
 
+        # Сконвертированный ранее vocab.bin рядом с JSON иначе остался бы
+        # от прошлого обучения и загружался бы вместо нового словаря
+        binary_path = os.path.splitext(path)[0] + ".bin"
+        if os.path.exists(binary_path):
+            write_binary_vocab(self.vocab, binary_path)
+
     # ----------------------------------------------------
     # Загрузка словаря
     # ----------------------------------------------------
     def load_vocab(self, path: str):
-        with open(path, "r", encoding="utf-8") as f:
-            self.vocab = json.load(f)
+        """
+        Загружает словарь: *.bin отображается в память за O(1),
+        JSON парсится в dict
+        """
+        if str(path).endswith(".bin"):
+            self.vocab = BinaryVocab(path)
+        else:
+            with open(path, "r", encoding="utf-8") as f:
+                self.vocab = json.load(f)
         logger.info(f"Словарь загружен: {path}")
+
+    @staticmethod
+    def _default_vocab_path() -> str:
+        binary_path = config.settings.MODELS_DIR / "vocab.bin"
+        json_path = config.settings.MODELS_DIR / "vocab.json"
+        if not binary_path.exists():
+            return str(json_path)
+        # vocab.bin старше JSON — словарь переобучен без конвертации
+        if json_path.exists() and json_path.stat().st_mtime > binary_path.stat().st_mtime:
+            logger.warning(f"{binary_path} устарел относительно {json_path}, используется JSON")
+            return str(json_path)
+        return str(binary_path)
+
+
+# --------------------------------------------------------
+# Общий токенизатор на процесс
+# --------------------------------------------------------
+
+_default_tokenizer: Optional[Tokenizer] = None
+_default_tokenizer_lock = Lock()
+
+
+def get_default_tokenizer() -> Tokenizer:
+    """
+    Токенизатор со словарём по умолчанию, загружается один раз на процесс
+    """
+    global _default_tokenizer
+    if _default_tokenizer is None:
+        with _default_tokenizer_lock:
+            if _default_tokenizer is None:
+                _default_tokenizer = Tokenizer()
+    return _default_tokenizer
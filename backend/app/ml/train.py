@@ -3,36 +3,39 @@
 import os
 import torch
 import torch.nn as nn
-from torch.utils.data import DataLoader
 from torch.optim import Adam
-from typing import List
+from typing import List, Optional
 
-import pandas as pd
-
-from .dataset import TextDataset
+from .dataset import TextDataset, make_dataloader
 from .tokenizer import Tokenizer
 from .model import SentimentModel, ModelHandler
 from .metrics import compute_metrics
+from ..utils.csv_tools import as_texts, iter_csv_frames, iter_csv_texts
 from ..utils.logger import get_logger
+from .. import config
 
 logger = get_logger(__name__)
 
 # --------------------------------------------------------
 # Функция загрузки данных
 # --------------------------------------------------------
-def load_data(train_path: str, max_len: int = 100):
-    df = pd.read_csv(train_path)
-    texts = df["text"].tolist()
-    labels = df["label"].tolist()
+def load_data(train_path: str, max_len: int = 100, chunksize: int = 10_000):
+    # CSV читается чанками: в памяти остаются только списки текстов и меток
+    texts: List[str] = []
+    labels: List[int] = []
+    for chunk in iter_csv_frames(train_path, ["text", "label"], chunksize):
+        texts.extend(as_texts(chunk["text"]))
+        labels.extend(chunk["label"].tolist())
     logger.info(f"Загружено {len(texts)} примеров из {train_path}")
     return texts, labels
 
 # --------------------------------------------------------
 # Функция подготовки DataLoader
 # --------------------------------------------------------
-def prepare_dataloader(texts: List[str], labels: List[int], tokenizer: Tokenizer, batch_size: int = 32, max_len: int = 100):
+def prepare_dataloader(texts: List[str], labels: List[int], tokenizer: Tokenizer, batch_size: int = 32, max_len: int = 100, packed: bool = False):
     dataset = TextDataset(texts=texts, labels=labels, tokenizer=tokenizer, max_len=max_len)
-    dataloader = DataLoader(dataset, batch_size=batch_size, shuffle=True, collate_fn=dataset.collate_fn)
+    # В packed-режиме батчи группируются по длине — меньше паддинга на шаг
+    dataloader = make_dataloader(dataset, batch_size=batch_size, bucket_by_length=packed, shuffle=True, dynamic_padding=packed)
     return dataloader
 
 # --------------------------------------------------------
@@ -47,24 +50,28 @@ def train_model(
     batch_size: int = 32,
     epochs: int = 5,
     lr: float = 1e-3,
-    max_len: int = 100
+    max_len: int = 100,
+    packed: Optional[bool] = None
 ):
-    # ----------------------------
-    # Загрузка данных
-    # ----------------------------
-    texts, labels = load_data(train_csv_path)
+    packed = config.settings.PACKED_SEQUENCES if packed is None else packed
 
     # ----------------------------
     # Токенизация и построение словаря
     # ----------------------------
     tokenizer = Tokenizer(vocab_path=vocab_path)
-    tokenizer.build_vocab(texts)
+    # Словарь строится потоково; пропуски приводятся к "" так же, как в load_data
+    tokenizer.build_vocab(iter_csv_texts(train_csv_path))
     tokenizer.save_vocab(vocab_path)
 
+    # ----------------------------
+    # Загрузка данных
+    # ----------------------------
+    texts, labels = load_data(train_csv_path)
+
     # ----------------------------
     # DataLoader
     # ----------------------------
-    dataloader = prepare_dataloader(texts, labels, tokenizer, batch_size=batch_size, max_len=max_len)
+    dataloader = prepare_dataloader(texts, labels, tokenizer, batch_size=batch_size, max_len=max_len, packed=packed)
 
     # ----------------------------
     # Инициализация модели и оптимизатора
@@ -89,10 +96,10 @@ def train_model(
 
         for batch in dataloader:
             input_ids = batch["input_ids"].to(device)
-            batch_labels = batch["label"].to(device)
+            batch_labels = batch["labels"].to(device)
 
             optimizer.zero_grad()
-            outputs = model(input_ids)
+            outputs = model(input_ids, batch["lengths"]) if packed else model(input_ids)
             loss = criterion(outputs, batch_labels)
             loss.backward()
             optimizer.step()
@@ -108,7 +115,7 @@ def train_model(
     # ----------------------------
     # Сохранение модели
     # ----------------------------
-    handler = ModelHandler(model)
+    handler = ModelHandler(model, packed=packed)
     handler.save_model(save_model_path)
     logger.info(f"Обучение завершено. Модель сохранена в {save_model_path}")
 
@@ -0,0 +1,168 @@
+# backend/app/ml/vocab_store.py
+
+from pathlib import Path
+from collections.abc import ItemsView
+from typing import Dict, Iterator, Mapping, Optional, Union
+import json
+import os
+import struct
+import zlib
+
+from ..utils.logger import get_logger
+from ..utils.mmap_file import HEADER, MappedFile
+from .. import config
+
+logger = get_logger(__name__)
+
+# --------------------------------------------------------
+# Бинарный формат словаря токен → индекс
+# --------------------------------------------------------
+#
+# Все числа — little-endian uint32.
+#
+#   header        : magic "VOCB", version, n_tokens, n_slots
+#   offsets       : n_tokens + 1  (смещения в блоке строк)
+#   ids           : n_tokens      (индекс токена в модели)
+#   slots         : n_slots       (хэш-таблица: номер токена + 1, 0 — пусто)
+#   strings blob  : UTF-8 токены, отсортированные побайтово
+#
+# Хэш-таблица с открытой адресацией по crc32 даёт поиск за 1–2 пробы,
+# открытие файла через mmap (utils.mmap_file) — O(1), а сам файл
+# разделяется между процессами через page cache.
+
+MAGIC = b"VOCB"
+VERSION = 1
+
+
+def _slot_count(n_tokens: int) -> int:
+    n_slots = 8
+    while n_slots < n_tokens * 2:
+        n_slots *= 2
+    return n_slots
+
+
+def write_binary_vocab(vocab: Mapping[str, int], path: Union[str, Path]) -> Path:
+    """
+    Сохраняет словарь в бинарном формате для BinaryVocab
+    """
+    path = Path(path)
+    items = sorted(((token.encode("utf-8"), int(idx)) for token, idx in vocab.items()), key=lambda item: item[0])
+
+    offsets = [0]
+    for token, _ in items:
+        offsets.append(offsets[-1] + len(token))
+
+    n_slots = _slot_count(len(items))
+    mask = n_slots - 1
+    slots = [0] * n_slots
+    for position, (token, _) in enumerate(items):
+        slot = zlib.crc32(token) & mask
+        while slots[slot]:
+            slot = (slot + 1) & mask
+        slots[slot] = position + 1
+
+    # Запись во временный файл и атомарная замена: другой процесс, открывающий
+    # словарь в этот момент, не увидит наполовину записанный файл
+    tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    with tmp_path.open("wb") as f:
+        f.write(HEADER.pack(MAGIC, VERSION, len(items), n_slots))
+        f.write(struct.pack(f"<{len(offsets)}I", *offsets))
+        f.write(struct.pack(f"<{len(items)}I", *(idx for _, idx in items)))
+        f.write(struct.pack(f"<{n_slots}I", *slots))
+        f.write(b"".join(token for token, _ in items))
+    os.replace(tmp_path, path)
+
+    logger.info(f"Бинарный словарь сохранен: {path}. Размер: {len(items)} токенов")
+    return path
+
+
+def convert_json_vocab(json_path: Union[str, Path], bin_path: Optional[Union[str, Path]] = None) -> Path:
+    """
+    Конвертирует существующий vocab.json в бинарный формат
+    """
+    json_path = Path(json_path)
+    bin_path = Path(bin_path) if bin_path else json_path.with_suffix(".bin")
+    with json_path.open("r", encoding="utf-8") as f:
+        vocab = json.load(f)
+    return write_binary_vocab(vocab, bin_path)
+
+
+# --------------------------------------------------------
+# Класс BinaryVocab — словарь, отображённый в память
+# --------------------------------------------------------
+
+class BinaryVocab(Mapping):
+    """
+    Read-only словарь токен → индекс поверх mmap.
+    Поддерживает интерфейс Mapping (get, in, len, items),
+    поэтому используется в Tokenizer вместо dict.
+    """
+
+    def __init__(self, path: Union[str, Path]):
+        self._data = MappedFile(path, MAGIC, VERSION)
+        self.path = self._data.path
+        try:
+            n_tokens, n_slots = self._data.counts
+            self._offsets = self._data.uint32_array(n_tokens + 1)
+            self._ids = self._data.uint32_array(n_tokens)
+            self._slots = self._data.uint32_array(n_slots)
+            self._strings_start = self._data.pos
+            self._data.require(self._strings_start + self._offsets[n_tokens])
+        except (ValueError, struct.error, OSError):
+            self._data.close()
+            raise
+
+        self._n_tokens = n_tokens
+        self._mask = n_slots - 1
+        self._mm = self._data.mm
+
+    def _token_bytes(self, position: int) -> bytes:
+        base = self._strings_start
+        return self._mm[base + self._offsets[position]:base + self._offsets[position + 1]]
+
+    def _find(self, key: bytes) -> int:
+        slots = self._slots
+        slot = zlib.crc32(key) & self._mask
+        while True:
+            entry = slots[slot]
+            if entry == 0:
+                return -1
+            if self._token_bytes(entry - 1) == key:
+                return entry - 1
+            slot = (slot + 1) & self._mask
+
+    def get(self, token: str, default: Optional[int] = None) -> Optional[int]:
+        position = self._find(token.encode("utf-8"))
+        return self._ids[position] if position >= 0 else default
+
+    def __getitem__(self, token: str) -> int:
+        position = self._find(token.encode("utf-8"))
+        if position < 0:
+            raise KeyError(token)
+        return self._ids[position]
+
+    def __contains__(self, token: object) -> bool:
+        return isinstance(token, str) and self._find(token.encode("utf-8")) >= 0
+
+    def __iter__(self) -> Iterator[str]:
+        for position in range(self._n_tokens):
+            yield self._token_bytes(position).decode("utf-8")
+
+    def __len__(self) -> int:
+        return self._n_tokens
+
+    def items(self) -> ItemsView:
+        return ItemsView(self)
+
+    def to_dict(self) -> Dict[str, int]:
+        return {
+            self._token_bytes(position).decode("utf-8"): self._ids[position]
+            for position in range(self._n_tokens)
+        }
+
+    def close(self) -> None:
+        self._data.close()
+
+
+if __name__ == "__main__":
+    convert_json_vocab(config.settings.MODELS_DIR / "vocab.json")
@@ -0,0 +1,257 @@
+# backend/app/ml/worker_pool.py
+
+import copy
+import itertools
+import os
+import queue
+import threading
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from pathlib import Path
+from typing import Dict, List, Optional, Set
+
+import torch
+import torch.multiprocessing as mp
+import torch.nn as nn
+
+from .vocab_store import convert_json_vocab
+from ..utils.logger import get_logger
+from .. import config
+
+logger = get_logger(__name__)
+
+# --------------------------------------------------------
+# Процесс-воркер
+# --------------------------------------------------------
+
+def _worker_main(model: nn.Module, vocab_path: str, packed: bool, torch_threads: int, requests, responses) -> None:
+    """
+    Цикл воркера: получает (job_id, texts, return_probs), сообщает
+    ("start", pid, job_id) и отвечает ("done", pid, job_id, preds, error).
+    Веса модели приходят как тензоры в shared memory и не копируются.
+    """
+    # Импорты внутри процесса: при spawn модуль загружается заново
+    from .inference import run_inference
+    from .model import ModelHandler
+    from .tokenizer import Tokenizer
+
+    torch.set_num_threads(torch_threads)
+    handler = ModelHandler(model, device="cpu", packed=packed)
+    tokenizer = Tokenizer(vocab_path=vocab_path)
+    pid = os.getpid()
+
+    while True:
+        job = requests.get()
+        if job is None:
+            break
+        job_id, texts, return_probs = job
+        # Родитель знает, какой батч был у воркера, если тот упадёт
+        responses.put(("start", pid, job_id))
+        try:
+            responses.put(("done", pid, job_id, run_inference(handler, tokenizer, texts, return_probs=return_probs), None))
+        except Exception as e:
+            responses.put(("done", pid, job_id, None, repr(e)))
+
+# --------------------------------------------------------
+# Класс InferenceWorkerPool
+# --------------------------------------------------------
+
+class InferenceWorkerPool:
+    """
+    Пул процессов инференса. Родитель загружает модель один раз и переносит
+    веса в shared memory (model.share_memory()); N воркеров получают
+    их по ссылке, поэтому память растёт сублинейно с числом ядер.
+    Воркеры открывают бинарный vocab.bin через mmap (одна копия в page cache);
+    vocab.json при старте пула один раз конвертируется рядом с ним.
+    API-процесс отправляет батчи через общую очередь, свободный воркер забирает следующий.
+    Упавший воркер (OOM, segfault) замечает поток-читатель: его батч
+    завершается ошибкой, на его место запускается новый процесс.
+    """
+
+    def __init__(
+        self,
+        model: nn.Module,
+        vocab_path: str,
+        workers: Optional[int] = None,
+        packed: bool = False,
+        timeout: Optional[float] = None,
+        poll_interval: float = 0.5,
+    ):
+        self.workers = workers or config.settings.INFERENCE_WORKERS or (os.cpu_count() or 1)
+        self.timeout = timeout if timeout is not None else config.settings.INFERENCE_WORKER_TIMEOUT
+        self.poll_interval = poll_interval
+        self._ctx = mp.get_context(config.settings.INFERENCE_WORKER_START_METHOD)
+
+        # Копия: модель API-процесса (устройство, режим, память) не меняется
+        self._model = copy.deepcopy(model).cpu().eval()
+        self._model.share_memory()
+        self._vocab_path = self._binary_vocab_path(vocab_path)
+        self._packed = packed
+        self._torch_threads = config.settings.WORKER_TORCH_THREADS
+
+        self._requests = self._ctx.Queue()
+        self._responses = self._ctx.Queue()
+        self._pending: Dict[int, Future] = {}
+        self._running: Dict[int, int] = {}  # pid воркера → job_id
+        self._dead_pids: Set[int] = set()
+        self._pending_lock = threading.Lock()
+        self._ids = itertools.count()
+        self._closing = False
+        self.restarts = 0
+
+        self._processes = [self._spawn() for _ in range(self.workers)]
+
+        self._reader = threading.Thread(target=self._read_responses, name="inference-pool-reader", daemon=True)
+        self._reader.start()
+        logger.info(f"InferenceWorkerPool запущен. workers={self.workers}, torch_threads={self._torch_threads}")
+
+    @staticmethod
+    def _binary_vocab_path(vocab_path: str) -> str:
+        """
+        Путь к vocab.bin: без него каждый воркер парсил бы JSON в свой dict
+        """
+        if str(vocab_path).endswith(".bin"):
+            return str(vocab_path)
+        json_path = Path(vocab_path)
+        bin_path = json_path.with_suffix(".bin")
+        if not bin_path.exists() or bin_path.stat().st_mtime < json_path.stat().st_mtime:
+            convert_json_vocab(json_path, bin_path)
+        return str(bin_path)
+
+    def _spawn(self):
+        process = self._ctx.Process(
+            target=_worker_main,
+            args=(self._model, self._vocab_path, self._packed, self._torch_threads, self._requests, self._responses),
+            daemon=True,
+        )
+        process.start()
+        return process
+
+    # ----------------------------------------------------
+    # Поток-читатель: ответы воркеров и контроль их жизни
+    # ----------------------------------------------------
+    def _read_responses(self) -> None:
+        while True:
+            try:
+                message = self._responses.get(timeout=self.poll_interval)
+            except queue.Empty:
+                message = ()
+            if message is None:
+                break
+            if message:
+                self._handle(message)
+            if not self._closing:
+                self._check_workers()
+
+    def _handle(self, message) -> None:
+        if message[0] == "start":
+            _, pid, job_id = message
+            if pid in self._dead_pids:
+                # Воркер успел взять батч и упал раньше, чем мы прочитали сообщение
+                self._fail(job_id, f"воркер {pid} завершился")
+            else:
+                self._running[pid] = job_id
+            return
+
+        _, pid, job_id, preds, error = message
+        self._running.pop(pid, None)
+        with self._pending_lock:
+            future = self._pending.pop(job_id, None)
+        if future is None:
+            return
+        if error is not None:
+            future.set_exception(RuntimeError(f"Ошибка в воркере инференса: {error}"))
+        else:
+            future.set_result(preds)
+
+    def _check_workers(self) -> None:
+        for i, process in enumerate(self._processes):
+            if process.is_alive():
+                continue
+            logger.error(f"Воркер инференса {process.pid} завершился (exitcode={process.exitcode}), перезапуск")
+            self._dead_pids.add(process.pid)
+            job_id = self._running.pop(process.pid, None)
+            if job_id is not None:
+                self._fail(job_id, f"воркер {process.pid} завершился (exitcode={process.exitcode})")
+            self._processes[i] = self._spawn()
+            self.restarts += 1
+
+    def _fail(self, job_id: int, reason: str) -> None:
+        with self._pending_lock:
+            future = self._pending.pop(job_id, None)
+        if future is not None and not future.done():
+            future.set_exception(RuntimeError(f"Ошибка в воркере инференса: {reason}"))
+
+    # ----------------------------------------------------
+    # Публичный API
+    # ----------------------------------------------------
+    def submit(self, texts: List[str], return_probs: bool = False) -> Future:
+        future: Future = Future()
+        job_id = next(self._ids)
+        with self._pending_lock:
+            self._pending[job_id] = future
+        self._requests.put((job_id, list(texts), return_probs))
+        return future
+
+    def predict(self, texts: List[str], return_probs: bool = False):
+        """
+        Блокирующий вызов: отправляет батч воркерам и ждёт предсказания
+        не дольше timeout секунд
+        """
+        if not texts:
+            return ([], []) if return_probs else []
+        future = self.submit(texts, return_probs=return_probs)
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeoutError:
+            with self._pending_lock:
+                for job_id, pending in list(self._pending.items()):
+                    if pending is future:
+                        del self._pending[job_id]
+            raise RuntimeError(f"Воркер инференса не ответил за {self.timeout} с")
+
+    def close(self) -> None:
+        self._closing = True
+        for _ in self._processes:
+            self._requests.put(None)
+        for process in self._processes:
+            process.join(timeout=5)
+            if process.is_alive():
+                process.terminate()
+        self._responses.put(None)
+        self._reader.join(timeout=5)
+        with self._pending_lock:
+            pending, self._pending = list(self._pending.values()), {}
+        for future in pending:
+            if not future.done():
+                future.set_exception(RuntimeError("Пул инференса остановлен"))
+        logger.info("InferenceWorkerPool остановлен")
+
+
+# --------------------------------------------------------
+# Общий пул на API-процесс
+# --------------------------------------------------------
+
+_pool: Optional[InferenceWorkerPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_worker_pool(model_handler, tokenizer) -> InferenceWorkerPool:
+    """
+    Лениво создаёт пул по уже загруженной модели ModelHandler
+    """
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                if getattr(model_handler, "quantized", False) or isinstance(model_handler.model, torch.jit.ScriptModule):
+                    raise ValueError("Пул воркеров работает только с eager fp32-моделью (без квантования и TorchScript)")
+                _pool = InferenceWorkerPool(model_handler.model, tokenizer.vocab_path, packed=model_handler.packed)
+    return _pool
+
+
+def shutdown_worker_pool() -> None:
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.close()
+            _pool = None
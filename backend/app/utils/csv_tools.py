@@ -1,7 +1,11 @@
 # backend/app/utils/csv_tools.py
 
 import pandas as pd
-from typing import List, Optional
+from pathlib import Path
+from typing import IO, Iterator, List, Optional, Union
+import io
+import shutil
+import tempfile
 
 from .logger import get_logger
 from ..config import settings
@@ -106,3 +110,239 @@ def filter_texts_by_keyword(df: pd.DataFrame, keywords: List[str], column: str =
     df_filtered = df[df[column].str.contains("|".join(keywords), case=False, na=False)]
     logger.debug(f"Фильтр по ключевым словам {keywords}. Найдено: {df_filtered.shape[0]} записей")
     return df_filtered
+
+
+# --------------------------------------------------------------------
+# Потоковое чтение большого CSV
+# --------------------------------------------------------------------
+def as_texts(values: pd.Series) -> pd.Series:
+    """
+    Приводит колонку с текстами к строкам: пропуски → ""
+    """
+    return values.fillna("").astype(str)
+
+
+def iter_csv_frames(path: str, columns: List[str], chunksize: int = 10_000) -> Iterator[pd.DataFrame]:
+    """
+    Лениво читает CSV чанками по chunksize строк с нормализованными
+    названиями колонок, не загружая файл целиком
+    """
+    for chunk in pd.read_csv(path, chunksize=chunksize):
+        chunk = normalize_csv_columns(chunk)
+        missing = [col for col in columns if col not in chunk.columns]
+        if missing:
+            raise ValueError(f"Отсутствуют колонки: {missing}")
+        yield chunk
+
+
+def iter_csv_texts(path: str, column: str = "text", chunksize: int = 10_000) -> Iterator[str]:
+    """
+    Лениво отдаёт тексты из колонки CSV; пропуски — пустые строки
+    """
+    for chunk in iter_csv_frames(path, [column], chunksize):
+        yield from as_texts(chunk[column])
+
+
+# --------------------------------------------------------------------
+# Разбор загруженного CSV из байтов
+# --------------------------------------------------------------------
+def read_csv_bytes(contents: bytes) -> pd.DataFrame:
+    """
+    Декодирует UTF-8 содержимое загруженного файла и читает его как CSV
+    """
+    return pd.read_csv(io.StringIO(contents.decode("utf-8")))
+
+
+# --------------------------------------------------------------------
+# Потоковая обработка загруженного CSV
+# --------------------------------------------------------------------
+def spool_upload(source: IO[bytes], max_memory: Optional[int] = None) -> IO[bytes]:
+    """
+    Копирует загруженный файл во временный: до max_memory байт в памяти,
+    дальше — на диске. Нужен, потому что UploadFile закрывается раньше,
+    чем отдаётся тело StreamingResponse.
+    """
+    spool = tempfile.SpooledTemporaryFile(max_size=max_memory or settings.STREAM_SPOOL_MAX_MEMORY)
+    shutil.copyfileobj(source, spool, length=1024 * 1024)
+    spool.seek(0)
+    return spool
+
+
+def open_csv_chunks(source: Union[str, IO[bytes]], chunksize: Optional[int] = None):
+    """
+    Читатель CSV чанками по chunksize строк (pandas TextFileReader)
+    """
+    return pd.read_csv(source, chunksize=chunksize or settings.STREAM_CHUNK_SIZE, encoding="utf-8")
+
+
+def format_chunk(df: pd.DataFrame, fmt: str = "ndjson", header: bool = True) -> str:
+    """
+    Сериализует чанк результатов: NDJSON (по объекту на строку) или CSV
+    """
+    if fmt == "csv":
+        return df.to_csv(index=False, header=header)
+    if df.empty:
+        return ""
+    return df.to_json(orient="records", lines=True, force_ascii=False).rstrip("\n") + "\n"
+
+
+# --------------------------------------------------------------------
+# Колоночные форматы: Parquet и Arrow IPC (нужен pyarrow)
+# --------------------------------------------------------------------
+PARQUET_EXTENSIONS = {".parquet", ".pq"}
+ARROW_EXTENSIONS = {".arrow", ".feather", ".ipc"}
+
+TABLE_MEDIA_TYPES = {
+    "csv": "text/csv; charset=utf-8",
+    "parquet": "application/vnd.apache.parquet",
+    "arrow": "application/vnd.apache.arrow.file",
+}
+
+
+def table_format(filename: Union[str, Path]) -> str:
+    """
+    Формат файла по расширению: parquet, arrow или csv
+    """
+    ext = Path(str(filename)).suffix.lower()
+    if ext in PARQUET_EXTENSIONS:
+        return "parquet"
+    if ext in ARROW_EXTENSIONS:
+        return "arrow"
+    return "csv"
+
+
+def read_table_bytes(contents: bytes, filename: str) -> pd.DataFrame:
+    """
+    Читает загруженный файл в DataFrame по расширению имени.
+    Parquet и Arrow читаются без разбора текста — колонки копируются как есть.
+    """
+    fmt = table_format(filename)
+    if fmt == "parquet":
+        return pd.read_parquet(io.BytesIO(contents))
+    if fmt == "arrow":
+        return pd.read_feather(io.BytesIO(contents))
+    return read_csv_bytes(contents)
+
+
+def table_to_bytes(df: pd.DataFrame, fmt: str = "csv") -> bytes:
+    """
+    Сериализует DataFrame в CSV, Parquet (zstd) или Arrow IPC
+    """
+    if fmt == "parquet":
+        buffer = io.BytesIO()
+        df.to_parquet(buffer, index=False, compression="zstd")
+        return buffer.getvalue()
+    if fmt == "arrow":
+        buffer = io.BytesIO()
+        df.reset_index(drop=True).to_feather(buffer, compression="zstd")
+        return buffer.getvalue()
+    return df.to_csv(index=False).encode("utf-8")
+
+
+def read_table_columns(path: Union[str, Path]) -> List[str]:
+    """
+    Имена колонок без чтения данных: схема Parquet/Arrow или заголовок CSV
+    """
+    fmt = table_format(path)
+    if fmt == "parquet":
+        import pyarrow.parquet as pq
+
+        return pq.read_schema(str(path)).names
+    if fmt == "arrow":
+        import pyarrow as pa
+
+        with pa.memory_map(str(path)) as source:
+            return pa.ipc.open_file(source).schema.names
+    return list(pd.read_csv(path, nrows=0).columns)
+
+
+def count_table_rows(path: Union[str, Path]) -> int:
+    """
+    Число строк данных. Для Parquet/Arrow — точное, из метаданных;
+    для CSV — оценка по переводам строк (без заголовка).
+    """
+    fmt = table_format(path)
+    if fmt == "parquet":
+        import pyarrow.parquet as pq
+
+        return pq.ParquetFile(str(path)).metadata.num_rows
+    if fmt == "arrow":
+        import pyarrow as pa
+
+        # По одному record batch: сжатый (zstd) файл не распаковывается целиком
+        with pa.memory_map(str(path)) as source:
+            reader = pa.ipc.open_file(source)
+            return sum(reader.get_batch(i).num_rows for i in range(reader.num_record_batches))
+
+    lines = 0
+    last = b"\n"
+    with open(path, "rb") as f:
+        while True:
+            block = f.read(1024 * 1024)
+            if not block:
+                break
+            lines += block.count(b"\n")
+            last = block[-1:]
+    if last != b"\n":
+        lines += 1
+    return max(lines - 1, 0)
+
+
+def iter_table_chunks(path: Union[str, Path], chunksize: int, skip_rows: int = 0) -> Iterator[pd.DataFrame]:
+    """
+    Чанки по chunksize строк из CSV, Parquet или Arrow IPC, начиная со строки skip_rows.
+    Parquet читается батчами, начиная с первой необработанной row group;
+    Arrow — через mmap по одному record batch. В памяти — не больше одного батча.
+    """
+    fmt = table_format(path)
+    if fmt == "csv":
+        reader = pd.read_csv(path, chunksize=chunksize, encoding="utf-8", skiprows=range(1, skip_rows + 1) if skip_rows else None)
+        with reader:
+            yield from reader
+        return
+
+    if fmt == "parquet":
+        batches = _iter_parquet_batches(path, chunksize, skip_rows)
+    else:
+        batches = _iter_arrow_batches(path, chunksize, skip_rows)
+    for batch in batches:
+        yield batch.to_pandas()
+
+
+def _iter_parquet_batches(path: Union[str, Path], chunksize: int, skip_rows: int):
+    import pyarrow.parquet as pq
+
+    parquet = pq.ParquetFile(str(path))
+    # Целиком обработанные row group пропускаются по метаданным, без декодирования
+    metadata = parquet.metadata
+    first_group = 0
+    while first_group < metadata.num_row_groups and skip_rows >= metadata.row_group(first_group).num_rows:
+        skip_rows -= metadata.row_group(first_group).num_rows
+        first_group += 1
+    if first_group == metadata.num_row_groups:
+        return
+
+    row_groups = list(range(first_group, metadata.num_row_groups))
+    for batch in parquet.iter_batches(batch_size=chunksize, row_groups=row_groups):
+        if skip_rows >= batch.num_rows:
+            skip_rows -= batch.num_rows
+            continue
+        if skip_rows:
+            batch = batch.slice(skip_rows)
+            skip_rows = 0
+        yield batch
+
+
+def _iter_arrow_batches(path: Union[str, Path], chunksize: int, skip_rows: int):
+    import pyarrow as pa
+
+    with pa.memory_map(str(path)) as source:
+        reader = pa.ipc.open_file(source)
+        for i in range(reader.num_record_batches):
+            batch = reader.get_batch(i)
+            if skip_rows >= batch.num_rows:
+                skip_rows -= batch.num_rows
+                continue
+            for offset in range(skip_rows, batch.num_rows, chunksize):
+                yield batch.slice(offset, chunksize)
+            skip_rows = 0
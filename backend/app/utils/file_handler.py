@@ -11,7 +11,12 @@ from fastapi import UploadFile, HTTPException
 
 from ..config import settings
 from .logger import get_logger
-from .csv_tools import normalize_csv_columns, validate_required_columns
+from .csv_tools import (
+    ARROW_EXTENSIONS,
+    PARQUET_EXTENSIONS,
+    normalize_csv_columns,
+    validate_required_columns,
+)
 
 
 logger = get_logger(__name__)
@@ -32,7 +37,7 @@ TEMP_DIR.mkdir(parents=True, exist_ok=True)
 # Валидация расширений
 # --------------------------------------------------------------------
 
-ALLOWED_EXTENSIONS = {".csv", ".txt", ".json"}
+ALLOWED_EXTENSIONS = {".csv", ".txt", ".json"} | PARQUET_EXTENSIONS | ARROW_EXTENSIONS
 
 def validate_extension(filename: str):
     ext = Path(filename).suffix.lower()
@@ -74,7 +79,7 @@ def save_uploaded_file(file: UploadFile) -> Path:
 
 
 # --------------------------------------------------------------------
-# Чтение CSV / TXT / JSON в DataFrame
+# Чтение CSV / TXT / JSON / Parquet / Arrow в DataFrame
 # --------------------------------------------------------------------
 
 def load_to_dataframe(path: Union[str, Path]) -> pd.DataFrame:
@@ -89,6 +94,10 @@ def load_to_dataframe(path: Union[str, Path]) -> pd.DataFrame:
         df = pd.read_csv(path, sep="\n", header=None, names=["text"])
     elif ext == ".json":
         df = pd.read_json(path)
+    elif ext in PARQUET_EXTENSIONS:
+        df = pd.read_parquet(path)
+    elif ext in ARROW_EXTENSIONS:
+        df = pd.read_feather(path)
     else:
         raise HTTPException(400, f"Неподдерживаемый формат файла: {ext}")
 
@@ -169,12 +178,22 @@ def handle_file_upload(file: UploadFile) -> pd.DataFrame:
     return df
 
 
-def write_output_csv(df: pd.DataFrame, filename: Optional[str] = None) -> Path:
-    """Сохранение результата инференса в output-файл."""
+def write_output_csv(df: pd.DataFrame, filename: Optional[str] = None, append: bool = False) -> Path:
+    """
+    Сохранение результата инференса в output-файл.
+    append=True дописывает чанк в конец файла (заголовок — только в новый файл).
+    """
     fname = filename or f"results_{uuid.uuid4().hex}.csv"
     out_path = UPLOAD_DIR / fname
 
+    if append:
+        header = not out_path.exists() or out_path.stat().st_size == 0
+        df.to_csv(out_path, mode="a", header=header, index=False, encoding="utf-8")
+        logger.debug(f"Чанк из {len(df)} строк дописан: {out_path}")
+        return out_path
+
     df.to_csv(out_path, index=False, encoding="utf-8")
 
     logger.info(f"Результат обработки сохранён: {out_path}")
     return out_path
+
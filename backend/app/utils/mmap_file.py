@@ -0,0 +1,75 @@
+# backend/app/utils/mmap_file.py
+
+from pathlib import Path
+from typing import List, Tuple, Union
+import mmap
+import struct
+import sys
+
+# --------------------------------------------------------------------
+# Бинарный файл с заголовком и массивами uint32, отображённый в память
+# --------------------------------------------------------------------
+#
+# Общая основа для LemmaTable и BinaryVocab: заголовок
+# "<4sIII" (magic, version, два счётчика), за ним — массивы uint32
+# и блоки UTF-8 строк. Файл открывается через mmap, поэтому несколько
+# процессов разделяют одну копию через page cache.
+
+HEADER = struct.Struct("<4sIII")
+
+
+class MappedFile:
+    """
+    Read-only файл в памяти: проверяет заголовок и нарезает массивы uint32.
+    Усечённый или повреждённый файл даёт ValueError / struct.error / OSError,
+    при этом дескриптор и mmap закрываются.
+    """
+
+    def __init__(self, path: Union[str, Path], magic: bytes, version: int):
+        if sys.byteorder != "little":
+            raise ValueError("Бинарные таблицы поддерживаются только на little-endian платформах")
+
+        self.path = Path(path)
+        self._file = self.path.open("rb")
+        self._views: List[memoryview] = []
+        self.mm = None
+        try:
+            self.mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            file_magic, file_version, first, second = HEADER.unpack_from(self.mm, 0)
+            if file_magic != magic or file_version != version:
+                raise ValueError(f"Неверный формат файла: {self.path}")
+        except (ValueError, struct.error, OSError):
+            self.close()
+            raise
+
+        self.counts: Tuple[int, int] = (first, second)
+        self.view = memoryview(self.mm)
+        self._views.append(self.view)
+        self.pos = HEADER.size
+
+    def uint32_array(self, count: int) -> memoryview:
+        """
+        Следующий массив из count чисел uint32
+        """
+        end = self.pos + 4 * count
+        self.require(end)
+        array = self.view[self.pos:end].cast("I")
+        self._views.append(array)
+        self.pos = end
+        return array
+
+    def require(self, end: int) -> None:
+        """
+        Проверяет, что файл не короче end байт
+        """
+        if end > len(self.mm):
+            raise ValueError(f"Файл усечён: {self.path}")
+
+    def close(self) -> None:
+        # Производные memoryview освобождаются раньше mmap, иначе close() упадёт
+        for view in reversed(self._views):
+            view.release()
+        self._views.clear()
+        if self.mm is not None:
+            self.mm.close()
+        self._file.close()
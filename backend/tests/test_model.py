@@ -1,13 +1,23 @@
 # backend/tests/test_model.py
 
+import os
+
 import pytest
+import numpy as np
 import torch
+import torch.nn as nn
 from torch.utils.data import DataLoader
 
-from backend.app.ml.model import ModelHandler
-from backend.app.ml.dataset import TextDataset
+from backend.app import config
+
+from backend.app.ml.model import ModelHandler, SentimentModel
+from backend.app.ml.dataset import TextDataset, LengthBucketSampler, make_dataloader
 from backend.app.ml.tokenizer import Tokenizer
+from backend.app.ml.vocab_store import BinaryVocab, convert_json_vocab
+from backend.app.ml.inference import InferenceEngine, ScriptedModelHandler, run_inference
+from backend.app.ml.lexicon import SentimentLexicon, cascade_predict
 from backend.app.ml.metrics import compute_metrics
+from backend.app.ml.worker_pool import InferenceWorkerPool
 
 # --------------------------------------------------------
 # Тестирование ModelHandler
@@ -58,3 +68,216 @@ def test_compute_metrics_matches_labels(model_handler, sample_texts):
     assert "precision" in metrics, "metrics должны содержать ключ 'precision'"
     assert "recall" in metrics, "metrics должны содержать ключ 'recall'"
     assert 0.0 <= metrics["macro_f1"] <= 1.0, "macro_f1 должен быть между 0 и 1"
+
+def test_texts_to_sequences_returns_padded_matrix(tmp_path):
+    """
+    Проверка пакетного кодирования в матрицу (n, max_len) с паддингом нулями
+    """
+    tokenizer = Tokenizer(vocab_path=str(tmp_path / "vocab.json"))
+    tokenizer.vocab = {"все": 1, "отлично": 2, "качество": 3}
+
+    sequences = tokenizer.texts_to_sequences(["Все отлично", "", "качество качество качество"], max_len=2)
+
+    assert sequences.shape == (3, 2)
+    assert sequences.dtype == np.int64
+    assert sequences.tolist() == [[1, 2], [0, 0], [3, 3]]
+    assert sequences[0].tolist() == tokenizer.text_to_sequence("Все отлично", max_len=2)
+
+def test_binary_vocab_matches_json(tmp_path):
+    """
+    Конвертация vocab.json → vocab.bin сохраняет все индексы
+    """
+    vocab = {f"слово{i}": i + 1 for i in range(500)}
+    tokenizer = Tokenizer(vocab_path=str(tmp_path / "vocab.json"))
+    tokenizer.vocab = vocab
+    tokenizer.save_vocab()
+
+    bin_path = convert_json_vocab(tmp_path / "vocab.json")
+    binary = BinaryVocab(bin_path)
+    try:
+        assert len(binary) == len(vocab)
+        assert all(binary.get(token) == idx for token, idx in vocab.items())
+        assert binary.get("нет-такого", 0) == 0
+        assert binary.to_dict() == vocab
+        # items() — полноценный ItemsView, а не одноразовый генератор
+        items = binary.items()
+        assert len(items) == len(vocab)
+        assert ("слово0", 1) in items
+        assert list(items) == list(items)
+    finally:
+        binary.close()
+
+
+def test_save_vocab_refreshes_existing_binary(tmp_path):
+    """
+    Переобучение перезаписывает vocab.bin, сконвертированный ранее
+    """
+    tokenizer = Tokenizer(vocab_path=str(tmp_path / "vocab.json"))
+    tokenizer.vocab = {"старое": 1}
+    tokenizer.save_vocab()
+    convert_json_vocab(tmp_path / "vocab.json")
+
+    tokenizer.vocab = {"новое": 1, "слово": 2}
+    tokenizer.save_vocab()
+
+    binary = BinaryVocab(tmp_path / "vocab.bin")
+    try:
+        assert dict(binary.items()) == {"новое": 1, "слово": 2}
+    finally:
+        binary.close()
+
+def test_length_buckets_pad_to_longest_in_batch(tmp_path):
+    """
+    Батчи собираются по длине и паддятся до самого длинного текста в батче
+    """
+    tokenizer = Tokenizer(vocab_path=str(tmp_path / "vocab.json"))
+    tokenizer.vocab = {"а": 1, "б": 2}
+    texts = ["а", "а б а б а", "б", "а б"]
+    dataset = TextDataset(texts=texts, tokenizer=tokenizer, max_len=10)
+
+    sampler = LengthBucketSampler(dataset.lengths, batch_size=2)
+    assert list(sampler) == [[1, 3], [0, 2]]
+
+    batches = list(make_dataloader(dataset, batch_size=2, bucket_by_length=True, dynamic_padding=True))
+    assert [tuple(b["input_ids"].shape) for b in batches] == [(2, 5), (2, 1)]
+    assert batches[0]["indices"].tolist() == [1, 3]
+    assert dataset.dynamic_padding is False
+
+    # Без packed-модели паддинг не обрезается: выход не зависит от соседей по батчу
+    batches = list(make_dataloader(dataset, batch_size=2, bucket_by_length=True))
+    assert [tuple(b["input_ids"].shape) for b in batches] == [(2, 10), (2, 10)]
+
+def test_packed_forward_ignores_padding():
+    """
+    В packed-режиме результат не зависит от количества паддинга
+    """
+    torch.manual_seed(0)
+    model = SentimentModel(vocab_size=10, embed_dim=8, hidden_dim=8).eval()
+    short = torch.tensor([[1, 2, 3]])
+    padded = torch.tensor([[1, 2, 3, 0, 0, 0]])
+    lengths = torch.tensor([3])
+
+    with torch.no_grad():
+        assert torch.allclose(model(short, lengths), model(padded, lengths), atol=1e-6)
+
+def test_torchscript_export_matches_eager(tmp_path):
+    """
+    TorchScript-артефакт даёт те же предсказания, что и eager-модель
+    """
+    tokenizer = Tokenizer(vocab_path=str(tmp_path / "vocab.json"))
+    tokenizer.vocab = {"все": 1, "отлично": 2, "плохо": 3}
+    dataset = TextDataset(texts=["все отлично", "плохо", "все плохо плохо"], tokenizer=tokenizer, max_len=8)
+    dataloader = DataLoader(dataset, batch_size=2, collate_fn=dataset.collate_fn)
+
+    handler = ModelHandler(SentimentModel(vocab_size=4, embed_dim=8, hidden_dim=8), device="cpu")
+    path = handler.export_torchscript(str(tmp_path / "scripted.pt"), max_len=8)
+    scripted = ScriptedModelHandler(path, device="cpu")
+
+    assert scripted.predict(dataloader) == handler.predict(dataloader)
+
+
+def test_inference_engine_reuses_buffers_and_matches_run_inference(tmp_path):
+    """
+    Движок кодирует тексты в свои буферы и даёт те же предсказания, что и run_inference
+    """
+    tokenizer = Tokenizer(vocab_path=str(tmp_path / "vocab.json"))
+    tokenizer.vocab = {"все": 1, "отлично": 2, "плохо": 3}
+    torch.manual_seed(0)
+    handler = ModelHandler(SentimentModel(vocab_size=4, embed_dim=8, hidden_dim=8), device="cpu")
+    engine = InferenceEngine(handler, tokenizer, max_len=8, capacity=4)
+
+    texts = ["все отлично", "плохо", "все плохо плохо"]
+    buffer = engine._buffers(4)[0]
+    assert engine.predict(texts) == run_inference(handler, tokenizer, texts)
+    assert engine.predict(texts[:1]) == run_inference(handler, tokenizer, texts[:1])
+    assert engine._buffers(4)[0].base is buffer.base
+
+    # Вход больше capacity идёт частями, буферы не растут
+    many = texts * 3
+    labels, probs = engine.predict(many, return_probs=True)
+    expected_labels, expected_probs = run_inference(handler, tokenizer, many, return_probs=True)
+    assert labels == expected_labels
+    assert np.allclose(probs, expected_probs, atol=1e-6)
+    assert engine._buffers(4)[0].base is buffer.base
+    assert buffer.base.shape[0] == 4
+
+
+# --------------------------------------------------------
+# Тестирование лексиконного каскада
+# --------------------------------------------------------
+
+def test_cascade_sends_only_uncertain_texts_to_model():
+    lexicon = SentimentLexicon(
+        ["отличный", "ужасный"],
+        np.array([[0.05, 0.05, 0.9], [0.9, 0.05, 0.05]]),
+    )
+    calls = []
+
+    def model_predict(texts):
+        calls.append(list(texts))
+        return [1] * len(texts), [[0.2, 0.6, 0.2]] * len(texts)
+
+    texts = ["Отличный товар", "ужасное качество", "пришёл вовремя"]
+    labels, probs = cascade_predict(lexicon, model_predict, texts, return_probs=True, threshold=0.8)
+
+    assert labels == [2, 0, 1]
+    assert calls == [["пришёл вовремя"]]
+    assert probs[2] == [0.2, 0.6, 0.2]
+
+
+# --------------------------------------------------------
+# Тестирование пула процессов инференса
+# --------------------------------------------------------
+
+class CrashingModel(nn.Module):
+    """
+    Модель, процесс которой падает на токене 3 («плохо») — имитация OOM/segfault
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.fc = nn.Linear(1, 3)
+
+    def forward(self, input_ids, lengths=None):
+        if (input_ids == 3).any():
+            os._exit(1)
+        return torch.softmax(self.fc(input_ids[:, :1].float()), dim=1)
+
+
+@pytest.fixture
+def pool_vocab(tmp_path, monkeypatch):
+    monkeypatch.setattr(config.settings, "INFERENCE_WORKER_START_METHOD", "fork")
+    tokenizer = Tokenizer(vocab_path=str(tmp_path / "vocab.json"))
+    tokenizer.vocab = {"все": 1, "отлично": 2, "плохо": 3}
+    tokenizer.save_vocab()
+    return tokenizer
+
+
+def test_worker_pool_matches_in_process_inference(pool_vocab):
+    torch.manual_seed(0)
+    model = SentimentModel(vocab_size=4, embed_dim=8, hidden_dim=8)
+    handler = ModelHandler(model, device="cpu")
+    texts = ["все отлично", "плохо", "все плохо плохо"]
+
+    pool = InferenceWorkerPool(model, pool_vocab.vocab_path, workers=1, timeout=30)
+    try:
+        assert pool.predict(texts) == run_inference(handler, pool_vocab, texts)
+        # Воркеры читают сконвертированный при старте vocab.bin, а не JSON
+        assert pool._vocab_path == os.path.splitext(pool_vocab.vocab_path)[0] + ".bin"
+        assert os.path.exists(pool._vocab_path)
+    finally:
+        pool.close()
+    # В воркеры уходит копия: модель API-процесса не переносится в shared memory
+    assert not next(model.parameters()).is_shared()
+
+
+def test_worker_pool_fails_batch_of_crashed_worker_and_restarts(pool_vocab):
+    pool = InferenceWorkerPool(CrashingModel(), pool_vocab.vocab_path, workers=1, timeout=30, poll_interval=0.05)
+    try:
+        with pytest.raises(RuntimeError, match="завершился"):
+            pool.predict(["плохо"])
+        # На место упавшего воркера запущен новый
+        assert len(pool.predict(["все отлично"])) == 1
+        assert pool.restarts == 1
+    finally:
+        pool.close()
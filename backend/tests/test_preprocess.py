@@ -1,8 +1,20 @@
 # backend/tests/test_preprocess.py
 
 import pytest
-from backend.app.core.preprocessing import clean_text, remove_punctuation, lowercase_text
-from backend.app.core.normalizer import Normalizer
+import struct
+from backend.app.core.preprocessing import clean_text, remove_punctuation, lowercase_text, PreprocessingPipeline
+from backend.app.core.normalizer import Normalizer, LemmaCache
+from backend.app.core.lemma_dict import LemmaTable, write_lemma_table
+from backend.app.utils.csv_tools import (
+    count_table_rows,
+    format_chunk,
+    iter_csv_texts,
+    iter_table_chunks,
+    open_csv_chunks,
+    read_table_bytes,
+    spool_upload,
+    table_to_bytes,
+)
 
 # --------------------------------------------------------
 # Тестирование функций preprocessing.py
@@ -38,3 +50,134 @@ def test_normalizer_tokenize_lemmatize(normalizer):
     assert isinstance(tokens, list), "normalize должен возвращать список токенов"
     assert all(isinstance(t, str) for t in tokens), "Все токены должны быть строками"
     assert len(tokens) > 0, "Список токенов не должен быть пустым"
+
+# --------------------------------------------------------
+# Тестирование LRU-кэша лемм
+# --------------------------------------------------------
+
+def test_lemma_cache_counts_hits_and_evicts_lru():
+    cache = LemmaCache(maxsize=2)
+    calls = []
+
+    def compute(token):
+        calls.append(token)
+        return token.upper()
+
+    assert cache.get_or_compute("кот", compute) == "КОТ"
+    assert cache.get_or_compute("кот", compute) == "КОТ"
+    cache.get_or_compute("пёс", compute)
+    cache.get_or_compute("кот", compute)
+    cache.get_or_compute("мышь", compute)  # вытесняет "пёс"
+    cache.get_or_compute("пёс", compute)
+
+    assert calls == ["кот", "пёс", "мышь", "пёс"]
+    stats = cache.stats()
+    assert stats["hits"] == 2
+    assert stats["misses"] == 4
+    assert stats["size"] == 2
+
+# --------------------------------------------------------
+# Однопроходная очистка совпадает со старым пайплайном
+# --------------------------------------------------------
+
+@pytest.mark.parametrize("text", [
+    "Всё ОТЛИЧНО!!! Подробнее: http://shop.ru/item?id=1 спасибо",
+    "смотрите тутhttps://x.ru и www.site.com/abc",
+    "www и http без ссылок",
+    "Пальто красивое,   но пришло с дырой :(",
+    "snake_case 123abc ёлка",
+])
+def test_clean_tokens_matches_clean_text_and_tokenize(text):
+    expected = Normalizer._tokenize(PreprocessingPipeline._clean_text(text))
+    assert list(PreprocessingPipeline._clean_tokens(text)) == expected
+
+# --------------------------------------------------------
+# Тестирование бинарной таблицы лемм
+# --------------------------------------------------------
+
+def test_lemma_table_roundtrip(tmp_path):
+    mapping = {"коты": "кот", "кота": "кот", "бегают": "бегать", "ёжик": "ёжик", "abc": "abc"}
+    path = write_lemma_table(mapping, tmp_path / "lemmas.bin")
+
+    table = LemmaTable(path)
+    try:
+        assert len(table) == len(mapping)
+        for form, lemma in mapping.items():
+            assert table.get(form) == lemma
+        assert table.get("собака") is None
+        assert "коты" in table
+    finally:
+        table.close()
+
+
+@pytest.mark.parametrize("size", [0, 10, 40])
+def test_lemma_table_rejects_truncated_file(tmp_path, size):
+    path = write_lemma_table({"коты": "кот", "бегают": "бегать"}, tmp_path / "lemmas.bin")
+    path.write_bytes(path.read_bytes()[:size])
+
+    with pytest.raises((ValueError, struct.error, OSError)):
+        LemmaTable(path)
+
+# --------------------------------------------------------
+# Потоковое чтение текстов из CSV
+# --------------------------------------------------------
+
+def test_iter_csv_texts_streams_in_order(tmp_path):
+    path = tmp_path / "reviews.csv"
+    path.write_text("Review,label\nпервый,1\n,0\nтретий,2\n", encoding="utf-8")
+
+    texts = iter_csv_texts(str(path), chunksize=1)
+    assert next(texts) == "первый"
+    assert list(texts) == ["", "третий"]
+
+
+def test_csv_chunks_stream_as_csv_and_ndjson():
+    import io
+    import json
+
+    spool = spool_upload(io.BytesIO("text\nпервый\nвторой\nтретий\n".encode("utf-8")), max_memory=8)
+    chunks = list(open_csv_chunks(spool, chunksize=2))
+    assert [len(chunk) for chunk in chunks] == [2, 1]
+
+    csv_out = "".join(format_chunk(chunk, "csv", header=i == 0) for i, chunk in enumerate(chunks))
+    assert csv_out.splitlines() == ["text", "первый", "второй", "третий"]
+
+    ndjson_out = "".join(format_chunk(chunk, "ndjson") for chunk in chunks)
+    assert [json.loads(line)["text"] for line in ndjson_out.splitlines()] == ["первый", "второй", "третий"]
+
+
+@pytest.mark.parametrize("fmt,suffix", [("parquet", ".parquet"), ("arrow", ".arrow"), ("csv", ".csv")])
+def test_table_formats_roundtrip_and_resume(tmp_path, fmt, suffix):
+    import pandas as pd
+
+    if fmt != "csv":
+        pytest.importorskip("pyarrow")
+    df = pd.DataFrame({"text": [f"отзыв {i}" for i in range(7)], "label": [i % 3 for i in range(7)]})
+
+    body = table_to_bytes(df, fmt)
+    assert read_table_bytes(body, f"upload{suffix}").equals(df)
+
+    path = tmp_path / f"reviews{suffix}"
+    path.write_bytes(body)
+    assert count_table_rows(path) == 7
+    chunks = list(iter_table_chunks(path, chunksize=3, skip_rows=4))
+    assert pd.concat(chunks)["text"].tolist() == ["отзыв 4", "отзыв 5", "отзыв 6"]
+
+
+def test_table_chunks_resume_across_row_groups_and_batches(tmp_path):
+    pa = pytest.importorskip("pyarrow")
+    import pyarrow.parquet as pq
+
+    table = pa.table({"text": [f"отзыв {i}" for i in range(7)]})
+    pq.write_table(table, tmp_path / "reviews.parquet", row_group_size=2)
+    with pa.OSFile(str(tmp_path / "reviews.arrow"), "wb") as sink:
+        with pa.ipc.new_file(sink, table.schema, options=pa.ipc.IpcWriteOptions(compression="zstd")) as writer:
+            for batch in table.to_batches(max_chunksize=3):
+                writer.write_batch(batch)
+
+    for name in ("reviews.parquet", "reviews.arrow"):
+        path = tmp_path / name
+        assert count_table_rows(path) == 7
+        chunks = list(iter_table_chunks(path, chunksize=2, skip_rows=3))
+        assert all(len(chunk) <= 2 for chunk in chunks)
+        assert [text for chunk in chunks for text in chunk["text"]] == [f"отзыв {i}" for i in range(3, 7)]
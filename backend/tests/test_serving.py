@@ -0,0 +1,398 @@
+# backend/tests/test_serving.py
+
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+from backend.app import dependencies
+from backend.app.core import jobs as jobs_module
+from backend.app.core.batcher import MicroBatcher
+from backend.app.core.dedup import dedup_predict, dedup_texts
+from backend.app.core.executor import run_blocking
+from backend.app.core.jobs import DONE, JobManager
+from backend.app.core.local_cache import LocalCache
+from backend.app.core.prediction_cache import PredictionCache
+from backend.app.config import settings
+from backend.app.core.rate_limiter import MemoryTokenBucket, RedisTokenBucket
+from backend.app.utils import file_handler
+
+# --------------------------------------------------------
+# Тестирование MicroBatcher
+# --------------------------------------------------------
+
+def test_micro_batcher_merges_concurrent_requests():
+    calls = []
+
+    def predict_fn(texts):
+        calls.append(list(texts))
+        return [len(text) for text in texts]
+
+    async def scenario():
+        batcher = MicroBatcher(predict_fn, max_batch_size=10, window_ms=50, max_queue=10)
+        results = await asyncio.gather(
+            batcher.submit(["a"]),
+            batcher.submit(["bb", "ccc"]),
+            batcher.submit(["dddd"]),
+        )
+        stats = batcher.stats()
+        await batcher.stop()
+        return results, stats
+
+    results, stats = asyncio.run(scenario())
+
+    assert results == [[1], [2, 3], [4]]
+    assert calls == [["a", "bb", "ccc", "dddd"]]
+    assert stats["batches"] == 1
+    assert stats["requests"] == 3
+
+
+def test_micro_batcher_restart_keeps_queued_requests():
+    async def scenario():
+        batcher = MicroBatcher(lambda texts: [len(text) for text in texts], max_batch_size=10, window_ms=1, max_queue=10)
+        first = asyncio.ensure_future(batcher.submit(["a"]))
+        await asyncio.sleep(0)
+        # Воркер погиб раньше, чем забрал запрос из очереди
+        batcher._worker.cancel()
+        await asyncio.sleep(0)
+        second = await asyncio.wait_for(batcher.submit(["bb"]), 1)
+        return await asyncio.wait_for(first, 1), second
+
+    assert asyncio.run(scenario()) == ([1], [2])
+
+
+def test_run_blocking_works_across_event_loops():
+    # Семафор пула не должен оставаться привязанным к первому loop
+    assert asyncio.run(run_blocking(sum, [1, 2])) == 3
+    assert asyncio.run(run_blocking(sum, [3, 4])) == 7
+
+
+# --------------------------------------------------------
+# Тестирование PredictionCache
+# --------------------------------------------------------
+
+class DictBackend:
+    def __init__(self):
+        self.store = {}
+
+    def get(self, key):
+        return self.store.get(key)
+
+    def set(self, key, value, ex=None):
+        self.store[key] = value
+
+
+def test_prediction_cache_skips_model_on_hit():
+    calls = []
+
+    async def infer(texts):
+        calls.append(list(texts))
+        return [(len(text) % 3, [0.1, 0.2, 0.7]) for text in texts]
+
+    async def scenario():
+        cache = PredictionCache(DictBackend(), model_version="test", ttl=60)
+        first = await cache.predict(["Отлично!", "плохо"], infer)
+        # Тот же текст после нормализации (регистр, пунктуация) — попадание
+        second = await cache.predict(["отлично", "Новый отзыв"], infer)
+        return cache, first, second
+
+    cache, first, second = asyncio.run(scenario())
+
+    assert calls == [["Отлично!", "плохо"], ["Новый отзыв"]]
+    assert second[0] == first[0]
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 3
+
+
+def test_prediction_cache_key_changes_with_model_settings(monkeypatch):
+    cache = PredictionCache(DictBackend(), model_version="test", ttl=60)
+    key = cache.key("Отлично!")
+    for name, value in [("LEXICON_CASCADE", not settings.LEXICON_CASCADE), ("QUANTIZE_INT8", not settings.QUANTIZE_INT8)]:
+        with monkeypatch.context() as m:
+            m.setattr(settings, name, value)
+            assert cache.key("Отлично!") != key
+    assert cache.key("отлично") == key
+
+
+# --------------------------------------------------------
+# Тестирование дедупликации
+# --------------------------------------------------------
+
+def test_dedup_predicts_each_normalized_text_once():
+    calls = []
+
+    def predict(texts):
+        calls.append(list(texts))
+        return [f"label:{text}" for text in texts]
+
+    texts = ["Отлично!", "плохо", "отлично", "Плохо...", "новый отзыв"]
+    first, inverse = dedup_texts(texts)
+
+    assert first == [0, 1, 4]
+    assert inverse == [0, 1, 0, 1, 2]
+    assert dedup_predict(predict, texts) == [
+        "label:Отлично!", "label:плохо", "label:Отлично!", "label:плохо", "label:новый отзыв",
+    ]
+    assert calls == [["Отлично!", "плохо", "новый отзыв"]]
+
+
+def test_dedup_counts_each_text_once_and_reuses_keys_for_cache(monkeypatch):
+    from backend.app.core import dedup as dedup_module
+
+    tokenized = []
+    original = dedup_module.Normalizer._tokenize
+    monkeypatch.setattr(dedup_module.Normalizer, "_tokenize", staticmethod(lambda text: tokenized.append(text) or original(text)))
+    monkeypatch.setattr(dedup_module, "dedup_stats", dedup_module.DedupStats())
+
+    async def infer(texts):
+        return [(1, [0.2, 0.6, 0.2]) for _ in texts]
+
+    async def scenario():
+        texts = ["Отлично!", "отлично", "плохо", "Плохо"]
+        keys = dedup_module.dedup_keys(texts)
+        first, inverse = dedup_module.dedup(texts, keys)
+        cache = PredictionCache(DictBackend(), model_version="test", ttl=60)
+        await cache.predict([texts[i] for i in first], infer, normalized=[keys[i] for i in first])
+        return texts
+
+    texts = asyncio.run(scenario())
+    assert tokenized == texts
+    assert dedup_module.dedup_stats.stats()["dedup_ratio"] == 0.5
+
+
+# --------------------------------------------------------
+# Тестирование LocalCache
+# --------------------------------------------------------
+
+def test_local_cache_ttl_and_lru_eviction():
+    cache = LocalCache(max_entries=2, max_bytes=10**6, purge_interval=0)
+
+    async def scenario():
+        await cache.set("a", "1")
+        await cache.set("b", "2")
+        await cache.get("a")          # "a" становится самым свежим
+        await cache.set("c", "3")     # вытесняется "b"
+        lru = await cache.mget(["a", "b", "c"])
+        await cache.set("tmp", "x", px=1)
+        await asyncio.sleep(0.01)
+        return lru, await cache.get("tmp")
+
+    lru, expired = asyncio.run(scenario())
+    assert lru == ["1", None, "3"]
+    assert expired is None
+    stats = cache.stats()
+    assert stats["entries"] <= 2
+    assert stats["evictions"] == 2
+    assert stats["expirations"] == 1
+
+
+def test_local_cache_without_eviction_keeps_entries():
+    cache = LocalCache(max_entries=2, evict=False)
+    for i in range(5):
+        cache.set_sync(f"job:{i}", "{}")
+    assert len(cache) == 5
+    assert cache.stats()["evictions"] == 0
+
+
+def test_local_cache_byte_limit():
+    cache = LocalCache(max_entries=1000, max_bytes=2000, purge_interval=0)
+    for i in range(100):
+        cache.set_sync(f"k{i}", "x" * 100)
+    assert cache.stats()["bytes"] <= 2000
+    assert cache.get_sync("k99") == "x" * 100
+    assert cache.get_sync("k0") is None
+
+
+# --------------------------------------------------------
+# Тестирование rate limiter (token bucket)
+# --------------------------------------------------------
+
+def test_memory_token_bucket_refills_gradually():
+    bucket = MemoryTokenBucket(limit=3, window=3)  # 1 токен в секунду
+
+    decisions = [bucket.allow_sync("rl:client", now=100.0) for _ in range(4)]
+    assert [allowed for allowed, _ in decisions] == [True, True, True, False]
+    assert decisions[-1][1] == pytest.approx(1.0)
+
+    # Через 1.5 с доступен ровно один запрос
+    assert bucket.allow_sync("rl:client", now=101.5)[0] is True
+    assert bucket.allow_sync("rl:client", now=101.5)[0] is False
+    # Другой клиент не затронут
+    assert bucket.allow_sync("rl:other", now=101.5)[0] is True
+
+
+def test_redis_token_bucket_is_atomic_under_concurrency():
+    fakeredis = pytest.importorskip("fakeredis")
+    pytest.importorskip("lupa")
+
+    async def scenario():
+        client = fakeredis.FakeAsyncRedis()
+        bucket = RedisTokenBucket(client, limit=5, window=60)
+        decisions = await asyncio.gather(*(bucket.allow("rl:client") for _ in range(20)))
+        return [allowed for allowed, _ in decisions]
+
+    allowed = asyncio.run(scenario())
+    assert sum(allowed) == 5
+
+
+# --------------------------------------------------------
+# Тестирование фоновых задач
+# --------------------------------------------------------
+
+@pytest.fixture
+def job_dirs(tmp_path, monkeypatch):
+    monkeypatch.setattr(file_handler, "UPLOAD_DIR", tmp_path)
+    monkeypatch.setattr(jobs_module, "UPLOAD_DIR", tmp_path)
+    path = tmp_path / "reviews.csv"
+    path.write_text("text\nа\nбб\nввв\nгггг\nддддд\n", encoding="utf-8")
+    return path
+
+
+def test_job_processes_file_in_chunks(job_dirs):
+    calls = []
+
+    def predict(texts):
+        calls.append(list(texts))
+        return [len(text) % 3 for text in texts]
+
+    async def scenario():
+        manager = JobManager(LocalCache(), predict_factory=lambda: predict, workers=1)
+        await manager.start()
+        job = await manager.submit(str(job_dirs), chunksize=2)
+        await manager._queue.join()
+        await manager.stop()
+        return manager, await manager.get(job["id"])
+
+    manager, job = asyncio.run(scenario())
+
+    assert job["status"] == DONE
+    assert job["rows_done"] == job["total_rows"] == 5
+    assert [len(batch) for batch in calls] == [2, 2, 1]
+    lines = manager.output_path(job).read_text(encoding="utf-8").splitlines()
+    assert lines == ["text,predicted_label", "а,1", "бб,2", "ввв,0", "гггг,1", "ддддд,2"]
+
+
+def test_job_resumes_from_checkpoint(job_dirs):
+    calls = []
+
+    def predict(texts):
+        calls.append(list(texts))
+        return [len(text) % 3 for text in texts]
+
+    async def scenario():
+        store = LocalCache()
+        manager = JobManager(store, predict_factory=lambda: predict, workers=1)
+        await manager.start()
+        job = await manager.submit(str(job_dirs), chunksize=2)
+        await manager._queue.join()
+        await manager.stop()
+
+        # Имитируем падение после первого чанка: контрольная точка на 2 строках,
+        # в output успела попасть часть следующего чанка
+        output = manager.output_path(job)
+        checkpoint = len("text,predicted_label\nа,1\nбб,2\n".encode("utf-8"))
+        with output.open("r+b") as f:
+            f.truncate(checkpoint + 3)
+        job = await manager.get(job["id"])
+        job.update(status="running", rows_done=2, chunks_done=1, output_bytes=checkpoint)
+        await manager._save(job)
+        calls.clear()
+
+        restarted = JobManager(store, predict_factory=lambda: predict, workers=1)
+        assert await restarted.start() == 1
+        await restarted._queue.join()
+        await restarted.stop()
+        return restarted, await restarted.get(job["id"])
+
+    manager, job = asyncio.run(scenario())
+
+    assert job["status"] == DONE
+    assert calls == [["ввв", "гггг"], ["ддддд"]]
+    lines = manager.output_path(job).read_text(encoding="utf-8").splitlines()
+    assert lines == ["text,predicted_label", "а,1", "бб,2", "ввв,0", "гггг,1", "ддддд,2"]
+
+
+def test_job_index_records_concurrent_submits_and_prunes_expired(job_dirs):
+    async def scenario():
+        store = LocalCache(evict=False)
+        manager = JobManager(store, predict_factory=lambda: None, workers=1)
+        await store.sadd("jobs:index", "expired-job")
+        submitted = await asyncio.gather(*(manager.submit(str(job_dirs)) for _ in range(5)))
+        return {job["id"] for job in submitted}, await store.smembers("jobs:index")
+
+    submitted, index = asyncio.run(scenario())
+    assert index == submitted
+
+
+def test_job_resumes_after_restart_while_stale_lock_is_held(job_dirs):
+    def predict(texts):
+        return [len(text) % 3 for text in texts]
+
+    async def wait_done(manager, job_id):
+        for _ in range(100):
+            job = await manager.get(job_id)
+            if job["status"] == DONE:
+                return job
+            await asyncio.sleep(0.05)
+        return job
+
+    async def scenario():
+        store = LocalCache()
+        manager = JobManager(store, predict_factory=lambda: predict, workers=1)
+        await manager.start()
+        job = await manager.submit(str(job_dirs), chunksize=2)
+        await manager._queue.join()
+        await manager.stop()
+        assert await store.get(f"job:{job['id']}:lock") is None
+
+        # Процесс упал посреди задачи: статус running, захват упавшего владельца ещё жив
+        job = await manager.get(job["id"])
+        job.update(status="running", rows_done=0, chunks_done=0, output_bytes=0)
+        await manager._save(job)
+        await store.set(f"job:{job['id']}:lock", "dead-owner", ex=1)
+
+        restarted = JobManager(store, predict_factory=lambda: predict, workers=1)
+        assert await restarted.start() == 1
+        done = await wait_done(restarted, job["id"])
+        await restarted.stop()
+        return done
+
+    job = asyncio.run(scenario())
+    assert job["status"] == DONE
+    assert job["rows_done"] == 5
+
+# --------------------------------------------------------
+# Тестирование готовности при старте
+# --------------------------------------------------------
+
+def test_startup_failure_is_reported_by_readiness(monkeypatch):
+    def broken_load():
+        raise FileNotFoundError("trained_model.pt")
+
+    monkeypatch.setattr(dependencies, "_load_and_warmup", broken_load)
+    monkeypatch.setattr(dependencies.container, "ready", False)
+
+    async def scenario():
+        await dependencies.initialize()
+        # initialize не ждёт загрузку: сразу после старта модель ещё грузится
+        assert dependencies.readiness()["status"] == "loading"
+        await dependencies.container.startup_task
+        return dependencies.readiness()
+
+    state = asyncio.run(scenario())
+    assert state["ready"] is False
+    assert state["status"] == "failed"
+    assert "trained_model.pt" in state["error"]
+
+
+def test_job_submission_is_rejected_until_model_is_ready(monkeypatch):
+    monkeypatch.setattr(dependencies.container, "ready", False)
+    monkeypatch.setattr(dependencies.container, "error", None)
+
+    with pytest.raises(HTTPException) as exc:
+        dependencies.require_ready()
+    assert exc.value.status_code == 503
+    assert exc.value.detail["status"] == "loading"
+
+    monkeypatch.setattr(dependencies.container, "ready", True)
+    dependencies.require_ready()